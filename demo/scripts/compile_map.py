@@ -0,0 +1,25 @@
+import os
+import argparse
+
+from src.map.room_mapper import RoomMapper
+from src.map.map_format import CompiledMap
+from src.utils.paths import get_path
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compile a text map into the binary map format.")
+    parser.add_argument("--map", type=str, default=get_path("static/maps/map.txt"),
+                        help="Text map to compile")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Compiled map path (default: same name with the .bin extension)")
+
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.map)[0] + ".bin"
+
+    room_mapper = RoomMapper.from_file(args.map)
+    CompiledMap.save(room_mapper, output)
+
+    print("[INFO] Compiled " + str(len(room_mapper.rooms)) + " rooms and "
+          + str(len(room_mapper.compact.targets)) + " edges to " + output)
@@ -15,6 +15,7 @@ from ws_client import *
 
 from src.automaton.robot_automaton import create_automaton
 from src.actions.position_manager import PositionManager
+from src.actions.map_watcher import MapWatcher
 from src.actions.action_manager import ActionManager
 from src.users.user_manager import UserManager
 from src.utils.paths import get_path
@@ -35,6 +36,10 @@ if __name__ == "__main__":
                         help="Number of seconds to wait with the hand raised before canceling the procedure")
     parser.add_argument("--uid", type=int, default=-1,
                         help="User id (testing purposes)")
+    parser.add_argument("--trace", type=str, default=None,
+                        help="File the automaton transitions and timing histograms are appended to (JSON lines)")
+    parser.add_argument("--action_files", action="store_true",
+                        help="Write the per user actions to the actions folder, for MODIM servers only running actions from files")
 
     args = parser.parse_args()
 
@@ -58,12 +63,16 @@ if __name__ == "__main__":
 
     print("[INFO] Working directory: " + os.getcwd())
 
-    action_manager = ActionManager(session)
+    action_manager = ActionManager(session, action_files=args.action_files)
     print("[INFO] Setting up action manager")
 
     map_path = get_path("static/maps/map.txt")
     position_manager = PositionManager(map_path)
 
+    # Pick up map edits (closed corridors, new rooms) without restarting
+    map_watcher = MapWatcher(position_manager)
+    map_watcher.start()
+
     users_database_path = get_path("static/users/users.txt")
     print("[INFO] Restoring users from: " + users_database_path)
     user_manager = UserManager.load(users_database_path)
@@ -74,9 +83,7 @@ if __name__ == "__main__":
 
     if args.uid not in user_manager:
 
-        mws.run_interaction(action_manager.interaction_register_user)
-
-        user_data = action_manager.check_status()
+        user_data = action_manager.run_dialog(mws, action_manager.interaction_register_user)
         print("[INFO] User data: " + user_data)
 
         user_tokens = user_data.split()
@@ -110,21 +117,20 @@ if __name__ == "__main__":
     else:
         raise ValueError("Invalid language: " + active_user.lang)
 
-    # Create custom greeting action file
-    action_manager.create_custom_greeting(active_user.username, active_user.disability)
+    # Render the custom greeting action, served to MODIM from memory (or its file, with --action_files)
+    greeting = action_manager.create_custom_greeting(active_user.username, active_user.disability, active_user.lang)
     print("[INFO] Created custom greeting for user " + active_user.username)
 
     # Call the greeting
-    mws.run_interaction(action_manager.custom_greeting)
+    mws.run_interaction(greeting)
 
     if active_user.disability == "blind":
-        mws.run_interaction(action_manager.interaction_blind_assist)
+        result = action_manager.run_dialog(mws, action_manager.interaction_blind_assist)
     elif active_user.disability == "deaf":
-        mws.run_interaction(action_manager.interaction_deaf_assist)
+        result = action_manager.run_dialog(mws, action_manager.interaction_deaf_assist)
     else:
         raise ValueError("Invalid disability: " + active_user.disability)
 
-    result = action_manager.check_status()
     if result == 'failure':
         print('[INFO] Help procedure aborted')
 
@@ -171,11 +177,10 @@ if __name__ == "__main__":
             print("[INFO] No route to " + target_room)
 
             if active_user.disability == "blind":  # Blindness
-                mws.run_interaction(action_manager.blind_ask_call)
+                status = action_manager.run_dialog(mws, action_manager.blind_ask_call)
             else:  # Deafness
-                mws.run_interaction(action_manager.deaf_ask_call)
+                status = action_manager.run_dialog(mws, action_manager.deaf_ask_call)
 
-            status = action_manager.check_status()
             if status != "failure":
                 print("[INFO] Performing call to room " + target_room)
 
@@ -206,10 +211,14 @@ if __name__ == "__main__":
                 action_manager,
                 position_manager,
                 timeout=args.wtime,
-                disability=active_user.disability
+                disability=active_user.disability,
+                trace_path=args.trace
             )
 
             # Start
             robot_automaton.start('steady_state')
 
-app.run()
+try:
+    app.run()
+finally:
+    action_manager.close()
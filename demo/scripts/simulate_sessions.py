@@ -0,0 +1,76 @@
+import argparse
+import multiprocessing
+import random
+import time
+
+from src.actions.position_manager import PositionManager
+from src.simulation.session import random_script, run_session
+from src.utils.paths import get_path
+
+
+# Position manager of the worker processes
+_position_manager = None
+
+
+def _load_map(map_path):
+    global _position_manager
+    _position_manager = PositionManager(map_path, engine='search')
+
+
+def _run(job):
+    script, wtime = job
+    stats = run_session(script, _position_manager, wtime=wtime)
+    stats.pop('tracer', None)
+    return stats
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Run scripted guided sessions on simulated NAOqi services and "
+                                                 "MODIM, faster than real time, and report their outcomes.")
+    parser.add_argument("--map", type=str, default=get_path("static/maps/map.txt"),
+                        help="Map to plan on")
+    parser.add_argument("--sessions", type=int, default=1000,
+                        help="Number of sessions")
+    parser.add_argument("--releases", type=float, default=0.5,
+                        help="Probability that the user releases the head on the way")
+    parser.add_argument("--wtime", type=int, default=60,
+                        help="Seconds waited for the user before canceling the procedure")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed of the session scripts")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(),
+                        help="Worker processes")
+
+    args = parser.parse_args()
+
+    _load_map(args.map)
+    rooms = sorted(_position_manager.room_mapper.rooms.keys())
+    generator = random.Random(args.seed)
+    jobs = [(random_script(rooms, generator, args.releases), args.wtime) for _ in range(args.sessions)]
+
+    started = time.time()
+    if args.processes > 1:
+        pool = multiprocessing.Pool(args.processes, _load_map, (args.map,))
+        results = pool.map(_run, jobs, chunksize=max(1, len(jobs) // (4 * args.processes)))
+        pool.close()
+        pool.join()
+    else:
+        results = [_run(job) for job in jobs]
+    elapsed = time.time() - started
+
+    outcomes = {}
+    for stats in results:
+        outcome = stats['outcome'] + (" (goal reached)" if stats['reached'] else "")
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    simulated = sum(stats['time'] for stats in results)
+
+    print("[INFO] {0} sessions in {1:.1f} s ({2:.0f} simulated s, {3:.0f}x real time)".format(
+        len(results), elapsed, simulated, simulated / elapsed if elapsed else 0.0))
+    for outcome, count in sorted(outcomes.items()):
+        print("[INFO] \t{0}: {1}".format(outcome, count))
+    walked = [stats for stats in results if stats['reached']]
+    if walked:
+        print("[INFO] Guided sessions: mean {0:.1f} s, {1:.1f} m walked, {2:.0f} NAOqi calls".format(
+            sum(stats['time'] for stats in walked) / len(walked),
+            sum(stats['distance'] for stats in walked) / len(walked),
+            sum(stats['rpcs'] for stats in walked) / float(len(walked))))
@@ -0,0 +1,41 @@
+import argparse
+
+from src.actions.path_follower import path_followers
+from src.actions.position_manager import PositionManager
+from src.simulation.trip import simulate_trip
+from src.utils.paths import get_path
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Walk a route with the simulated Pepper base and report "
+                                                 "trip time and tracking error.")
+    parser.add_argument("--map", type=str, default=get_path("static/maps/map.txt"),
+                        help="Map to plan on")
+    parser.add_argument("--start", type=str, default="Lobby",
+                        help="Start room")
+    parser.add_argument("--end", type=str, default="Office",
+                        help="Target room")
+    parser.add_argument("--profile", type=str, default="deaf",
+                        help="User profile (blind/deaf)")
+    parser.add_argument("--follower", type=str, default="pure_pursuit", choices=sorted(path_followers),
+                        help="Path following controller")
+    parser.add_argument("--noise", type=float, default=0.0,
+                        help="Odometry noise (std per meter / radian)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed of the odometry noise")
+
+    args = parser.parse_args()
+
+    position_manager = PositionManager(args.map, engine='search')
+    stats = simulate_trip(position_manager, args.start, args.end, args.profile, path_followers[args.follower](),
+                          linear_noise=args.noise, angular_noise=args.noise, seed=args.seed)
+
+    if stats is None:
+        print("[INFO] No route from " + args.start + " to " + args.end)
+    else:
+        print("[INFO] Route: " + " -> ".join(room.name for room in position_manager.path))
+        print("[INFO] Goal reached: " + str(stats['reached']) + " (" + str(stats['rooms_reached']) + " rooms)")
+        print("[INFO] Trip time: {0:.1f} s (planned {1:.1f} s), distance {2:.2f} m".format(
+            stats['time'], stats['planned_time'], stats['distance']))
+        print("[INFO] Tracking error: max {0:.3f} m, RMS {1:.3f} m".format(stats['max_error'], stats['rms_error']))
@@ -1,139 +1,319 @@
+import hashlib
+import imp
+import inspect
 import os
+import shutil
+import sys
+import tempfile
 import time
+import types
+
+from ..automaton.scheduler import default_scheduler
+from action_registry import ActionRegistry
+from futures import Executor, Future
+from result_channel import ResultChannel
+from service_proxy import RpcStats, ServiceProxy, rejects_async
+
+
+# ALMemory key of the middle head tactile sensor (1.0 while touched)
+head_middle_touch_key = "Device/SubDeviceList/Head/Touch/Middle/Sensor/Value"
+
+# Seconds the installed behaviors list is trusted before asking ALBehaviorManager again
+installed_behaviors_ttl = 60
+
+# Dialog results are sent by the interactions run on the MODIM server to a port of this address,
+# picked when the action manager starts (0: any free port, so that sessions do not share it) ...
+result_address = ("127.0.0.1", 0)
+
+# ... or written here when nothing listens
+outcome_path = "/home/robot/playground/outcome.txt"
+
+# Helper the interactions report their result with (post_result(value)). The MODIM server runs the
+# code of an interaction on its own: the helper is written in it, with the address of the session
+# and the outcome file as literals
+post_result_template = '''    def post_result(value):
+        import socket
+        value = str(value).strip()
+        address = {address!r}
+        if address is not None:
+            try:
+                connection = socket.create_connection(address, 1)
+                connection.sendall(value)
+                connection.close()
+                return
+            except socket.error:
+                pass
+        with open({outcome_path!r}, 'w') as file:
+            file.write(value)'''
+
+# Interactions reporting a result, formatted with post_result and written for each session
+# (see ActionManager.load_interactions)
+reporting_interactions_template = '''
+def interaction_register_user(self):
+{post_result}
+
+    disability = None
+    language = None
+
+    result = im.ask("record_user", timeout=999)
+    if result == "failure":
+
+        post_result("failure")
 
+        im.init()
 
-class ActionManager:
+    else:
 
-    def __init__(self, session):
+        if result == "touch":
+            disability = "deaf"
+        else:
+            disability = "blind"
 
-        # Set session and services
-        self.session = session
-        self.as_service = session.service("ALAnimatedSpeech")
-        self.bm_service = session.service("ALBehaviorManager")
-        self.ap_service = session.service("ALAnimationPlayer")
-        self.mo_service = session.service("ALMotion")
-        self.me_service = session.service("ALMemory")
-        self.to_service = session.service("ALTouch")
+        result = im.ask("ask_language", timeout=999)
+        if result == "failure":
 
-    def is_head_touched(self):
-        sensors_list = self.to_service.getStatus()
-        middle_touch = [s[1] for s in sensors_list if s[0] == "Head/Touch/Middle"]
-        return middle_touch
+            post_result("failure")
 
-    def get_actions_path(self):
-        return os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../../actions/")
+            im.init()
 
-    def create_custom_greeting(self, user_name, disability):
-        with open(os.path.join(self.get_actions_path(), "custom_greeting"), "w") as file:
-
-            if disability == "blind":  # Blind
-                contenuto = """IMAGE
-                    <*, *, *, *>:  img/hello.png
-                    ----
-                    TEXT
-                    <*,*,it,*>: Accogliendo l'utente... {0}
-                    <*,*,*,*>:  Welcoming the user... {0}
-                    ----
-                    TTS
-                    <*,*,it,*>: Ciao! Benvenuto {0}
-                    <*,*,*,*>:  Hello! Welcome {0}
-                    ----""".format(user_name)
-
-            else:  # Deaf
-                contenuto = """IMAGE
-                    <*, *, *, *>:  img/hello.png
-                    ----
-                    TEXT
-                    <*,*,it,*>: Benvenuto {0}
-                    <*,*,*,*>:  Welcome {0}
-                    ----
-                    GESTURE
-                    <*,*,*,*>: animations/Stand/Gestures/Hey_1
-                    ----""".format(user_name)
-
-            file.write(contenuto)
+        else:
 
-    def check_status(self):
-        with open("/home/robot/playground/outcome.txt", "r") as file:
-            status = file.readline().strip()
-        return str(status).strip()
+            language = result
 
-    def set_profile_en(self):
-        im.setProfile(['*', '*', '*', '*'])
+            post_result(disability + " " + language)
 
-    def set_profile_it(self):
-        # im.init()
-        im.setProfile(['*', '*', 'it', '*'])
 
-    def custom_greeting(self):
-        im.execute("custom_greeting")
-        time.sleep(2)
+def interaction_blind_assist(self):
+{post_result}
+    user_response = im.ask('blind_ask_help', timeout=999)
+    if user_response == 'yes':
+        dest = im.ask('blind_agree', timeout=999)
+        post_result(dest)
+    else:
+        post_result('failure')
 
-    def interaction_register_user(self):
 
-        disability = None
-        language = None
+def blind_agree(self):
+{post_result}
+    q = im.ask('blind_agree', timeout=999)
+    post_result(q)
 
-        result = im.ask("record_user", timeout=999)
-        if result == "failure":
 
-            with open('/home/robot/playground/outcome.txt', 'w') as file:
-                file.write("failure")
+def blind_ask_cancel(self):
+{post_result}
+    q = im.ask('blind_ask_cancel', timeout=999)
+    post_result(q)
 
-            im.init()
 
-        else:
+def blind_ask_call(self):
+{post_result}
+    q = im.ask('blind_ask_call', timeout=999)
+    post_result(q)
+    time.sleep(2)
 
-            if result == "touch":
-                disability = "deaf"
-            else:
-                disability = "blind"
 
-            result = im.ask("ask_language", timeout=999)
-            if result == "failure":
+def interaction_deaf_assist(self):
+{post_result}
+    user_response = im.ask('deaf_ask_help', timeout=999)
+    if user_response == 'yes':
+        dest = im.ask('deaf_agree', timeout=999)
+        post_result(dest)
+    else:
+        post_result('failure')
 
-                with open('/home/robot/playground/outcome.txt', 'w') as file:
-                    file.write("failure")
 
-                im.init()
+def deaf_agree(self):
+{post_result}
+    q = im.ask('deaf_agree', timeout=999)
+    post_result(q)
 
-            else:
 
-                language = result
+def deaf_ask_call(self):
+{post_result}
+    q = im.ask('deaf_ask_call', timeout=999)
+    post_result(q)
+    time.sleep(2)
 
-                with open('/home/robot/playground/outcome.txt', 'w') as file:
-                    file.write(disability + " " + language)
 
-    # ----------------------------- Blind interaction ---------------------------- #
+def record_user(self):
+{post_result}
+    modality = im.ask("record_user", timeout=999)
+    print("MODALITY" + modality)
+    post_result(modality)
 
-    def interaction_blind_assist(self):
-        user_response = im.ask('blind_ask_help', timeout=999)
-        if user_response == 'yes':
-            dest = im.ask('blind_agree', timeout=999)
-            with open('/home/robot/playground/outcome.txt', 'w') as file:
-                file.write(dest)
-        else:
-            with open('/home/robot/playground/outcome.txt', 'w') as file:
-                file.write('failure')
 
-    def blind_agree(self):
-        q = im.ask('blind_agree', timeout=999)
-        with open("/home/robot/playground/outcome.txt", "w") as file:
-            file.write(q)
+def ask_language(self):
+{post_result}
+    modality = im.ask("ask_language", timeout=999)
+    post_result(modality)
+'''
 
-    def blind_disagree(self):
-        im.execute('blind_disagree')
-        time.sleep(2)
+# Interactions greeting the user with the modalities of their greeting action, or its file
+# (see ActionManager.create_custom_greeting)
+custom_greeting_template = '''
+def custom_greeting(self):
+    for modality, interaction in {modalities!r}:
+        im.executeModality(modality, interaction)
+    time.sleep(2)
+'''
+
+custom_greeting_file_template = '''
+def custom_greeting_file(self):
+    im.execute({action!r})
+    time.sleep(2)
+'''
+
+# Seconds check_status waits for a result to come through the result channel
+result_timeout = 1.0
+
+
+class ActionManager:
+
+    def __init__(self, session, outcome_path=outcome_path, result_address=result_address, action_files=False):
 
-    def blind_ask_cancel(self):
-        q = im.ask('blind_ask_cancel', timeout=999)
-        with open("/home/robot/playground/outcome.txt","w") as file:
-            file.write(q)
+        # Set session and services, all calls go through proxies counting RPCs per call site
+        self.session = session
+        self.rpc_stats = RpcStats()
+        self.as_service = ServiceProxy(session, "ALAnimatedSpeech", stats=self.rpc_stats)
+        self.bm_service = ServiceProxy(session, "ALBehaviorManager", stats=self.rpc_stats,
+                                       cached={'getInstalledBehaviors': installed_behaviors_ttl})
+        self.ap_service = ServiceProxy(session, "ALAnimationPlayer", stats=self.rpc_stats)
+        self.mo_service = ServiceProxy(session, "ALMotion", stats=self.rpc_stats)
+        self.me_service = ServiceProxy(session, "ALMemory", stats=self.rpc_stats)
+        self.to_service = ServiceProxy(session, "ALTouch", stats=self.rpc_stats)
+
+        # Runs the calls of methods that cannot return qi futures
+        self.executor = Executor()
+
+        # Dialog results: in memory through the result channel, the outcome file as a fallback
+        self.outcome_path = outcome_path
+        self.results = ResultChannel()
+        self.listening = result_address is not None and self.results.listen(result_address)
+
+        # Per user actions, written to the actions folder only if MODIM reads them from there
+        self.actions = ActionRegistry(self.get_actions_path())
+        self.action_files = action_files
+
+        # Interactions reporting a result, written with post_result for this session
+        self.interactions_path = tempfile.mkdtemp(prefix='interactions_')
+        self.interactions = {}
+        post_result = post_result_template.format(address=self.results.address, outcome_path=self.outcome_path)
+        module = self.load_interactions(reporting_interactions_template.format(post_result=post_result))
+        for name, function in inspect.getmembers(module, inspect.isfunction):
+            setattr(self, name, types.MethodType(function, self))
+
+    def load_interactions(self, source):
+        """
+        Module of the interactions in source, written to the interactions folder of the session
+        (ModimWSClient ships the code of an interaction read from its file) and imported once.
+        """
+        name = 'interactions_' + hashlib.md5(source.encode('utf-8')).hexdigest()[:12]
+        module = self.interactions.get(name)
+        if module is None:
+            path = os.path.join(self.interactions_path, name + '.py')
+            with open(path, 'w') as f:
+                f.write(source)
+            module = self.interactions[name] = imp.load_source(name, path)
+        return module
+
+    def close(self):
+        """
+        Stop listening for results and remove the interactions and action files written for the
+        session.
+        """
+        self.results.close()
+        self.actions.close()
+        shutil.rmtree(self.interactions_path, ignore_errors=True)
+
+    def call_async(self, service, method, *args, **kwargs):
+        """
+        Start service.method(*args) (service being an attribute name, e.g. 'mo_service') and
+        return a Future without waiting for it. With timeout (s), the call is cancelled if it
+        has not completed in time.
+        """
+        timeout = kwargs.pop('timeout', None)
+        proxy = getattr(self, service)
+        call_site = ServiceProxy.call_site(sys._getframe(1))
+        name = service + "." + method
+
+        try:
+            future = Future.from_qi(proxy.call(method, call_site, args, {'_async': True}), name)
+        except TypeError as e:
+            # Not a qi method (e.g. a simulated service): run it on the executor. Other type
+            # errors come from a call that already ran, it must not run twice
+            if not rejects_async(e):
+                raise
+            future = self.executor.submit(proxy.call, method, call_site, args, {})
+            future.name = name
+
+        if timeout is not None and not future.done():
+            scheduler = default_scheduler()
+            timer = scheduler.schedule(timeout, future.cancel)
+            future.add_done_callback(lambda _: scheduler.cancel(timer))
+        return future
+
+    def is_head_touched(self):
+        # One memory read instead of fetching and scanning the status of every touch sensor
+        return [self.me_service.getData(head_middle_touch_key) > 0.5]
+
+    def read_memory(self, keys):
+        """
+        Values of several ALMemory keys in a single call.
+        """
+        return dict(zip(keys, self.me_service.getListData(keys)))
+
+    def report_rpcs(self):
+        print("[INFO] NAOqi calls: " + str(self.rpc_stats.total()))
+        for line in self.rpc_stats.report():
+            print("[INFO] \t" + line)
+
+    def get_actions_path(self):
+        return os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../../actions/")
+
+    def create_custom_greeting(self, user_name, disability, language='en'):
+        """
+        Interaction greeting the user with their custom greeting action, rendered in memory and
+        run modality by modality. For MODIM backends reading the actions from files (action_files),
+        the action file of the user is written instead, only when it changes, and executed.
+        """
+        if self.action_files:
+            path = self.actions.materialize('custom_greeting', user_name, disability)
+            module = self.load_interactions(custom_greeting_file_template.format(action=os.path.basename(path)))
+            return types.MethodType(module.custom_greeting_file, self)
+        modalities = self.actions.modalities('custom_greeting', user_name, disability, language)
+        module = self.load_interactions(custom_greeting_template.format(modalities=modalities))
+        return types.MethodType(module.custom_greeting, self)
+
+    def run_dialog(self, modim_web_server, interaction):
+        """
+        Run an interaction reporting a result, and return the result.
+        """
+        self.results.expect()
+        modim_web_server.run_interaction(interaction)
+        return self.check_status()
+
+    def check_status(self):
+        """
+        Result of the last interaction: from the result channel, or read from the outcome file if
+        none came through it.
+        """
+        status = self.results.take(result_timeout if self.listening else None)
+        if status is None:
+            with open(self.outcome_path, "r") as file:
+                status = file.readline().strip()
+        return str(status).strip()
+
+    def set_profile_en(self):
+        im.setProfile(['*', '*', '*', '*'])
+
+    def set_profile_it(self):
+        # im.init()
+        im.setProfile(['*', '*', 'it', '*'])
+
+    # ----------------------------- Blind interaction ---------------------------- #
 
-    def blind_ask_call(self):
-        q = im.ask('blind_ask_call', timeout=999)
-        with open("/home/robot/playground/outcome.txt", "w") as file:
-            file.write(q)
+    def blind_disagree(self):
+        im.execute('blind_disagree')
         time.sleep(2)
 
     def blind_call(self):
@@ -151,21 +331,6 @@ class ActionManager:
 
     # ----------------------------- Deaf interaction ----------------------------- #
 
-    def interaction_deaf_assist(self):
-        user_response = im.ask('deaf_ask_help', timeout=999)
-        if user_response == 'yes':
-            dest = im.ask('deaf_agree', timeout=999)
-            with open('/home/robot/playground/outcome.txt', 'w') as file:
-                file.write(dest)
-        else:
-            with open('/home/robot/playground/outcome.txt', 'w') as file:
-                file.write('failure')
-
-    def deaf_agree(self):
-        q = im.ask('deaf_agree', timeout=999)
-        with open("/home/robot/playground/outcome.txt", "w") as file:
-            file.write(q)
-
     def deaf_disagree(self):
         im.execute('deaf_disagree')
         time.sleep(2)
@@ -179,12 +344,6 @@ class ActionManager:
         #     with open("/home/robot/playground/outcome.txt","w") as file:
         #         file.write('failure')
 
-    def deaf_ask_call(self):
-        q = im.ask('deaf_ask_call', timeout=999)
-        with open("/home/robot/playground/outcome.txt", "w") as file:
-            file.write(q)
-        time.sleep(2)
-
     def deaf_call(self):
         im.execute('deaf_call')
         time.sleep(10)
@@ -206,17 +365,6 @@ class ActionManager:
     def failure(self):
         im.init()
 
-    def record_user(self):
-        modality = im.ask("record_user", timeout=999)
-        print("MODALITY" + modality)
-        with open("/home/robot/playground/outcome.txt","w") as file:
-                file.write(str(modality).strip())
-
-    def ask_language(self):
-        modality = im.ask("ask_language", timeout=999)
-        with open("/home/robot/playground/outcome.txt","w") as file:
-                file.write(str(modality).strip())
-
     def stop_motion(self):
         try:
             self.mo_service.stopMove()
@@ -0,0 +1,136 @@
+import collections
+import hashlib
+import os
+import tempfile
+
+
+# MODIM action templates, by action name and disability ('*' for any), formatted with the user name.
+# The language lines of the actions are picked from the profile (<*,*,language,*>) when they are run
+action_templates = {
+    'custom_greeting': {
+        'blind': """IMAGE
+<*, *, *, *>:  img/hello.png
+----
+TEXT
+<*,*,it,*>: Accogliendo l'utente... {user_name}
+<*,*,*,*>:  Welcoming the user... {user_name}
+----
+TTS
+<*,*,it,*>: Ciao! Benvenuto {user_name}
+<*,*,*,*>:  Hello! Welcome {user_name}
+----
+""",
+        '*': """IMAGE
+<*, *, *, *>:  img/hello.png
+----
+TEXT
+<*,*,it,*>: Benvenuto {user_name}
+<*,*,*,*>:  Welcome {user_name}
+----
+GESTURE
+<*,*,*,*>: animations/Stand/Gestures/Hey_1
+----
+""",
+    },
+}
+
+
+class ActionRegistry(object):
+    """
+    Per user MODIM actions rendered from action_templates, kept in memory in an LRU cache of
+    capacity (name, user name, disability) entries and served as the modalities to execute.
+    Files are only written for MODIM backends that read the actions from actions_path: one per
+    user, only when their content changes, and removed when the user leaves the cache.
+    """
+
+    def __init__(self, actions_path, templates=None, capacity=32):
+        self.actions_path = actions_path
+        self.templates = templates or action_templates
+        self.capacity = capacity
+        self.cache = collections.OrderedDict()
+        self.files = {}  # Cache key -> path of the action file written for it
+        self.renders = 0
+        self.writes = 0
+
+    def render(self, name, user_name, disability):
+        """
+        Text of the action for a user.
+        """
+        key = (name, user_name, disability)
+        text = self.cache.pop(key, None)
+        if text is None:
+            templates = self.templates[name]
+            template = templates.get(disability, templates.get('*'))
+            if template is None:
+                raise ValueError("No " + name + " action for disability " + str(disability))
+            text = template.format(user_name=user_name, disability=disability)
+            self.renders += 1
+            if len(self.cache) >= self.capacity:
+                self.remove_file(self.cache.popitem(last=False)[0])
+        self.cache[key] = text
+        return text
+
+    def modalities(self, name, user_name, disability, language):
+        """
+        (modality, value) pairs of the action for a user, as MODIM runs it with the profile
+        ['*', '*', language, '*']: per modality, the first line of a matching profile.
+        """
+        profile = ['*', '*', language, '*']
+        modalities = []
+        for section in self.render(name, user_name, disability).split('----'):
+            lines = [line.strip() for line in section.strip().splitlines()]
+            if not lines:
+                continue
+            for line in lines[1:]:
+                line_profile, value = line.split(':', 1)
+                fields = [field.strip() for field in line_profile.strip('<>').split(',')]
+                if all(field in ('*', wanted) for field, wanted in zip(fields, profile)):
+                    modalities.append((lines[0], value.strip()))
+                    break
+        return modalities
+
+    def materialize(self, name, user_name, disability):
+        """
+        Make the action file of a user current for MODIM: named after the user, so that users
+        greeted at the same time do not share it, written atomically (another process never
+        reads half of it), and left alone if it already holds the same action.
+        Returns the file path.
+        """
+        key = (name, user_name, disability)
+        text = self.render(*key)
+        user = hashlib.md5(repr((user_name, disability)).encode('utf-8')).hexdigest()[:12]
+        path = self.files[key] = os.path.join(self.actions_path, name + '_' + user)
+        try:
+            with open(path, 'r') as f:
+                if f.read() == text:
+                    return path
+        except (IOError, OSError):
+            pass
+
+        # Staged next to the actions folder (same file system, not served as an action)
+        staging_path = os.path.dirname(os.path.normpath(self.actions_path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.' + name + '_', suffix='.tmp', dir=staging_path)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            os.rename(tmp_path, path)
+        except (IOError, OSError):
+            os.remove(tmp_path)
+            raise
+        self.writes += 1
+        return path
+
+    def remove_file(self, key):
+        path = self.files.pop(key, None)
+        if path is not None:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self):
+        """
+        Remove the action files written for the cached users.
+        """
+        for key in list(self.files):
+            self.remove_file(key)
@@ -0,0 +1,137 @@
+import threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+
+# qi.Future.wait timeout meaning "no timeout" (ms)
+QI_INFINITE = 0x7fffffff
+
+
+class CallTimeout(Exception):
+    pass
+
+
+class CallCancelled(Exception):
+    pass
+
+
+class Future(object):
+    """
+    Result of an asynchronous NAOqi call, either backed by a qi future (_async=True) or
+    completed by a local Executor. Results are joined with result() / wait() only where
+    they are needed; cancel() also cancels the underlying qi call.
+    """
+
+    def __init__(self, name=None, source=None):
+        self.name = name
+        self.source = source  # qi future, if any
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.callbacks = []
+        self._value = None
+        self._error = None
+
+    @classmethod
+    def from_qi(cls, qi_future, name=None):
+        future = cls(name, qi_future)
+        qi_future.addCallback(future._sync)
+        return future
+
+    def _sync(self, qi_future):
+        if qi_future.isCanceled():
+            self._finish(error=CallCancelled(self.name))
+        elif qi_future.hasError():
+            self._finish(error=RuntimeError(qi_future.error()))
+        else:
+            self._finish(value=qi_future.value())
+
+    def _finish(self, value=None, error=None):
+        with self.lock:
+            if self.event.is_set():
+                return False
+            self._value, self._error = value, error
+            self.event.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback(self)
+        return True
+
+    def set_result(self, value):
+        return self._finish(value=value)
+
+    def set_error(self, error):
+        return self._finish(error=error)
+
+    def done(self):
+        return self.event.is_set()
+
+    def cancelled(self):
+        return isinstance(self._error, CallCancelled)
+
+    def cancel(self):
+        """
+        Cancel the call if it is still running. Returns False if it already completed.
+        """
+        if self.source is not None and not self.done():
+            self.source.cancel()
+        return self._finish(error=CallCancelled(self.name))
+
+    def wait(self, timeout=None):
+        """
+        Wait up to timeout seconds (forever if None), returns True if the call completed.
+        """
+        if self.source is not None and not self.done():
+            self.source.wait(QI_INFINITE if timeout is None else int(timeout * 1000))
+            if self.source.isFinished():
+                self._sync(self.source)
+            return self.done()
+        return self.event.wait(timeout) or self.done()
+
+    def result(self, timeout=None):
+        if not self.wait(timeout):
+            raise CallTimeout(str(self.name) + " did not complete in " + str(timeout) + " s")
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def add_done_callback(self, callback):
+        with self.lock:
+            if not self.event.is_set():
+                self.callbacks.append(callback)
+                return
+        callback(self)
+
+
+class Executor(object):
+    """
+    Runs calls one at a time, in submission order, on a worker thread. Used for services
+    whose methods cannot return qi futures; calls cancelled before starting are skipped.
+    """
+
+    def __init__(self):
+        self.calls = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, function, *args, **kwargs):
+        future = Future(getattr(function, '__name__', None))
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run)
+                self.thread.setDaemon(True)
+                self.thread.start()
+        self.calls.put((future, function, args, kwargs))
+        return future
+
+    def _run(self):
+        while True:
+            future, function, args, kwargs = self.calls.get()
+            if future.done():
+                continue  # Cancelled while queued
+            try:
+                future.set_result(function(*args, **kwargs))
+            except Exception as e:
+                future.set_error(e)
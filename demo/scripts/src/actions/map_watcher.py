@@ -0,0 +1,75 @@
+import os
+import threading
+
+from ..map.map_loader import MapFormatError
+from ..map.route_table import file_digest
+
+
+class MapWatcher(object):
+    """
+    Polls the map file of a position manager and hot-reloads it when its content changes,
+    e.g. when a corridor is closed, without restarting the guided session.
+    Modification times are checked first so an unchanged map is never read.
+    """
+
+    def __init__(self, position_manager, interval=1.0):
+        self.position_manager = position_manager
+        self.interval = interval
+
+        path = position_manager.map_path
+        self.mtime = os.path.getmtime(path)
+        self.digest = file_digest(path)
+        self.rejected_digest = None  # Content that failed to load, not retried until it changes
+
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def check(self):
+        """
+        Reload the map if it changed since the last check. Returns True if it was reloaded.
+        A map that cannot be parsed is reported and the current one is kept; the cached state
+        only moves on once a reload succeeds, so a fix is picked up even with the same mtime.
+        """
+        path = self.position_manager.map_path
+        try:
+            mtime = os.path.getmtime(path)
+            if mtime == self.mtime:
+                return False
+            digest = file_digest(path)
+        except (IOError, OSError) as e:
+            print("[WARN] Unable to read map " + path + ": " + str(e))
+            return False
+
+        if digest == self.digest:
+            self.mtime = mtime
+            return False  # Touched but not modified
+        if digest == self.rejected_digest:
+            return False
+
+        print("[INFO] Map changed, reloading " + path)
+        try:
+            self.position_manager.reload_map()
+        except (MapFormatError, IOError, OSError, ValueError) as e:
+            print("[WARN] Keeping the current map: " + str(e))
+            self.rejected_digest = digest
+            return False
+
+        self.mtime, self.digest = mtime, digest
+        self.rejected_digest = None
+        return True
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.check()
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
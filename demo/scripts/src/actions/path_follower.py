@@ -0,0 +1,76 @@
+import math
+
+from ..map.trajectory import normalize_angle
+
+
+class PathFollower(object):
+    """
+    Turns the robot pose (in map coordinates) and its progress along a Trajectory into a
+    velocity command (forward speed in m/s, turn rate in rad/s). Subclasses implement steering,
+    the forward speed always follows the trajectory's speed profile.
+    """
+
+    def __init__(self, max_turn_rate=1.0):
+        self.max_turn_rate = max_turn_rate
+
+    def command(self, trajectory, segment, x, y, theta):
+        raise NotImplementedError
+
+    def _limit(self, turn_rate):
+        return max(-self.max_turn_rate, min(self.max_turn_rate, turn_rate))
+
+
+class HeadingFollower(PathFollower):
+    """
+    Proportional control on the bearing of the end of the current segment: simple, but drift
+    is only corrected by aiming at the next room, so corners are cut late and sharply.
+    """
+
+    def __init__(self, gain=1.5, max_turn_rate=1.0):
+        super(HeadingFollower, self).__init__(max_turn_rate)
+        self.gain = gain
+
+    def command(self, trajectory, segment, x, y, theta):
+        speed = trajectory.speed(segment, trajectory.progress(segment, x, y))
+        bearing = math.atan2(trajectory.ys[segment + 1] - y, trajectory.xs[segment + 1] - x)
+        heading_error = normalize_angle(bearing - theta)
+
+        # Turn in place while facing away from the next room
+        if abs(heading_error) >= math.pi / 2:
+            speed = 0.0
+        return speed, self._limit(self.gain * heading_error)
+
+
+class PurePursuitFollower(PathFollower):
+    """
+    Pure pursuit: steer along the circular arc through the point lookahead meters further
+    along the route, which also pulls the robot back onto the path after drifting.
+    """
+
+    def __init__(self, lookahead=0.5, max_turn_rate=1.0):
+        super(PurePursuitFollower, self).__init__(max_turn_rate)
+        self.lookahead = lookahead
+
+    def command(self, trajectory, segment, x, y, theta):
+        s = trajectory.progress(segment, x, y)
+        speed = trajectory.speed(segment, s)
+        goal_x, goal_y, _ = trajectory.position(trajectory.starts[segment] + s + self.lookahead)
+
+        distance = math.hypot(goal_x - x, goal_y - y)
+        if distance < 1e-6:
+            return speed, 0.0
+        alpha = normalize_angle(math.atan2(goal_y - y, goal_x - x) - theta)
+
+        # Turn in place while the lookahead point is behind
+        if abs(alpha) >= math.pi / 2:
+            return 0.0, self._limit(2 * alpha)
+
+        # Arc through the lookahead point, curvature 2 sin(alpha) / distance
+        turn_rate = speed * 2 * math.sin(alpha) / distance
+        return speed, self._limit(turn_rate)
+
+
+path_followers = {
+    'heading': HeadingFollower,
+    'pure_pursuit': PurePursuitFollower
+}
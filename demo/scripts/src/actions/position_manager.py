@@ -1,10 +1,85 @@
+import math
+import os
+import threading
+
 from ..map.room_mapper import RoomMapper
+from ..map.route_table import RouteTable
+from ..map.contraction import ContractionHierarchy
+from ..map.dstar_lite import DStarLite
+from ..map.pareto import ParetoRouter
+from ..map.map_diff import diff_edges, same_rooms
+from ..map.trajectory import Trajectory
+from trip_progress import TripProgress
+
+# Maximum accessibility weight each user profile can traverse
+accessibility_levels = {
+    'blind': 0,
+    'deaf': 1
+}
+default_accessibility_level = 1
+
+# Extra distance each user profile accepts to avoid one barrier, used to choose among Pareto routes
+barrier_penalties = {
+    'blind': float('inf'),
+    'deaf': 0
+}
+
+# Speed limits of each user profile while guiding: (maximum speed in m/s, acceleration in m/s^2)
+speed_limits = {
+    'blind': (0.25, 0.2),
+    'deaf': (0.35, 0.3)
+}
+default_speed_limit = (0.3, 0.25)
+
+# Routing engines:
+# - 'search': A* on the compiled graph at every query
+# - 'table': precomputed all-pairs route tables, cached on disk (small maps)
+# - 'ch': contraction hierarchies built at startup (very large maps)
+routing_engines = ('search', 'table', 'ch')
 
 
 class PositionManager:
-    def __init__(self, map_path):
-        self.room_mapper = RoomMapper.from_file(map_path)
+    def __init__(self, map_path, cache_dir=None, engine='table'):
+        if engine not in routing_engines:
+            raise ValueError("Invalid routing engine: " + str(engine))
+
+        self.map_path = map_path
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(map_path)), 'cache')
+        self.room_mapper = RoomMapper.open(map_path)
+        self.engine = engine
         self.path = []
+        self.path_version = 0  # Bumped whenever self.path is replaced during a trip
+        self.trajectory = None  # self.path compiled for the motion control loop
+        self.progress = None  # TripProgress along self.trajectory, kept across walk interruptions
+        self.profile = None  # User profile of the trip, sets the speed limits
+
+        # Runtime edge changes (closed doors, elevators out of service) and the trip planner repairing around them,
+        # only created once the trip meets a change since its initial search costs more than a routing query
+        self.edge_overrides = {}
+        self.planner = None
+        self.trip_level = None  # Accessibility level the trip is planned for
+        self.trip_goal = None  # Last room of the trip, kept when no route to it is left
+        self.visited = []  # Rooms of the trip up to the one the robot is in, to replan from when no route is left
+        self.lock = threading.Lock()
+
+        # Odometry pose (x, y, theta) matching the start room, and the map heading at that moment
+        self.odometry_origin = None
+        self.map_origin = None
+
+        levels = sorted(set(accessibility_levels.values()) | {default_accessibility_level})
+
+        # Precomputed all-pairs routes, one memory mapped table per accessibility level
+        self.route_tables = {}
+        if engine == 'table':
+            for level in levels:
+                self.route_tables[level] = RouteTable.load_or_build(
+                    self.room_mapper.compact, level, map_path, self.cache_dir)
+
+        # One hierarchy per accessibility level, built over the edges that level may traverse
+        self.hierarchies = {}
+        if engine == 'ch':
+            for level in levels:
+                self.hierarchies[level] = ContractionHierarchy.build(self.room_mapper.compact, level)
 
         self.current_node_index = 0
         self.current_room = None
@@ -14,23 +89,250 @@ class PositionManager:
         return room in self.room_mapper.rooms.keys()
 
     def compute_path(self, start_room, end_room, accessibility_level):
-        print("pre[INFO]"+ accessibility_level)
+        self.profile = accessibility_level
+        accessibility_level = accessibility_levels.get(accessibility_level, default_accessibility_level)
+        compact = self.room_mapper.compact
+        if compact.node_id(start_room) is None or compact.node_id(end_room) is None:
+            return []
 
-        if accessibility_level=="blind":
-            accessibility_level = 0
-        else:
-            accessibility_level = 1
-        print("post[INFO]"+ str(accessibility_level))
-        path_len, path = self.room_mapper.shortest_path(start_room, end_room, accessibility_level)
-        if path_len == float('inf'):
+        with self.lock:
+            planner = None
+            if self.edge_overrides:
+                # Precomputed engines ignore runtime changes, use the planner instead
+                planner = DStarLite(compact, compact.node_id(end_room), compact.node_id(start_room),
+                                    accessibility_level, self._override_ids())
+                path_len, path = planner.replan()
+                path = [compact.nodes[i] for i in path]
+            elif accessibility_level in self.route_tables:
+                path_len, path = self.route_tables[accessibility_level].path(start_room, end_room)
+            elif accessibility_level in self.hierarchies:
+                path_len, path = self.hierarchies[accessibility_level].shortest_path(start_room, end_room)
+            else:
+                path_len, path = self.room_mapper.shortest_path(start_room, end_room, accessibility_level)
+            if path_len == float('inf'):
+                return []
+            self._start_trip([self.room_mapper.rooms[node] for node in path], accessibility_level, planner)
+
+        return self.path
+
+    def compute_route_options(self, start_room, end_room, severity=False):
+        """
+        All Pareto optimal (distance, barrier cost, [rooms]) trade-offs between two rooms, in one search.
+        Barrier cost counts edges above level 0, or sums their accessibility weights if severity is set.
+        Runtime changes (set_edge_weight, block_edge) apply.
+        """
+        with self.lock:
+            router = ParetoRouter(self.room_mapper.compact, severity, self._override_ids())
+        return [(distance, barriers, [self.room_mapper.rooms[node] for node in path])
+                for distance, barriers, path in router.frontier(start_room, end_room)]
+
+    def compute_preferred_path(self, start_room, end_room, disability, barrier_penalty=None, severity=False):
+        """
+        Like compute_path, but picks the route minimizing distance + barrier_penalty * barrier cost
+        (the profile default from barrier_penalties if not given) instead of applying a hard cutoff.
+        """
+        if barrier_penalty is None:
+            barrier_penalty = barrier_penalties.get(disability, 0)
+
+        route = ParetoRouter.choose(self.compute_route_options(start_room, end_room, severity), barrier_penalty)
+        if route is None:
             return []
-        self.path = [self.room_mapper.rooms[node] for node in path]
 
-        self.current_room = self.path[self.current_node_index]
-        self.next_room = self.path[self.current_node_index + 1]  # At least two nodes
+        # Repairs may use the barriers the chosen route already takes, not only those of the profile
+        accessibility_level = max(accessibility_levels.get(disability, default_accessibility_level),
+                                  self._route_level(route[2]))
+
+        with self.lock:
+            self.profile = disability
+            self._start_trip(route[2], accessibility_level)
 
         return self.path
 
+    def _route_level(self, path):
+        """
+        Accessibility level a route needs: the highest of the cheapest edges between its rooms.
+        """
+        compact = self.room_mapper.compact
+        level = 0
+        for room1, room2 in zip(path, path[1:]):
+            v = compact.node_id(room2)
+            level = max(level, min(accessibility for target, _, accessibility in compact.edges(compact.node_id(room1))
+                                   if target == v))
+        return level
+
+    def _start_trip(self, path, accessibility_level, planner=None):
+        """
+        Make path the current trip, from its first room: fresh trajectory, progress and odometry
+        anchor, and a planner (if given, otherwise created on the first runtime change) for the new goal.
+        """
+        self.path = path
+        self.path_version += 1
+        self.trip_level = accessibility_level
+        self.planner = planner
+        self.trip_goal = path[-1]
+        self.visited = path[:1]
+        self.current_node_index = 0
+        self._compile_trajectory()
+        self.progress = TripProgress(self.trajectory)
+        self.odometry_origin = None
+
+        self.current_room = self.path[self.current_node_index]
+        self.next_room = self.path[self.current_node_index + 1] if len(self.path) > 1 else None
+
+    # ------------------------------ Runtime changes ----------------------------- #
+
+    def _override_ids(self):
+        compact = self.room_mapper.compact
+        return dict(((compact.node_id(room1), compact.node_id(room2)), weight)
+                    for (room1, room2), weight in self.edge_overrides.items())
+
+    def _is_connected(self, room1, room2):
+        compact = self.room_mapper.compact
+        u, v = compact.node_id(room1), compact.node_id(room2)
+        return u is not None and v is not None and any(target == v for target, _, _ in compact.edges(u))
+
+    def _visited(self):
+        """
+        Rooms of the trip up to the one the robot is in, those of the last route if none is left.
+        """
+        if self.path:
+            self.visited = self.path[:min(self.current_node_index, len(self.path) - 1) + 1]
+        return self.visited
+
+    def _trip_planner(self):
+        """
+        D* Lite planner of the current trip from the room the robot is in, created on first use.
+        """
+        if self.planner is None and self.trip_goal is not None:
+            compact = self.room_mapper.compact
+            self.planner = DStarLite(compact, compact.node_id(self.trip_goal.name),
+                                     compact.node_id(self._visited()[-1].name), self.trip_level,
+                                     self._override_ids())
+        return self.planner
+
+    def set_edge_weight(self, room1, room2, weight):
+        """
+        Change the cost of an existing connection between two rooms (both ways on undirected maps)
+        and repair the current trip from the room the robot is in. The accessibility of the
+        connection is unchanged. Returns the repaired path, empty if the goal is no longer reachable.
+        """
+        if not self._is_connected(room1, room2):
+            raise ValueError("Invalid connection: " + str(room1) + " - " + str(room2))
+
+        changes = [(room1, room2)]
+        if not self.room_mapper.directed:
+            changes.append((room2, room1))
+
+        with self.lock:
+            compact = self.room_mapper.compact
+            planner = self._trip_planner()
+            for u, v in changes:
+                self.edge_overrides[(u, v)] = weight
+                if planner is not None:
+                    planner.update_edge(compact.node_id(u), compact.node_id(v), weight)
+
+            if planner is not None:
+                self._repair()
+            return self.path
+
+    def block_edge(self, room1, room2):
+        return self.set_edge_weight(room1, room2, float('inf'))
+
+    def clear_edge_overrides(self):
+        with self.lock:
+            self.edge_overrides.clear()
+
+    def _repair(self):
+        """
+        Replan the rest of the trip from the room the robot is in, or from where the trip stopped
+        if no route was left (a reopened connection brings it back).
+        """
+        compact = self.room_mapper.compact
+        visited = self._visited()
+        current_index = len(visited) - 1
+
+        self.planner.move_to(compact.node_id(visited[-1].name))
+        path_len, path = self.planner.replan()
+
+        if path_len == float('inf'):
+            if not self.path:
+                return
+            print("[INFO] No route left to " + str(self.trip_goal))
+            self.path = []
+        else:
+            # Keep the rooms already visited, replace the remaining route
+            path = visited[:-1] + [self.room_mapper.rooms[compact.nodes[i]] for i in path]
+            if [room.name for room in path] == [room.name for room in self.path]:
+                self.path[current_index:] = path[current_index:]  # Same route, rooms from the current map
+                self.current_room = self.path[current_index]
+                self.next_room = self.path[current_index + 1] if current_index + 1 < len(self.path) else None
+                self._compile_trajectory()
+                return
+            self.path = path
+            self.current_room = self.path[current_index]
+            self.next_room = self.path[current_index + 1] if current_index + 1 < len(self.path) else None
+        self.path_version += 1
+        self._compile_trajectory()
+
+    def _compile_trajectory(self):
+        max_speed, acceleration = speed_limits.get(self.profile, default_speed_limit)
+        self.trajectory = Trajectory(self.path, max_speed, acceleration) if self.path else None
+        if self.progress is not None:
+            self.progress.follow(self.trajectory)
+
+    # -------------------------------- Map reload -------------------------------- #
+
+    def reload_map(self, room_mapper=None):
+        """
+        Swap in a new version of the map (read again from map_path if not given) during a trip.
+        Only the route table rows, contraction hierarchies and cached distances that the changed
+        edges can affect are recomputed; the current trip is replanned from the room the robot is in.
+        """
+        room_mapper = room_mapper or RoomMapper.open(self.map_path)
+        old_compact, compact = self.room_mapper.compact, room_mapper.compact
+        rooms_kept = same_rooms(old_compact, compact)
+
+        # Rebuild outside the lock, queries keep using the current map meanwhile
+        route_tables = {}
+        hierarchies = dict(self.hierarchies)
+        for level in set(self.route_tables) | set(self.hierarchies):
+            changes = diff_edges(old_compact, compact, level) if rooms_kept else None
+            if level in self.route_tables:
+                route_tables[level] = RouteTable.refresh(
+                    self.route_tables[level], compact, level, changes or [], self.map_path, self.cache_dir)
+            if level in self.hierarchies and (changes is None or changes):
+                print("[INFO] Rebuilding contraction hierarchy for accessibility level " + str(level))
+                hierarchies[level] = ContractionHierarchy.build(compact, level)
+        kept = room_mapper.adopt_distances(self.room_mapper)
+        print("[INFO] Kept " + str(kept) + "/" + str(len(self.room_mapper.distance_cache)) + " cached distance vectors")
+
+        with self.lock:
+            old_tables = self.route_tables
+            self.room_mapper = room_mapper
+            self.route_tables = route_tables
+            self.hierarchies = hierarchies
+
+            # Runtime changes only survive if the connection is still on the map
+            for room1, room2 in list(self.edge_overrides):
+                if not self._is_connected(room1, room2):
+                    del self.edge_overrides[(room1, room2)]
+
+            self.planner = None
+            if self.trip_goal is not None:
+                if not self.is_valid(self._visited()[-1].name) or not self.is_valid(self.trip_goal.name):
+                    print("[WARN] Current trip rooms removed from the map")
+                    self.path = []
+                    self.path_version += 1
+                    self.trip_goal = None
+                    self.trajectory = None
+                    self.progress = None
+                else:
+                    self._trip_planner()
+                    self._repair()
+
+        for table in old_tables.values():
+            table.close()
+
     def get_current_room(self):
         if len(self.path) == 0:
             raise ValueError('Path is empty')
@@ -41,17 +343,64 @@ class PositionManager:
             raise ValueError('Path is empty')
         return self.next_room
 
+    # --------------------------------- Odometry --------------------------------- #
+
+    def set_odometry_origin(self, odom_x, odom_y, odom_theta):
+        """
+        Anchor the odometry frame to the map: the robot stands in the current room, facing the next one.
+        """
+        room = self.current_room
+        heading = 0.0
+        if self.next_room is not None:
+            heading = math.atan2(self.next_room.y - room.y, self.next_room.x - room.x)
+        self.odometry_origin = (odom_x, odom_y, odom_theta)
+        self.map_origin = (room.x, room.y, heading)
+
+    def to_map(self, odom_x, odom_y):
+        """
+        Convert an odometry position (ALMotion.getRobotPosition) into map coordinates.
+        """
+        if self.odometry_origin is None:
+            raise ValueError('Odometry origin not set')
+        ox, oy, otheta = self.odometry_origin
+        mx, my, mtheta = self.map_origin
+        rotation = mtheta - otheta
+        dx, dy = odom_x - ox, odom_y - oy
+        return (mx + dx * math.cos(rotation) - dy * math.sin(rotation),
+                my + dx * math.sin(rotation) + dy * math.cos(rotation))
+
+    def to_map_heading(self, odom_theta):
+        """
+        Convert an odometry heading into a map heading.
+        """
+        if self.odometry_origin is None:
+            raise ValueError('Odometry origin not set')
+        return odom_theta + self.map_origin[2] - self.odometry_origin[2]
+
+    def locate(self, odom_x, odom_y, radius):
+        """
+        Room within radius of the robot odometry position, None while between rooms.
+        """
+        map_x, map_y = self.to_map(odom_x, odom_y)
+        return self.room_mapper.nearest_room(map_x, map_y, radius)[0]
+
     def next(self):
-        if self.current_node_index < len(self.path):
-            self.current_room = self.next_room
+        if self.current_node_index < len(self.path) - 1:
             self.current_node_index += 1
-            self.next_room = self.path[self.current_node_index]
+            self.current_room = self.path[self.current_node_index]
+            self.next_room = self.path[self.current_node_index + 1] if self.current_node_index + 1 < len(self.path) else None
+            if self.progress is not None:
+                self.progress.advance()
             return self.current_room
         else:
             return None
 
     def is_path_complete(self):
-        return self.current_node_index >= len(self.path)
+        """
+        Whether the last room of the path was reached (an empty path has nothing left to walk).
+        """
+        return self.current_node_index >= len(self.path) - 1
 
     def reset(self):
-        self.current_node_index = 0
\ No newline at end of file
+        self.current_node_index = 0
+        self.progress = None
\ No newline at end of file
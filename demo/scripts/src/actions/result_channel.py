@@ -0,0 +1,106 @@
+import select
+import socket
+import threading
+
+from futures import Future
+
+
+class ResultChannel(object):
+    """
+    Dialog results of the interactions, handed over in memory instead of through the outcome
+    file: each interaction run gets a Future (expect()), completed by post() or by a connection
+    to the local socket the channel listens on (listen()), which is how interactions run by the
+    MODIM server report. Results posted before anyone expects them are kept for the next take().
+    The socket is read by take() itself, no thread hands the results over.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = None  # Future of the result of the interaction being run
+        self.server = None
+        self.address = None
+
+    def expect(self):
+        """
+        A new interaction is about to run: results of earlier ones are dropped.
+        """
+        self._receive(0)
+        with self.lock:
+            if self.pending is not None:
+                self.pending.cancel()
+            self.pending = Future('outcome')
+            return self.pending
+
+    def post(self, value):
+        with self.lock:
+            if self.pending is None or self.pending.done():
+                self.pending = Future('outcome')
+            pending = self.pending
+        pending.set_result(value)
+
+    def take(self, timeout=None):
+        """
+        Result of the current interaction, waiting up to timeout seconds for it (not at all if
+        None). Returns None if there is none.
+        """
+        with self.lock:
+            if self.pending is None:
+                self.pending = Future('outcome')
+            pending = self.pending
+        if not pending.done():
+            self._receive(timeout or 0)
+        if not pending.wait(0) or pending.cancelled():
+            return None
+        with self.lock:
+            if self.pending is pending:
+                self.pending = None
+        return pending.result()
+
+    # ---------------------------------- Socket ---------------------------------- #
+
+    def listen(self, address):
+        """
+        Accept results on a local TCP socket, one connection per result. Returns False if the
+        address is taken (e.g. by another session), results then only come through post().
+        """
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            server.bind(address)
+            server.listen(4)
+        except socket.error as e:
+            print("[WARN] Result channel cannot listen on " + str(address) + ": " + str(e))
+            server.close()
+            return False
+
+        self.server, self.address = server, server.getsockname()
+        return True
+
+    def _receive(self, timeout):
+        """
+        Post the results waiting on the socket, waiting up to timeout seconds for the first.
+        """
+        while self.server is not None and select.select([self.server], [], [], timeout)[0]:
+            timeout = 0
+            connection, _ = self.server.accept()
+            try:
+                connection.settimeout(1.0)
+                chunks = []
+                while True:
+                    chunk = connection.recv(4096)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+            except socket.error as e:
+                print("[WARN] Result channel: " + str(e))
+                continue
+            finally:
+                connection.close()
+            data = b"".join(chunks)
+            if not isinstance(data, str):
+                data = data.decode('utf-8')
+            self.post(data.strip())
+
+    def close(self):
+        server, self.server = self.server, None
+        if server is not None:
+            server.close()
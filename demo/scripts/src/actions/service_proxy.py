@@ -0,0 +1,156 @@
+import os
+import sys
+import threading
+import time
+
+
+# Parts of the qi error messages meaning the call never reached the service (connection or
+# service lost). Only these are retried: remote errors may come from calls that already ran
+connection_errors = ('socket', 'not connected', 'disconnected', 'connection lost', 'connection closed',
+                     'cannot find service', "can't find service", 'service not found', 'endpoint')
+
+
+def is_connection_error(error):
+    message = str(error).lower()
+    return any(part in message for part in connection_errors)
+
+
+def rejects_async(error):
+    """
+    Whether a TypeError was raised because the method does not take _async (not a qi method):
+    the method did not run.
+    """
+    return "'_async'" in str(error)
+
+
+def _hashable(value):
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+class RpcStats(object):
+    """
+    Counts of the calls made through service proxies, per service method and call site
+    (file:line function of the caller), plus the calls answered from a cache.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # (service.method, call site) -> RPC count
+        self.cache_hits = {}  # service.method -> calls served from the cache
+
+    def record(self, method, call_site):
+        with self.lock:
+            key = (method, call_site)
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+    def record_hit(self, method):
+        with self.lock:
+            self.cache_hits[method] = self.cache_hits.get(method, 0) + 1
+
+    def total(self):
+        return sum(self.calls.values())
+
+    def report(self, limit=10):
+        """
+        Lines describing the busiest call sites, most RPCs first.
+        """
+        with self.lock:
+            calls = sorted(self.calls.items(), key=lambda item: -item[1])[:limit]
+            hits = dict(self.cache_hits)
+        lines = []
+        for (method, call_site), count in calls:
+            lines.append("{0:6d} {1} ({2})".format(count, method, call_site))
+        for method, count in sorted(hits.items()):
+            lines.append("{0:6d} {1} (cached)".format(count, method))
+        return lines
+
+
+class ServiceProxy(object):
+    """
+    Wrapper around a NAOqi service fetched from a qi session:
+    - methods listed in cached are answered from memory for ttl seconds per argument list
+      (slow-changing metadata, e.g. the installed behaviors), until invalidate() is called
+    - a call failing because the connection to the service was lost fetches the service
+      again and is retried once
+    - every RPC is counted in stats by call site
+    Attributes that are not methods (signals, properties) are passed through.
+    """
+
+    def __init__(self, session, name, cached=None, stats=None, clock=time.time):
+        self._session = session
+        self._name = name
+        self._cached = cached or {}  # method -> ttl (s)
+        self._cache = {}  # (method, args) -> (expiry, value)
+        self._stats = stats if stats is not None else RpcStats()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._service = session.service(name)
+
+    def _reconnect(self):
+        with self._lock:
+            print("[WARN] Connection to " + self._name + " lost, reconnecting")
+            self._service = self._session.service(self._name)
+            self._cache.clear()
+
+    def invalidate(self, method=None):
+        """
+        Drop the cached results of one method, or of all of them.
+        """
+        with self._lock:
+            for key in list(self._cache):
+                if method is None or key[0] == method:
+                    del self._cache[key]
+
+    @staticmethod
+    def call_site(frame):
+        return "{0}:{1} {2}".format(os.path.basename(frame.f_code.co_filename), frame.f_lineno, frame.f_code.co_name)
+
+    def call(self, method, call_site, args, kwargs):
+        """
+        Call a method of the service on behalf of call_site.
+        """
+        qualified_name = self._name + "." + method
+
+        ttl = self._cached.get(method)
+        if ttl is not None and (kwargs or not _hashable(args)):
+            ttl = None
+        if ttl is not None:
+            entry = self._cache.get((method, args))
+            if entry is not None and entry[0] > self._clock():
+                self._stats.record_hit(qualified_name)
+                return entry[1]
+
+        try:
+            value = getattr(self._service, method)(*args, **kwargs)
+        except TypeError as e:
+            # Not counted if the method only rejected _async (see ActionManager.call_async)
+            if '_async' not in kwargs or not rejects_async(e):
+                self._stats.record(qualified_name, call_site)
+            raise
+        except RuntimeError as e:
+            # qi reports lost connections as RuntimeError, as well as remote errors (not retried)
+            self._stats.record(qualified_name, call_site)
+            if not is_connection_error(e):
+                raise
+            self._reconnect()
+            value = getattr(self._service, method)(*args, **kwargs)
+        self._stats.record(qualified_name, call_site)
+
+        if ttl is not None:
+            with self._lock:
+                self._cache[(method, args)] = (self._clock() + ttl, value)
+        return value
+
+    def __getattr__(self, method):
+        attribute = getattr(self._service, method)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            return self.call(method, self.call_site(sys._getframe(1)), args, kwargs)
+
+        return call
@@ -0,0 +1,68 @@
+import math
+
+
+class TripProgress(object):
+    """
+    Where the robot is on the current trip, kept by the position manager for the whole trip so
+    that walks interrupted by a head release resume where they stopped:
+    - the segment walked (segment i goes from room i to room i + 1 of the path) and the distance
+      covered along it, projected on the trajectory
+    - the distance walked according to the odometry
+    - the planned time left to the goal, from the trajectory speed profile
+    """
+
+    def __init__(self, trajectory):
+        self.trajectory = trajectory
+        self.segment = 0
+        self.offset = 0.0  # Distance along the segment (m)
+        self.walked = 0.0  # Odometry distance (m)
+        self.last_position = None  # Last odometry position (x, y)
+        self.interruptions = 0
+
+    def moved(self, odom_x, odom_y):
+        """
+        Account for a new odometry position.
+        """
+        if self.last_position is not None:
+            self.walked += math.hypot(odom_x - self.last_position[0], odom_y - self.last_position[1])
+        self.last_position = (odom_x, odom_y)
+
+    def update(self, map_x, map_y):
+        """
+        Project the robot map position on the segment being walked.
+        """
+        if self.trajectory is not None and self.segment < len(self.trajectory):
+            self.offset = self.trajectory.progress(self.segment, map_x, map_y)
+
+    def advance(self):
+        """
+        The room ending the current segment was reached.
+        """
+        self.segment += 1
+        self.offset = 0.0
+
+    def follow(self, trajectory):
+        """
+        Carry on along a repaired trajectory: the rooms walked so far are the same, the distance
+        into the current segment only holds if it still leads to the same room.
+        """
+        old, self.trajectory = self.trajectory, trajectory
+        if old is None or trajectory is None or self.segment + 1 >= len(trajectory.rooms) or \
+                self.segment + 1 >= len(old.rooms) or \
+                old.rooms[self.segment + 1].name != trajectory.rooms[self.segment + 1].name:
+            self.offset = 0.0
+
+    def distance_left(self):
+        if self.trajectory is None or self.segment >= len(self.trajectory):
+            return 0.0
+        return max(0.0, self.trajectory.length() - self.trajectory.starts[self.segment] - self.offset)
+
+    def time_left(self):
+        if self.trajectory is None:
+            return 0.0
+        return self.trajectory.time_left(self.segment, self.offset)
+
+    def __str__(self):
+        segments = len(self.trajectory) if self.trajectory is not None else 0
+        return "segment {0}/{1}, {2:.2f} m into it, {3:.1f} m and {4:.1f} s left, {5:.1f} m walked".format(
+            min(self.segment + 1, segments), segments, self.offset, self.distance_left(), self.time_left(), self.walked)
@@ -1,5 +1,10 @@
 import threading
 
+from event_queue import EventQueue
+from scheduler import default_scheduler
+from tracing import TransitionTracer
+from ..utils.clock import monotonic
+
 
 class State(object):
 
@@ -20,11 +25,21 @@ class State(object):
         """
         pass
 
+    def on_exit(self):
+        """
+        Called when the automaton leaves the state.
+        """
+        pass
+
     def __str__(self):
         return self.name
     
 
 class TimeoutState(State):
+    """
+    State raising timeout_event timeout seconds after it is entered, unless it is left before.
+    Events handled without leaving the state do not cancel the timeout.
+    """
 
     def __init__(self, name, automaton, timeout=None, timeout_event=None):
         super(TimeoutState, self).__init__(name, automaton)
@@ -32,6 +47,10 @@ class TimeoutState(State):
         self.timeout_event = timeout_event
         self.timer = None
 
+        # Bumped whenever the timer is armed or cancelled, a timeout from an older generation is stale
+        self.generation = 0
+        self.lock = threading.Lock()
+
     def on_enter(self):
         if self.timeout and self.timeout_event:
             self.start_timer()
@@ -40,36 +59,65 @@ class TimeoutState(State):
         """
         Start a timer to automatically trigger an event after a timeout.
         """
-        self.timer = threading.Timer(self.timeout, self.trigger_timeout_event)
-        self.timer.start()
+        with self.lock:
+            self.generation += 1
+            if self.timer:
+                self.automaton.scheduler.cancel(self.timer)
+            self.timer = self.automaton.scheduler.schedule(self.timeout, self.trigger_timeout_event, self.generation)
 
-    def trigger_timeout_event(self):
+    def trigger_timeout_event(self, generation):
         """
         Trigger the timeout event if no other event occurs.
+        Timeouts of a previous visit of the state, or cancelled meanwhile, are dropped.
         """
-        self.automaton.on_event(self.timeout_event)
+        with self.lock:
+            if generation != self.generation or self.automaton.current_state is not self:
+                print("[INFO] Dropping stale " + str(self.timeout_event) + " of " + self.name)
+                return
+            self.generation += 1
+            self.timer = None
+        self.automaton.on_event(self.timeout_event, self)
 
-    def on_event(self, event):
-        
-        # Cancel the timer to avoid firing the timout event
-        self.cancel_timer()
+    def on_exit(self):
 
-        # Handle the event received
-        # ...
+        # Cancel the timer to avoid firing the timout event in another state.
+        # Events handled without leaving the state (e.g. a flapping touch) keep it running
+        self.cancel_timer()
 
     def cancel_timer(self):
         """
-        Cancel the timeout timer if an event is received.
+        Cancel the timeout timer when the state is left.
         """
-        if self.timer:
-            self.timer.cancel()
-            self.timer = None
+        with self.lock:
+            self.generation += 1
+            if self.timer:
+                self.automaton.scheduler.cancel(self.timer)
+                self.timer = None
 
 
 class FiniteStateAutomaton(object):
-    def __init__(self):
+    """
+    Events can be raised from any thread (touch subscriptions, timers, control loops): they are
+    queued and handled one at a time by a dispatcher thread, so transitions never overlap.
+    Without threads (threaded=False, e.g. in simulation) the owner calls dispatch_pending() instead.
+    """
+
+    def __init__(self, scheduler=None, events=None, clock=monotonic, tracer=None, threaded=True):
         self.states = {}
         self.current_state = None
+        self.scheduler = scheduler or default_scheduler()  # Runs the state timeouts
+        self.events = events if events is not None else EventQueue(clock=clock)
+        self.clock = clock
+
+        # Held while a state is entered or handles an event
+        self.transition_lock = threading.RLock()
+        self.threaded = threaded
+        self.dispatcher = None
+        self.running = False
+
+        # Transitions, state dwell times and event latencies
+        self.tracer = tracer if tracer is not None else TransitionTracer(clock=clock)
+        self.handled_event = None  # Event being dispatched, until it causes a transition
 
     def add_state(self, state):
         self.states[state.name] = state
@@ -77,17 +125,93 @@ class FiniteStateAutomaton(object):
     def start(self, state_name):
         if state_name not in self.states:
             raise ValueError("State '" + state_name + "' does not exist.")            
-        self.current_state = self.states[state_name]
-        self.current_state.on_enter()
+        self.change_state(state_name)
+        if self.threaded:
+            self.start_dispatcher()
 
     def change_state(self, state_name):
         if state_name in self.states:
-            self.current_state = self.states[state_name]
-            self.current_state.on_enter()
+            with self.transition_lock:
+                event, self.handled_event = self.handled_event, None
+                source = self.current_state.name if self.current_state is not None else None
+                started = self.clock()
+                self.tracer.leave(state_name, started)
+                if self.current_state is not None:
+                    self.current_state.on_exit()
+                self.current_state = self.states[state_name]
+                self.current_state.on_enter()
+                self.tracer.transition(event, source, state_name, started, self.clock())
         else:
             raise ValueError("State '" + state_name + "' does not exist.")
 
-    def on_event(self, event):
+    def on_event(self, event, state=None):
+        """
+        Queue an event for the dispatcher. With state, the event is dropped if the automaton
+        is in another state by the time it is handled.
+        """
         if self.current_state is None:
             raise ValueError("Automaton has not been initialized yet.")
-        self.current_state.on_event(event)
+        return self.events.put(event, state)
+
+    def dispatch(self, event):
+        """
+        Handle a queued event in the current state, on the calling thread.
+        """
+        with self.transition_lock:
+            if event.state is not None and event.state is not self.current_state:
+                print("[INFO] Dropping " + event.name + " raised in " + str(event.state))
+                return False
+            self.handled_event = event
+            state = self.current_state.name
+            try:
+                self.current_state.on_event(event.name)
+            finally:
+                if self.handled_event is not None:
+                    self.handled_event = None
+                    self.tracer.handled(event, state, self.clock())
+        return True
+
+    def dispatch_pending(self):
+        """
+        Handle the events due so far on the calling thread, returns how many were handled.
+        Errors of the handlers are raised.
+        """
+        handled = 0
+        event = self.events.get(timeout=0)
+        while event is not None:
+            self.dispatch(event)
+            handled += 1
+            event = self.events.get(timeout=0)
+        return handled
+
+    def _dispatch_events(self):
+        while self.running:
+            event = self.events.get(timeout=0.5)
+            if event is None:
+                continue
+            try:
+                self.dispatch(event)
+            except Exception as e:
+                print("[WARN] Handling " + event.name + " in " + str(self.current_state) + " failed: " + str(e))
+
+    def start_dispatcher(self):
+        if self.dispatcher is not None:
+            return
+        self.running = True
+        self.dispatcher = threading.Thread(target=self._dispatch_events)
+        self.dispatcher.setDaemon(True)
+        self.dispatcher.start()
+
+    def stop_dispatcher(self):
+        """
+        Stop handling events, the queued ones are discarded.
+        """
+        self.running = False
+        if self.dispatcher is not None and self.dispatcher is not threading.current_thread():
+            self.dispatcher.join()
+        self.dispatcher = None
+        self.events.clear()
+
+    def report_trace(self):
+        for line in self.tracer.report():
+            print("[INFO] \t" + line)
@@ -0,0 +1,115 @@
+import threading
+import time
+
+from ..utils.clock import monotonic
+
+
+class ControlLoop(object):
+    """
+    Calls step() at a fixed rate from its own thread until it returns False or stop() is called.
+
+    Deadlines are absolute (start + k * period), so the time spent in step() does not add up
+    to the period. When a step overruns, the missed ticks are skipped instead of being run
+    back to back. The lateness of every tick with respect to its deadline is recorded as jitter.
+    clock and sleep can be replaced, e.g. by a virtual clock in simulation. With a scheduler,
+    ticks are timers of the scheduler instead of a thread of their own.
+    """
+
+    def __init__(self, period, step, clock=monotonic, sleep=time.sleep, scheduler=None):
+        self.period = period
+        self.step = step
+        self.clock = clock
+        self.sleep = sleep
+        self.scheduler = scheduler
+
+        self.running = False
+        self.thread = None
+        self.timer = None  # Next tick, on the scheduler
+        self.deadline = None
+
+        # Jitter statistics (seconds)
+        self.ticks = 0
+        self.overruns = 0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+
+    def _tick(self, now):
+        """
+        Run the step due at deadline, now being the current time. Returns False once the loop is over.
+        """
+        lateness = now - self.deadline
+        self.ticks += 1
+        self.jitter_total += lateness
+        self.jitter_max = max(self.jitter_max, lateness)
+
+        if self.step() is False:
+            return False
+
+        self.deadline += self.period
+        now = self.clock()
+        if now >= self.deadline + self.period:
+            # Skip the ticks missed while the step was running
+            missed = int((now - self.deadline) // self.period)
+            self.overruns += missed
+            self.deadline += missed * self.period
+        return True
+
+    def run(self):
+        """
+        Run the loop in the calling thread.
+        """
+        self.running = True
+        self.deadline = self.clock()
+
+        while self.running:
+            now = self.clock()
+            if now < self.deadline:
+                self.sleep(self.deadline - now)
+                now = self.clock()
+
+            if not self._tick(now):
+                break
+
+        self.running = False
+
+    def _scheduled_tick(self):
+        if not self.running:
+            return
+        if not self._tick(self.clock()):
+            self.running = False
+        elif self.running:
+            self.timer = self.scheduler.schedule(max(0.0, self.deadline - self.clock()), self._scheduled_tick)
+
+    def start(self):
+        self.running = True
+        if self.scheduler is not None:
+            self.deadline = self.clock()
+            self.timer = self.scheduler.schedule(0.0, self._scheduled_tick)
+            return
+        self.thread = threading.Thread(target=self.run)
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop after the current tick. Safe to call from step() itself.
+        """
+        self.running = False
+        if self.timer is not None:
+            self.scheduler.cancel(self.timer)
+            self.timer = None
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def jitter(self):
+        """
+        (mean, max) lateness of the ticks in seconds.
+        """
+        if not self.ticks:
+            return 0.0, 0.0
+        return self.jitter_total / self.ticks, self.jitter_max
+
+    def __str__(self):
+        mean, maximum = self.jitter()
+        return "{0} ticks at {1:.0f} ms, jitter mean {2:.1f} ms max {3:.1f} ms, {4} overruns".format(
+            self.ticks, self.period * 1000, mean * 1000, maximum * 1000, self.overruns)
@@ -0,0 +1,152 @@
+import heapq
+import itertools
+import threading
+
+from ..utils.clock import monotonic
+
+
+class Event(object):
+    """
+    Event waiting in an EventQueue. state is the state it was raised for (None: any state).
+    """
+
+    __slots__ = ('name', 'state', 'priority', 'posted', 'due', 'seq', 'dropped')
+
+    def __init__(self, name, state, priority, posted, due, seq):
+        self.name = name
+        self.state = state
+        self.priority = priority
+        self.posted = posted
+        self.due = due
+        self.seq = seq
+        self.dropped = False  # Coalesced or evicted, skipped when popped
+
+
+class EventQueue(object):
+    """
+    Bounded queue of automaton events, read by a single dispatcher:
+    - events with a higher priority (safety events, e.g. head release) are delivered first,
+      events of the same priority in posting order
+    - events of the same group coalesce: a new event replaces the queued one, so a flapping
+      signal only delivers its latest value
+    - debounced events are held for their debounce time (s) before being delivered, and
+      dropped if replaced meanwhile
+    When full, the oldest event of the lowest priority is evicted to make room for a more
+    urgent one; otherwise the new event is refused.
+    """
+
+    def __init__(self, capacity=64, priorities=None, groups=None, debounce=None, clock=monotonic):
+        self.capacity = capacity
+        self.priorities = priorities or {}  # event -> priority (default 0)
+        self.groups = groups or {}  # event -> coalescing group (default: the event itself)
+        self.debounce = debounce or {}  # event -> hold time (s)
+        self.clock = clock
+
+        self.ready = []  # Heap of (-priority, seq, event)
+        self.held = []  # Heap of (due, seq, event), debounced events
+        self.queued = {}  # Group -> last queued event
+        self.size = 0
+        self.seq = itertools.count()
+        self.condition = threading.Condition()
+
+        self.coalesced = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return self.size
+
+    def _remove(self, event):
+        event.dropped = True
+        self.size -= 1
+        group = self.groups.get(event.name, event.name)
+        if self.queued.get(group) is event:
+            del self.queued[group]
+
+    def _evict(self, priority):
+        """
+        Drop the oldest queued event with the lowest priority, if below priority.
+        """
+        victims = [entry[2] for entry in self.ready + self.held if not entry[2].dropped]
+        if not victims:
+            return False
+        victim = min(victims, key=lambda event: (event.priority, event.seq))
+        if victim.priority >= priority:
+            return False
+        print("[WARN] Event queue full, dropping " + victim.name)
+        self._remove(victim)
+        return True
+
+    def put(self, name, state=None):
+        """
+        Queue an event, returns False if it was refused because the queue is full.
+        """
+        with self.condition:
+            now = self.clock()
+            priority = self.priorities.get(name, 0)
+
+            group = self.groups.get(name, name)
+            previous = self.queued.get(group)
+            if previous is not None:
+                self._remove(previous)
+                self.coalesced += 1
+
+            if self.size >= self.capacity and not self._evict(priority):
+                self.rejected += 1
+                print("[WARN] Event queue full, refusing " + name)
+                return False
+
+            event = Event(name, state, priority, now, now + self.debounce.get(name, 0.0), next(self.seq))
+            if event.due > now:
+                heapq.heappush(self.held, (event.due, event.seq, event))
+            else:
+                heapq.heappush(self.ready, (-priority, event.seq, event))
+            self.queued[group] = event
+            self.size += 1
+            self.condition.notify()
+            return True
+
+    def _release_held(self, now):
+        while self.held and (self.held[0][2].dropped or self.held[0][0] <= now):
+            _, seq, event = heapq.heappop(self.held)
+            if not event.dropped:
+                heapq.heappush(self.ready, (-event.priority, seq, event))
+
+    def get(self, timeout=None):
+        """
+        Next event to deliver, waiting up to timeout seconds of the queue clock (forever if None).
+        Returns None on timeout.
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        with self.condition:
+            while True:
+                now = self.clock()
+                self._release_held(now)
+                while self.ready:
+                    event = heapq.heappop(self.ready)[2]
+                    if not event.dropped:
+                        self._remove(event)
+                        event.dropped = False
+                        return event
+
+                wait = None if deadline is None else deadline - now
+                if self.held:
+                    hold = max(0.0, self.held[0][0] - now)
+                    wait = hold if wait is None else min(wait, hold)
+                if wait is not None and wait <= 0:
+                    if deadline is not None and now >= deadline:
+                        return None
+                    continue
+                self.condition.wait(wait)
+
+    def next_due(self):
+        """
+        Time at which the earliest debounced event is delivered, None if none is held.
+        """
+        with self.condition:
+            dues = [due for due, _, event in self.held if not event.dropped]
+        return min(dues) if dues else None
+
+    def clear(self):
+        with self.condition:
+            self.ready, self.held, self.queued, self.size = [], [], {}, 0
+
@@ -2,8 +2,12 @@ import math
 import threading
 
 from automaton import TimeoutState, State, FiniteStateAutomaton
-from ..utils.limits import joint_limits
-from ..utils.postures import default_posture
+from control_loop import ControlLoop
+from event_queue import EventQueue
+from ..utils.postures import Posture, compiled_postures
+from ..actions.futures import Executor
+from ..actions.path_follower import PurePursuitFollower
+from ..utils.clock import monotonic
 import time
 
 
@@ -18,12 +22,15 @@ class SteadyState(TimeoutState):
         super(SteadyState, self).on_enter()
         print("[INFO] Entering Steady State")
 
-        self.automaton.perform_movement(joint_values=default_posture)
+        movement = self.automaton.perform_movement(joint_values=compiled_postures['default'])
         print('[INFO] Resetting posture')
 
         self.automaton.instruct()
         print('[INFO] Giving blind/deaf instructions on how to start')
 
+        # Joined by the moving state, events keep being processed meanwhile
+        self.automaton.posture_movement = movement
+
     def on_event(self, event):
         super(SteadyState, self).on_event(event)
         if event == 'head_touched':
@@ -42,9 +49,9 @@ class GoalState(TimeoutState):
 
         # Signaling the user it should step back
         if self.automaton.disability == "blind":
-            self.automaton.modim_web_server.run_interaction(self.automaton.action_manager.blind_goal)
+            self.automaton.interact(self.automaton.action_manager.blind_goal)
         else:
-            self.automaton.modim_web_server.run_interaction(self.automaton.action_manager.deaf_goal)
+            self.automaton.interact(self.automaton.action_manager.deaf_goal)
         print('[INFO] Signaling the user we reached the goal')
 
     def on_event(self, event):
@@ -62,14 +69,14 @@ class QuitState(State):
         print('[INFO] Entering Quit State')
 
         # Go back to default position
-        self.automaton.perform_movement(joint_values=default_posture)
+        self.automaton.perform_movement(joint_values=compiled_postures['default'])
         print('[INFO] Resetting posture')
 
         # Signaling the user it should step back
         if self.automaton.disability == "blind":
-            self.automaton.modim_web_server.run_interaction(self.automaton.action_manager.blind_disagree)
+            self.automaton.interact(self.automaton.action_manager.blind_disagree)
         else:
-            self.automaton.modim_web_server.run_interaction(self.automaton.action_manager.deaf_disagree)
+            self.automaton.interact(self.automaton.action_manager.deaf_disagree)
         print('[INFO] Signaling the user it should step back')
 
         self.automaton.release_resources()
@@ -104,6 +111,10 @@ class HoldHandState(TimeoutState):
 
 class AskState(TimeoutState):
 
+    # Events raised for the answers of the blind user (see the blind_ask_cancel grammar).
+    # An answer that was not understood (failure) does not cancel the trip
+    ANSWER_EVENTS = {'yes': 'result_yes', 'failure': 'result_no', 'no': 'result_no'}
+
     def __init__(self, automaton):
         super(AskState, self).__init__('ask_state', automaton, timeout=automaton.timeout, timeout_event='steady_state')
 
@@ -111,21 +122,14 @@ class AskState(TimeoutState):
         super(AskState, self).on_enter()
         print("[INFO] Entering Ask State")
 
+        # The answer comes as an event, touching the head meanwhile resumes the walk
         if self.automaton.disability == "blind":
-            self.automaton.modim_web_server.run_interaction(self.automaton.action_manager.blind_ask_cancel)
+            self.automaton.interact(self.automaton.action_manager.blind_ask_cancel, self.ANSWER_EVENTS)
             print('[INFO] Asking the user if he wants to cancel the procedure')
         elif self.automaton.disability == "deaf":
-            self.automaton.modim_web_server.run_interaction(self.automaton.action_manager.deaf_ask_cancel)
+            self.automaton.interact(self.automaton.action_manager.deaf_ask_cancel)
             print('[INFO] Showing buttons for the user to choose if he wants to cancel the procedure')
 
-        # result = self.automaton.action_manager.check_status()
-        # print('[INFO] Obtained response: ' + result)
-
-        # if result == "failure":
-        #     self.automaton.on_event("result_no")
-        # else:
-        #     self.automaton.on_event("result_yes")
-
     def on_event(self, event):
         super(AskState, self).on_event(event)
         if event == 'result_yes':
@@ -139,20 +143,34 @@ class AskState(TimeoutState):
         elif event == 'steady_state':
             self.automaton.change_state('quit_state')
 
-class MovingState(State):
+class MovingState(TimeoutState):
+
+    # moveToward takes fractions of the maximum velocities
+    MAX_LINEAR_SPEED = 0.35  # m/s
+    MAX_ANGULAR_SPEED = 1.0  # rad/s
 
-    def __init__(self, automaton, eps=0.2, lin_vel=1):
-        super(MovingState, self).__init__('moving_state', automaton)
+    # Walking time allowed for the rest of the trip: planned time left * slack + margin (s)
+    TIME_SLACK = 2.0
+    TIME_MARGIN = 30.0
+
+    def __init__(self, automaton, eps=0.2, lin_vel=1, period=0.1):
+        super(MovingState, self).__init__('moving_state', automaton, timeout_event='time_elapsed')
 
         self.current_room = None
         self.next_room = None
-        self.path_index = 0
-        self.total_movement = 10
         self.lin_vel = lin_vel
         self.eps = eps
-        self.goal_distance = 10  # Total distance the robot should walk
-        self.total_distance_walked = 0  # Track walked distance
-        self.last_position = None  # Store last known position
+        self.path_version = None  # Version of position_manager.path the rooms were taken from
+        self.reported_index = None  # Segment of the last room_reached raised, until it is handled
+
+        self.period = period  # Control loop period (s)
+        self.control_loop = None
+        self.walking = False  # From entering the state until the first event leaving it
+        self.leave_lock = threading.Lock()  # Only the first of the loop or the touch callback leaves the state
+
+        # Posture change to complete before walking (Future), and when to give up waiting
+        self.posture_movement = None
+        self.posture_deadline = None
 
     @classmethod
     def distance(cls, curr, target):
@@ -160,141 +178,197 @@ class MovingState(State):
         delta_y = target[1] - curr[1]
         return (delta_x ** 2 + delta_y ** 2) ** 0.5
 
-    @classmethod
-    def compute_velocity(cls, x_curr, y_curr, x_target, y_target, speed=1.0):
-
-        delta_x = x_target - x_curr
-        delta_y = y_target - y_curr
-        magnitude = (delta_x ** 2 + delta_y ** 2) ** 0.5
-
-        if magnitude == 0:
-            return 0, 0  # Already at the target
-
-        # Normalize and scale
-        x_vel = (delta_x / magnitude) * speed
-        y_vel = (delta_y / magnitude) * speed
-
-        # Ensure speed is within (0, 1)
-        x_vel = max(min(x_vel, 1), -1)
-        y_vel = max(min(y_vel, 1), -1)
-
-        return x_vel, y_vel
-    
-    def monitor_head_touch(self):
-        """Continuously check if head has been released while moving."""
-        while self.monitoring:
-            # Get current position
-            position_arr = self.automaton.action_manager.mo_service.getRobotPosition(False)
-            current_position = (position_arr[0], position_arr[1])
-
-            # Calculate distance moved
-            if self.last_position:
-                moved_distance = self.distance(self.last_position, current_position)
-                self.total_distance_walked += moved_distance
-                self.last_position = current_position
-
-            print("[INFO] Distance walked:"+ str(self.total_distance_walked / self.goal_distance)+" meters")
-
-            # Stop if goal distance reached
-            if self.total_distance_walked >= self.goal_distance:
-                print("[INFO] Goal reached. Transitioning to goal_state.")
-                self.automaton.on_event("goal_reached")
-                return
-
-            
-
-            time.sleep(0.1)  # Prevent CPU overload
-        head_touched = self.automaton.action_manager.is_head_touched()
-        if not head_touched[0]:
-            print("[INFO] Head released detected. Stopping movement...")
-            self.automaton.action_manager.mo_service.stopMove()
-            self.automaton.on_event('head_released')
+    @property
+    def progress(self):
+        return self.automaton.position_manager.progress
+
+    def drive(self, map_x, map_y, odom_theta):
+        """
+        Velocity command from the automaton's path follower for the current trajectory segment.
+        """
+        position_manager = self.automaton.position_manager
+        trajectory = position_manager.trajectory
+        if trajectory is None or self.progress.segment >= len(trajectory):
             return
 
+        speed, turn_rate = self.automaton.follower.command(
+            trajectory, self.progress.segment, map_x, map_y, position_manager.to_map_heading(odom_theta))
+
+        forward = min(speed / self.MAX_LINEAR_SPEED, self.lin_vel)
+        turn = max(-1.0, min(1.0, turn_rate / self.MAX_ANGULAR_SPEED))
+        self.automaton.action_manager.mo_service.moveToward(forward, 0, turn)
+
+    def refresh_route(self):
+        """
+        Take current and next room from the position manager path, which may have been
+        repaired since the last call. Returns False if there is no route anymore.
+        """
+        position_manager = self.automaton.position_manager
+        self.path_version = position_manager.path_version
+        path = position_manager.path
+
+        segment = self.progress.segment if self.progress is not None else len(path)
+        if segment >= len(path):
+            return False
+
+        self.current_room = path[segment]
+        self.next_room = path[segment + 1] if segment + 1 < len(path) else None
+        return True
+
+    def tick(self):
+        """
+        One control period: pick up repaired routes, read odometry once, then check goal
+        arrival and head release before sending the next velocity command.
+        Returns False once the state is left.
+        """
+        position_manager = self.automaton.position_manager
+
+        # Pick up routes repaired around blocked edges
+        if position_manager.path_version != self.path_version:
+            if not self.refresh_route():
+                print("[INFO] Route blocked. Stopping movement...")
+                self.automaton.on_event('route_blocked', self)
+                return False
+            print("[INFO] Route updated, next room: " + str(self.next_room))
+
+        # Get current position
+        position_arr = self.automaton.action_manager.mo_service.getRobotPosition(False)
+
+        # The first position of the trip anchors the odometry frame to the map
+        if position_manager.odometry_origin is None:
+            position_manager.set_odometry_origin(position_arr[0], position_arr[1], position_arr[2])
+
+        # Trip progress: odometry distance, and where the robot is along the current segment
+        progress = self.progress
+        progress.moved(position_arr[0], position_arr[1])
+        map_x, map_y = position_manager.to_map(position_arr[0], position_arr[1])
+        progress.update(map_x, map_y)
+
+        # Rooms are reached when the robot gets within eps of them on the map
+        room = position_manager.room_mapper.nearest_room(map_x, map_y, self.eps)[0]
+        if room is not None and self.next_room is not None and room == self.next_room:
+            if progress.segment + 2 >= len(position_manager.path):
+                print("[INFO] Goal reached after " + str(progress.walked) + " meters. Transitioning to goal_state.")
+                self.automaton.on_event("goal_reached", self)
+                return False
+            # Raised once per room, the handler moves on to the next segment
+            if self.reported_index != progress.segment:
+                self.reported_index = progress.segment
+                self.automaton.on_event('room_reached', self)
+
+        # Head state latched from the touch subscription, no extra call
+        if not self.automaton.head_touched:
+            print("[INFO] Head released detected. Stopping movement...")
+            self.automaton.on_event('head_released', self)
+            return False
+
+        # Walk once the posture reset is over
+        if self.posture_movement is not None:
+            if not self.posture_movement.wait(0):
+                if self.automaton.clock() < self.posture_deadline:
+                    return True
+                print("[WARN] Posture reset still running, walking anyway")
+            self.posture_movement = None
+
+        self.drive(map_x, map_y, position_arr[2])
+        return True
+
+    def _leave(self):
+        """
+        Stop the control loop, if one was started; returns False if the state was already left.
+        """
+        with self.leave_lock:
+            if not self.walking:
+                return False
+            self.walking = False
+            control_loop, self.control_loop = self.control_loop, None
+        if control_loop is not None:
+            control_loop.stop()
+            print("[INFO] Control loop: " + str(control_loop))
+        return True
+
     def on_enter(self):
+
+        # Walking time is budgeted on what is left of the trip, a resumed walk picks up from there
+        if self.progress is not None:
+            self.timeout = self.progress.time_left() * self.TIME_SLACK + self.TIME_MARGIN
         super(MovingState, self).on_enter()
+        with self.leave_lock:
+            self.walking = True
 
-        print("[INFO] Entering moving state")
+        print("[INFO] Entering moving state, " + str(self.progress))
 
         if self.automaton.disability == "blind":
-            self.automaton.modim_web_server.run_interaction(self.automaton.action_manager.blind_walking)
+            self.automaton.interact(self.automaton.action_manager.blind_walking)
         else:
-            self.automaton.modim_web_server.run_interaction(self.automaton.action_manager.deaf_walking)
-
-        self.current_room = self.automaton.position_manager.path[self.path_index]
-        self.next_room = (
-            self.automaton.position_manager.path[self.path_index + 1]
-            if self.path_index + 1 < len(self.automaton.position_manager.path)
-            else None
-        )
+            self.automaton.interact(self.automaton.action_manager.deaf_walking)
 
-        # Ensure we have a valid next room
+        # Without a room to walk to, leave right away: there is no route, or the goal is reached
+        if not self.refresh_route():
+            print("[ERROR] No route to walk!")
+            self.automaton.on_event('route_blocked', self)
+            return
         if not self.next_room:
-            print("[ERROR] No next room found!")
+            print("[INFO] Already in the goal room " + str(self.current_room))
+            self.automaton.on_event('goal_reached', self)
             return
-        
-        # Get initial position
-        position_arr = self.automaton.action_manager.mo_service.getRobotPosition(False)
-        self.last_position = (position_arr[0], position_arr[1])
-
-        # Start movement
-        self.automaton.action_manager.mo_service.moveToward(self.lin_vel, 0, 0)
 
+        # Only start walking once the posture is reset, the control loop waits for it without blocking events
+        self.posture_movement, self.automaton.posture_movement = self.automaton.posture_movement, None
+        self.posture_deadline = self.automaton.clock() + self.automaton.MOVEMENT_TIMEOUT
 
-        # curr = self.current_room
-        # target = self.next_room
-        # x_vel, y_vel = self.compute_velocity(curr.x, curr.y, target.x, target.y)
-        # self.automaton.action_manager.mo_service.moveToward(x_vel, y_vel, 0)
-
-        # Start monitoring head touch in a separate thread
-        self.monitoring = True
-        t = threading.Thread(target=self.monitor_head_touch)
-        t.setDaemon(True)  # Python 2 way of setting daemon mode
-        t.start()
+        # Fixed rate control loop (the position is read, and movement started, from its first tick): odometry, goal and head checks, velocity command
+        scheduler = None if self.automaton.threaded else self.automaton.scheduler
+        self.control_loop = ControlLoop(self.period, self.tick, self.automaton.clock, self.automaton.sleep, scheduler)
+        self.control_loop.start()
 
     def on_event(self, event):
         super(MovingState, self).on_event(event)
-        
+
+        # Both the control loop and the touch subscription can end the walk, only the first counts
+        if event in ('goal_reached', 'head_released', 'route_blocked', 'time_elapsed') and not self._leave():
+            return
+
+        # Stop commands are fired without waiting, the next state starts right away
         if event == 'goal_reached':
-            self.automaton.action_manager.mo_service.moveToward(0, 0, 0)  # Stop robot
+            self.automaton.action_manager.call_async('mo_service', 'moveToward', 0, 0, 0)  # Stop robot
             self.automaton.change_state('goal_state')
 
         elif event == 'head_released':
-            print("[INFO] Stopping movement and switching to ask_state")
-            self.monitoring = False  # Stop monitoring
+            self.progress.interruptions += 1
+            print("[INFO] Stopping movement and switching to ask_state, trip progress kept: " + str(self.progress))
+            self.automaton.action_manager.call_async('mo_service', 'stopMove')
             self.automaton.change_state('ask_state')
-        # if event == 'room_reached':
 
-        #     print('[INFO] Fired room_reached event')
-        #     print(time.time())
-
-        #     # Go to the next room
-        #     self.path_index += 1
-
-        #     # Check if we reached the goal (we are now currently on the last position in the path)
-        #     if self.path_index == len(self.automaton.position_manager.path) - 1:
-
-        #         # current the robot
-        #         print("[INFO] currentping the robot")
-        #         self.automaton.action_manager.mo_service.moveToward(0, 0, 0)
+        elif event == 'route_blocked':
+            self.automaton.action_manager.call_async('mo_service', 'stopMove')
+            self.automaton.change_state('quit_state')
 
-        #         print("[INFO] Path completed. Transitioning to GoalState.")
-        #         self.automaton.change_state('goal_state')
+        elif event == 'time_elapsed':
+            print("[WARN] Walking time over, the goal is still " + str(self.progress))
+            self.automaton.action_manager.call_async('mo_service', 'stopMove')
+            self.automaton.change_state('quit_state')
 
-        #     else:
-        #         # Re-enter the same state
-        #         self.automaton.change_state('moving_state')
+        elif event == 'room_reached':
+            # Walk on towards the next room of the path, the control loop keeps running
+            print("[INFO] Reached room " + str(self.next_room))
+            self.automaton.position_manager.next()
+            self.refresh_route()
 
-        # elif event == 'head_released':
+class RobotAutomaton(FiniteStateAutomaton):
 
-        #     print('[INFO] Fired head_released event')
+    # Joint speed at perform_movement speed 1.0 (rad/s), and shortest posture change (s)
+    MAX_JOINT_SPEED = 2.0
+    MIN_MOVEMENT_TIME = 0.5
 
-        #     # Stop the robot
-        #     self.automaton.action_manager.mo_service.stopMove()
+    # Longest wait for a posture change that has to complete (s)
+    MOVEMENT_TIMEOUT = 5.0
 
-        #     self.automaton.change_state('ask_state')
+    # Head touches must last this long (s) to count, releases are handled right away
+    TOUCH_DEBOUNCE = 0.15
 
-class RobotAutomaton(FiniteStateAutomaton):
+    # Events handled before the others, safety first
+    EVENT_PRIORITIES = {'head_released': 2, 'route_blocked': 2, 'goal_reached': 1}
 
     def __init__(self,
                  modim_web_server,
@@ -302,15 +376,41 @@ class RobotAutomaton(FiniteStateAutomaton):
                  position_manager,
                  disability=0,
                  timeout=60,
-                 default_lin_vel=0.15
+                 default_lin_vel=0.15,
+                 clock=monotonic,
+                 sleep=time.sleep,
+                 follower=None,
+                 scheduler=None,
+                 trace_path=None,
+                 threaded=True,
+                 dialogs=None
                  ):
-        super(RobotAutomaton, self).__init__()
+        # Touch events coalesce: while flapping, only the last value is handled
+        events = EventQueue(priorities=self.EVENT_PRIORITIES,
+                            groups={'head_touched': 'touch', 'head_released': 'touch'},
+                            debounce={'head_touched': self.TOUCH_DEBOUNCE},
+                            clock=clock)
+        super(RobotAutomaton, self).__init__(scheduler, events, clock, threaded=threaded)
         self.modim_web_server = modim_web_server
         self.action_manager = action_manager
         self.position_manager = position_manager
         self.disability = disability
         self.timeout = timeout
         self.default_lin_vel = default_lin_vel
+        self.clock = clock
+        self.sleep = sleep
+        self.follower = follower or PurePursuitFollower()
+        self.trace_path = trace_path  # JSON lines file the transition trace is appended to
+
+        # Last head touch state, kept up to date by the touch subscription
+        self.head_touched = False
+
+        # Posture change still running when a state was left (Future), joined when needed
+        self.posture_movement = None
+
+        # MODIM interactions run one at a time off the dispatcher thread, those of the current state are kept to cancel them
+        self.dialogs = dialogs or Executor()
+        self.interactions = []
 
         # Connect the touch event to the automata
         touch_event = "MiddleTactilTouched"
@@ -319,12 +419,19 @@ class RobotAutomaton(FiniteStateAutomaton):
 
     # ----------------------------- Utility functions ---------------------------- #
 
+    def change_state(self, state_name):
+        with self.transition_lock:
+            if state_name in self.states:
+                self.cancel_interactions()
+            super(RobotAutomaton, self).change_state(state_name)
+
     def on_head_touch_change(self, value):
         """
         Callback function triggered when the head touch event occurs.
         Dispatch the event to the automata.
         """
         print("[INFO] Head touch value changed: " + str(value))
+        self.head_touched = value != 0.0
         if value == 0.0:
             self.on_event('head_released')
         else:
@@ -342,22 +449,34 @@ class RobotAutomaton(FiniteStateAutomaton):
 
     def perform_movement(self, joint_values, speed=1.0, _async=True):
         """
-        Perform the motion specified by the provided joint values. Joint values
-        should be in the allowed range, otherwise the value is silently discarded
+        Move to a posture (a compiled Posture or a joint values dict), or through a list of them,
+        with a single angleInterpolation call. Each step lasts the time its largest joint rotation
+        takes at speed (a fraction of MAX_JOINT_SPEED). Returns the call Future, already completed
+        unless _async is set: the movement is complete when the future is.
         """
-
-        # Enable stiffness
-        # self.action_manager.mo_service.setStiffnesses(["LArm", "RArm"], 1.0)
-
-        # Perform movement
-        for joint_name, joint_value in joint_values.items():
-            if joint_limits[joint_name][0] <= joint_value <= joint_limits[joint_name][1]:
-                self.action_manager.mo_service.setAngles(joint_name, joint_value, speed, _async=_async)
-
-        time.sleep(2)
-
-        # Disable arm stiffness during walking
-        # self.action_manager.mo_service.setStiffnesses(["LArm", "RArm"], 0.5)
+        keyframes = joint_values if isinstance(joint_values, (list, tuple)) else [joint_values]
+        keyframes = [posture if isinstance(posture, Posture) else Posture(posture) for posture in keyframes]
+
+        names = sorted(set(name for posture in keyframes for name in posture.names))
+        previous = dict(zip(names, self.action_manager.mo_service.getAngles(names, True)))
+        angle_lists = dict((name, []) for name in names)
+        time_lists = dict((name, []) for name in names)
+
+        elapsed = 0.0
+        for posture in keyframes:
+            rotation = max([abs(angle - previous[name]) for name, angle in zip(posture.names, posture.angles)] or [0.0])
+            elapsed += max(self.MIN_MOVEMENT_TIME, rotation / (self.MAX_JOINT_SPEED * speed))
+            for name, angle in zip(posture.names, posture.angles):
+                angle_lists[name].append(angle)
+                time_lists[name].append(elapsed)
+                previous[name] = angle
+
+        movement = self.action_manager.call_async(
+            'mo_service', 'angleInterpolation',
+            names, [angle_lists[name] for name in names], [time_lists[name] for name in names], True)
+        if not _async:
+            movement.wait()
+        return movement
 
     def instruct(self):
         """
@@ -366,12 +485,55 @@ class RobotAutomaton(FiniteStateAutomaton):
         """
         print("[INFO] Instructing (" + self.disability + ") user")
         if self.disability == "blind":
-            self.modim_web_server.run_interaction(self.action_manager.blind_walk_hold_head)
+            self.interact(self.action_manager.blind_walk_hold_head)
         else:
-            self.modim_web_server.run_interaction(self.action_manager.deaf_walk_hold_head)
-    
+            self.interact(self.action_manager.deaf_walk_hold_head)
+
+    def interact(self, interaction, result_events=None):
+        """
+        Start a MODIM interaction without waiting for it, events keep being handled during the
+        dialog. With result_events (dialog result -> event name), the result of the interaction
+        is raised as an event of the current state. Interactions are cancelled when the state
+        is left: queued ones never run, the result of a running one is dropped.
+        Returns the interaction Future.
+        """
+        if result_events is None:
+            future = self.dialogs.submit(self.modim_web_server.run_interaction, interaction)
+        else:
+            future = self.dialogs.submit(self.action_manager.run_dialog, self.modim_web_server, interaction)
+        future.name = interaction.__name__
+        state = self.current_state
+        future.add_done_callback(lambda future: self._interaction_done(future, state, result_events))
+        self.interactions.append(future)
+        return future
+
+    def _interaction_done(self, future, state, result_events):
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print("[WARN] Interaction " + str(future.name) + " failed: " + str(e))
+            return
+        if result_events is not None:
+            print("[INFO] Obtained response: " + str(result))
+            if result in result_events:
+                self.on_event(result_events[result], state)
+
+    def cancel_interactions(self):
+        interactions, self.interactions = self.interactions, []
+        for future in interactions:
+            future.cancel()
+
     def release_resources(self):
         self.touch_subscriber.signal.disconnect(self.touch_id)
+        if hasattr(self.action_manager, 'report_rpcs'):
+            self.action_manager.report_rpcs()
+        print("[INFO] Transitions:")
+        self.report_trace()
+        if self.trace_path:
+            self.tracer.dump(self.trace_path)
+            print("[INFO] Transition trace written to " + self.trace_path)
 
 def create_automaton(modim_web_server, action_manager, position_manager, **kwargs):
 
@@ -0,0 +1,159 @@
+import itertools
+import math
+import threading
+import time
+
+from ..utils.clock import monotonic
+
+
+class ScheduledTimer(object):
+    """
+    Handle of a timer armed on a Scheduler.
+    """
+
+    __slots__ = ('id', 'tick', 'callback', 'args', 'cancelled')
+
+    def __init__(self, timer_id, tick, callback, args):
+        self.id = timer_id
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class Scheduler(object):
+    """
+    Hashed timer wheel run by a single thread: timers are put in the slot of the tick they
+    expire on (modulo the number of slots), so arming and cancelling are O(1) whatever the
+    number of pending timers. Timers fire at most one tick late.
+
+    The thread only wakes up every tick while timers are pending. With a custom clock
+    (e.g. a virtual clock in tests) the thread can be left unstarted and advance() called instead.
+    Callbacks run on the scheduler thread and should return quickly.
+    """
+
+    def __init__(self, clock=monotonic, tick=0.05, slots=256):
+        self.clock = clock
+        self.tick = tick
+        self.slots = [dict() for _ in range(slots)]
+        self.ids = itertools.count()
+        self.pending = 0
+
+        self.origin = clock()
+        self.current_tick = 0  # Next tick to process
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+
+    def _tick_of(self, when):
+        return int(math.ceil((when - self.origin) / self.tick))
+
+    def schedule(self, delay, callback, *args):
+        """
+        Call callback(*args) after delay seconds. Returns the timer, to cancel it.
+        """
+        with self.condition:
+            now = self.clock()
+            if not self.pending:
+                # Skip the ticks elapsed while idle
+                self.current_tick = max(self.current_tick, int(math.floor((now - self.origin) / self.tick)))
+            tick = max(self._tick_of(now + delay), self.current_tick)
+            timer = ScheduledTimer(next(self.ids), tick, callback, args)
+            self.slots[tick % len(self.slots)][timer.id] = timer
+            self.pending += 1
+            self.condition.notify()
+        return timer
+
+    def cancel(self, timer):
+        """
+        Returns False if the timer already fired or was cancelled.
+        """
+        with self.condition:
+            if self.slots[timer.tick % len(self.slots)].pop(timer.id, None) is None:
+                return False
+            timer.cancelled = True
+            self.pending -= 1
+            return True
+
+    def next_deadline(self):
+        """
+        Time at which the earliest pending timer is due, None if there is none.
+        """
+        earliest = None
+        with self.condition:
+            if not self.pending:
+                return None
+            # Slots in expiry order from the current tick, the first one holding a timer of this round wins
+            for offset in range(len(self.slots)):
+                tick = self.current_tick + offset
+                for timer in self.slots[tick % len(self.slots)].values():
+                    if timer.tick <= tick:
+                        return self.origin + timer.tick * self.tick
+                    if earliest is None or timer.tick < earliest:
+                        earliest = timer.tick
+        return self.origin + earliest * self.tick
+
+    def advance(self):
+        """
+        Fire the timers expired at the current clock time. Returns the number fired.
+        """
+        due = []
+        with self.condition:
+            last_tick = int(math.floor((self.clock() - self.origin) / self.tick))
+            while self.current_tick <= last_tick and self.pending:
+                slot = self.slots[self.current_tick % len(self.slots)]
+                for timer in [timer for timer in slot.values() if timer.tick <= self.current_tick]:
+                    del slot[timer.id]
+                    self.pending -= 1
+                    due.append(timer)
+                self.current_tick += 1
+            self.current_tick = max(self.current_tick, last_tick + 1)
+
+        for timer in due:
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                print("[WARN] Timer callback failed: " + str(e))
+        return len(due)
+
+    def _run(self):
+        while self.running:
+            with self.condition:
+                if not self.pending:
+                    self.condition.wait()
+                    continue
+            time.sleep(self.tick)
+            self.advance()
+
+    def start(self):
+        with self.condition:
+            if self.thread is not None:
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self._run)
+            self.thread.setDaemon(True)
+            self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler():
+    """
+    Scheduler shared by the automata that do not bring their own, started on first use.
+    """
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = Scheduler()
+            _default_scheduler.start()
+        return _default_scheduler
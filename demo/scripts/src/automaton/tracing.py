@@ -0,0 +1,193 @@
+import json
+import threading
+import time
+from array import array
+
+from ..utils.clock import monotonic
+
+
+class Histogram(object):
+    """
+    HDR-style histogram of durations: values (recorded in seconds, stored in microseconds) fall in
+    log-linear buckets, 2^(precision - 1) per power of two, so every value is kept within a
+    relative error of 2^(1 - precision) (about 3% by default) from 1 us up to max_value seconds.
+    Recording is a few integer operations on a preallocated array.
+    """
+
+    __slots__ = ('precision', 'half', 'counts', 'count', 'total', 'maximum')
+
+    def __init__(self, precision=6, max_value=3600.0):
+        self.precision = precision
+        self.half = 1 << (precision - 1)
+        self.counts = array('l', [0]) * (self._index(int(max_value * 1e6)) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def _index(self, micros):
+        if micros < 2 * self.half:
+            return micros
+        shift = micros.bit_length() - self.precision
+        return 2 * self.half + (shift - 1) * self.half + (micros >> shift) - self.half
+
+    def _lower_bound(self, index):
+        """
+        Smallest value (us) of a bucket.
+        """
+        if index < 2 * self.half:
+            return index
+        shift = (index - 2 * self.half) // self.half + 1
+        return (self.half + (index - 2 * self.half) % self.half) << shift
+
+    def record(self, seconds):
+        micros = int(seconds * 1e6) if seconds > 0 else 0
+        self.counts[min(self._index(micros), len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def percentile(self, fraction):
+        """
+        Value (s) below which the given fraction of the recorded values fall.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(fraction * self.count)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index == len(self.counts) - 1:
+                    return self.maximum  # The last bucket also holds the values above max_value
+                return min(self._lower_bound(index + 1) * 1e-6, self.maximum)
+        return self.maximum
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self):
+        """
+        Summary (s) and the non-empty buckets as [lower bound (us), count] pairs.
+        """
+        return {
+            'count': self.count,
+            'mean': self.mean(),
+            'max': self.maximum,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'buckets': [[self._lower_bound(index), count] for index, count in enumerate(self.counts) if count],
+        }
+
+
+class TransitionTracer(object):
+    """
+    Always-on record of the automaton activity:
+    - the last capacity transitions and handled events, in a ring buffer of
+      (time, event, from state, to state, event latency, on_enter duration) tuples
+    - a histogram of the dwell time of each state
+    - a histogram of the time from an event being raised to the on_enter of the state it leads
+      to returning, per event
+    Times come from the automaton clock (monotonic by default). Updates are made with the
+    automaton transition lock held; a short lock of its own lets other threads export meanwhile.
+    """
+
+    def __init__(self, capacity=1024, clock=monotonic):
+        self.clock = clock
+        self.capacity = capacity
+        self.records = [None] * capacity
+        self.recorded = 0  # Records ever written, the next one goes at recorded % capacity
+        self.dwell = {}  # State -> Histogram
+        self.latency = {}  # Event -> Histogram
+        self.state = None
+        self.entered_at = None
+
+        # Converts clock times to wall clock times in exports
+        self.wall_offset = time.time() - clock()
+        self.lock = threading.Lock()
+
+    def _append(self, record):
+        self.records[self.recorded % self.capacity] = record
+        self.recorded += 1
+
+    def leave(self, target, started):
+        """
+        The automaton starts entering target (a state name) at started: ends the dwell of the current state.
+        """
+        with self.lock:
+            if self.state is not None:
+                self._histogram(self.dwell, self.state).record(started - self.entered_at)
+            self.state, self.entered_at = target, started
+
+    def transition(self, event, source, target, started, entered):
+        """
+        The automaton went from source to target (state names, source None at start) because of
+        event (an EventQueue event, None if not raised through the queue). started is when the
+        transition began and entered when target's on_enter returned.
+        """
+        with self.lock:
+            latency = None
+            if event is not None:
+                latency = entered - event.posted
+                self._histogram(self.latency, event.name).record(latency)
+            self._append((started, event.name if event is not None else None, source, target, latency, entered - started))
+
+    def handled(self, event, state, finished):
+        """
+        event was handled by state without a transition.
+        """
+        with self.lock:
+            self._append((finished, event.name, state, None, finished - event.posted, None))
+
+    @staticmethod
+    def _histogram(histograms, key):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram()
+        return histogram
+
+    def recent(self):
+        """
+        The records still in the ring buffer, oldest first.
+        """
+        with self.lock:
+            start = max(0, self.recorded - self.capacity)
+            return [self.records[index % self.capacity] for index in range(start, self.recorded)]
+
+    def export(self, stream):
+        """
+        Write the recent records, then the histograms, as JSON lines.
+        """
+        for stamp, event, source, target, latency, enter in self.recent():
+            stream.write(json.dumps({'type': 'transition' if target is not None else 'event',
+                                     'time': stamp + self.wall_offset, 'event': event, 'from': source,
+                                     'to': target, 'latency': latency, 'enter': enter}, sort_keys=True) + "\n")
+        with self.lock:
+            histograms = [('dwell', 'state', self.dwell), ('latency', 'event', self.latency)]
+            lines = []
+            for kind, key, group in histograms:
+                for name, histogram in sorted(group.items()):
+                    line = histogram.to_dict()
+                    line.update({'type': kind, key: name})
+                    lines.append(json.dumps(line, sort_keys=True))
+        for line in lines:
+            stream.write(line + "\n")
+
+    def dump(self, path):
+        """
+        Append the export to a file.
+        """
+        with open(path, "a") as stream:
+            self.export(stream)
+
+    def report(self):
+        """
+        One line per histogram, for the logs.
+        """
+        with self.lock:
+            groups = [('Dwell in ', self.dwell), ('Latency of ', self.latency)]
+            return ["{0}{1}: {2} samples, p50 {3:.1f} ms, p99 {4:.1f} ms, max {5:.1f} ms".format(
+                        label, name, histogram.count, histogram.percentile(0.5) * 1000,
+                        histogram.percentile(0.99) * 1000, histogram.maximum * 1000)
+                    for label, group in groups for name, histogram in sorted(group.items())]
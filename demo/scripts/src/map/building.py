@@ -0,0 +1,220 @@
+import hashlib
+import heapq
+import os
+
+from map_loader import MapFormatError
+from room_mapper import RoomMapper
+from route_table import file_digest
+
+
+INF = float('inf')
+
+
+class BuildingMap(object):
+    """
+    Hierarchical map: one RoomMapper per floor plus a portal graph (stairs, elevators, passages
+    between buildings) connecting rooms of different floors. The manifest lists both:
+
+        floor <floor id> <map file, relative to the manifest>
+        portal <floor1> <room1> <floor2> <room2> <distance> <accessibility>
+
+    Floors are only loaded when a route starts, ends or passes through them. Routes are planned
+    on the portal level first, where each floor is summarized by the distances between its
+    portal rooms; these summaries are cached on disk per floor content and accessibility level,
+    so crossing a floor does not require loading it once the cache exists.
+    Rooms are identified by (floor id, room name) pairs.
+    """
+
+    def __init__(self, manifest_path, cache_dir=None):
+        self.manifest_path = manifest_path
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(manifest_path)), 'cache')
+
+        self.floor_paths = {}  # floor id -> map file
+        self.floors = {}  # floor id -> RoomMapper, filled lazily
+        self.portals = {}  # (floor, room) -> [((floor, room), distance, accessibility)]
+        self.floor_portals = {}  # floor id -> names of its portal rooms
+        self.summaries = {}  # (floor id, level) -> {portal1: {portal2: distance}}
+
+        self._parse_manifest()
+
+    def _parse_manifest(self):
+        base_dir = os.path.dirname(os.path.abspath(self.manifest_path))
+
+        with open(self.manifest_path, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                tokens = line.split()
+                if not tokens or tokens[0].startswith('#'):
+                    continue
+
+                if tokens[0] == 'floor' and len(tokens) == 3:
+                    self.floor_paths[tokens[1]] = os.path.join(base_dir, tokens[2])
+                    self.floor_portals.setdefault(tokens[1], set())
+
+                elif tokens[0] == 'portal' and len(tokens) == 7:
+                    floor1, room1, floor2, room2 = tokens[1:5]
+                    for floor in (floor1, floor2):
+                        if floor not in self.floor_paths:
+                            raise MapFormatError(self.manifest_path, line_number, "unknown floor '" + floor + "'")
+                    try:
+                        distance, accessibility = float(tokens[5]), int(tokens[6])
+                    except ValueError:
+                        raise MapFormatError(self.manifest_path, line_number, "invalid portal distance or accessibility")
+
+                    self.portals.setdefault((floor1, room1), []).append(((floor2, room2), distance, accessibility))
+                    self.portals.setdefault((floor2, room2), []).append(((floor1, room1), distance, accessibility))
+                    self.floor_portals[floor1].add(room1)
+                    self.floor_portals[floor2].add(room2)
+
+                else:
+                    raise MapFormatError(self.manifest_path, line_number, "expected a floor or portal line")
+
+    # ---------------------------------- Floors ---------------------------------- #
+
+    def floor(self, floor_id):
+        """
+        RoomMapper of a floor, loaded on first access.
+        """
+        if floor_id not in self.floors:
+            if floor_id not in self.floor_paths:
+                raise KeyError(floor_id)
+            print("[INFO] Loading floor " + floor_id)
+            self.floors[floor_id] = RoomMapper.open(self.floor_paths[floor_id])
+        return self.floors[floor_id]
+
+    def is_loaded(self, floor_id):
+        return floor_id in self.floors
+
+    def is_valid(self, floor_id, room_name):
+        return floor_id in self.floor_paths and room_name in self.floor(floor_id).rooms
+
+    def _summary_path(self, floor_id, level):
+        """
+        Cache file of a summary, named after the floor content and its portal rooms (a portal
+        added to the manifest makes the summary stale even if the floor did not change).
+        """
+        floor_path = self.floor_paths[floor_id]
+        portals = hashlib.sha1('\n'.join(sorted(self.floor_portals[floor_id]))).hexdigest()[:12]
+        name = os.path.basename(floor_path) + '.' + file_digest(floor_path) + '.' + portals + '.' + str(level) + '.portals'
+        return os.path.join(self.cache_dir, name)
+
+    def summary(self, floor_id, level):
+        """
+        Distances between the portal rooms of a floor for an accessibility level, from memory,
+        from the disk cache, or computed by loading the floor.
+        """
+        key = (floor_id, level)
+        if key in self.summaries:
+            return self.summaries[key]
+
+        path = self._summary_path(floor_id, level)
+        distances = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    room1, room2, distance = line.split()
+                    distances.setdefault(room1, {})[room2] = float(distance)
+        else:
+            floor = self.floor(floor_id)
+            for room1 in self.floor_portals[floor_id]:
+                vector = floor.distances_from(room1, level)
+                for room2 in self.floor_portals[floor_id]:
+                    if room1 != room2 and vector.get(room2) != INF:
+                        distances.setdefault(room1, {})[room2] = vector.get(room2)
+            self._save_summary(path, distances)
+
+        self.summaries[key] = distances
+        return distances
+
+    def precompute(self, levels):
+        """
+        Build the portal summaries of every floor for the given accessibility levels (offline step).
+        """
+        for floor_id in self.floor_paths:
+            for level in levels:
+                self.summary(floor_id, level)
+
+    def _save_summary(self, path, distances):
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            tmp_path = path + '.' + str(os.getpid()) + '.tmp'
+            with open(tmp_path, 'w') as f:
+                for room1, reachable in distances.items():
+                    for room2, distance in reachable.items():
+                        f.write("{0} {1} {2!r}\n".format(room1, room2, distance))
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as e:
+            print("[WARN] Unable to cache portal distances: " + str(e))
+
+    # --------------------------------- Planning --------------------------------- #
+
+    def find_path(self, start, end, max_accessibility=INF):
+        """
+        Shortest route between two (floor, room) pairs as (distance, [(floor, Room)]).
+        Only the start floor, the end floor and the floors the route actually crosses are loaded.
+        """
+        (start_floor, start_room), (end_floor, end_room) = start, end
+        source, target = ('source',), ('target',)
+
+        # Entry and exit legs on the two end floors
+        exits = self.floor(start_floor).distances_from(start_room, max_accessibility)
+        entries = self.floor(end_floor).distances_to(end_room, max_accessibility)
+
+        def neighbors(node):
+            if node == source:
+                if start_floor == end_floor and exits.get(end_room) != INF:
+                    yield target, exits.get(end_room)
+                for room in self.floor_portals[start_floor]:
+                    if exits.get(room) != INF:
+                        yield (start_floor, room), exits.get(room)
+                return
+
+            floor_id, room = node
+            if floor_id == end_floor and entries.get(room) != INF:
+                yield target, entries.get(room)
+            for other, distance, accessibility in self.portals.get(node, ()):
+                if accessibility <= max_accessibility:
+                    yield other, distance
+            for other, distance in self.summary(floor_id, max_accessibility).get(room, {}).items():
+                yield (floor_id, other), distance
+
+        # Dijkstra on the portal level
+        distances = {source: 0}
+        parents = {}
+        priority_queue = [(0, source)]
+        while priority_queue:
+            distance, node = heapq.heappop(priority_queue)
+            if node == target:
+                break
+            if distance > distances[node]:
+                continue
+            for neighbor, weight in neighbors(node):
+                if distance + weight < distances.get(neighbor, INF):
+                    distances[neighbor] = distance + weight
+                    parents[neighbor] = node
+                    heapq.heappush(priority_queue, (distance + weight, neighbor))
+
+        if target not in distances:
+            return INF, []
+
+        waypoints = [target]
+        while waypoints[-1] != source:
+            waypoints.append(parents[waypoints[-1]])
+        waypoints.reverse()
+        waypoints = [start] + waypoints[1:-1] + [end]
+
+        return distances[target], self._expand(waypoints, max_accessibility)
+
+    def _expand(self, waypoints, max_accessibility):
+        """
+        Turn consecutive portal-level waypoints into rooms: legs on the same floor are expanded
+        with a search on that floor (loading it), portal hops are kept as they are.
+        """
+        path = [(waypoints[0][0], self.floor(waypoints[0][0]).rooms[waypoints[0][1]])]
+        for (floor1, room1), (floor2, room2) in zip(waypoints, waypoints[1:]):
+            if floor1 == floor2:
+                _, leg = self.floor(floor1).find_path(room1, room2, max_accessibility)
+                path.extend((floor1, room) for room in leg[1:])
+            else:
+                path.append((floor2, self.floor(floor2).rooms[room2]))
+        return path
@@ -0,0 +1,287 @@
+import heapq
+from array import array
+
+from heuristics import ZeroHeuristic
+
+
+INF = float('inf')
+
+
+class CompactGraph(object):
+    """
+    Read-only, array-backed (CSR) snapshot of a Graph.
+
+    Nodes are interned to consecutive integer ids; the outgoing edges of node i
+    are stored in targets/weights/accessibility[offsets[i]:offsets[i + 1]], the
+    incoming ones in the rev_* arrays with the same layout.
+    Searches only touch integers and flat arrays, so no Node hashing or
+    comparison happens while relaxing edges.
+    """
+
+    __slots__ = ('nodes', 'index', 'offsets', 'targets', 'weights', 'accessibility',
+                 'rev_offsets', 'rev_targets', 'rev_weights', 'rev_accessibility', 'heuristic')
+
+    def __init__(self, nodes, offsets, targets, weights, accessibility, reverse=None):
+        self.nodes = nodes
+        self.index = dict((node, i) for i, node in enumerate(nodes))
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.accessibility = accessibility
+        if reverse is None:
+            self._build_reverse()
+        else:
+            self.rev_offsets, self.rev_targets, self.rev_weights, self.rev_accessibility = reverse
+        self.heuristic = ZeroHeuristic()
+
+    @classmethod
+    def from_graph(cls, graph):
+        nodes = list(graph.adjacency_list.keys())
+        index = dict((node, i) for i, node in enumerate(nodes))
+
+        offsets = array('l', [0])
+        targets = array('l')
+        weights = array('d')
+        accessibility = array('l')
+
+        for node in nodes:
+            for neighbor, weight, accessibility_weight in graph.adjacency_list[node]:
+                targets.append(index[neighbor])
+                weights.append(weight)
+                accessibility.append(int(accessibility_weight))
+            offsets.append(len(targets))
+
+        return cls(nodes, offsets, targets, weights, accessibility)
+
+    @classmethod
+    def from_edges(cls, nodes, sources, targets, weights, accessibility):
+        """
+        Build the CSR arrays from parallel edge arrays (node ids) in any order, with a counting sort.
+        """
+        counts = [0] * (len(nodes) + 1)
+        for u in sources:
+            counts[u + 1] += 1
+        for i in range(len(nodes)):
+            counts[i + 1] += counts[i]
+
+        sorted_targets = array('l', [0]) * len(targets)
+        sorted_weights = array('d', [0.0]) * len(targets)
+        sorted_accessibility = array('l', [0]) * len(targets)
+
+        fill = counts[:len(nodes)]
+        for e in range(len(sources)):
+            slot = fill[sources[e]]
+            fill[sources[e]] += 1
+            sorted_targets[slot] = targets[e]
+            sorted_weights[slot] = weights[e]
+            sorted_accessibility[slot] = accessibility[e]
+
+        return cls(nodes, array('l', counts), sorted_targets, sorted_weights, sorted_accessibility)
+
+    def _build_reverse(self):
+        n = len(self.nodes)
+        counts = [0] * (n + 1)
+        for v in self.targets:
+            counts[v + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+
+        self.rev_offsets = array('l', counts)
+        self.rev_targets = array('l', [0] * len(self.targets))
+        self.rev_weights = array('d', [0.0] * len(self.targets))
+        self.rev_accessibility = array('l', [0] * len(self.targets))
+
+        fill = counts[:n]
+        for u in range(n):
+            for e in range(self.offsets[u], self.offsets[u + 1]):
+                v = self.targets[e]
+                slot = fill[v]
+                fill[v] += 1
+                self.rev_targets[slot] = u
+                self.rev_weights[slot] = self.weights[e]
+                self.rev_accessibility[slot] = self.accessibility[e]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node_id(self, node):
+        return self.index.get(node)
+
+    def edges(self, node_id):
+        """
+        Iterate over (target_id, weight, accessibility_weight) for the outgoing edges of node_id.
+        """
+        for e in range(self.offsets[node_id], self.offsets[node_id + 1]):
+            yield self.targets[e], self.weights[e], self.accessibility[e]
+
+    def single_source_distances(self, source, accessibility_level=INF, reverse=False):
+        """
+        Distances from source to every node (to source from every node if reverse is set).
+        """
+        if reverse:
+            offsets, targets, weights, accessibility = \
+                self.rev_offsets, self.rev_targets, self.rev_weights, self.rev_accessibility
+        else:
+            offsets, targets, weights, accessibility = \
+                self.offsets, self.targets, self.weights, self.accessibility
+
+        distances = array('d', [INF]) * len(self.nodes)
+        distances[source] = 0
+        priority_queue = [(0, source)]
+
+        while priority_queue:
+            current_distance, current = heapq.heappop(priority_queue)
+            if current_distance > distances[current]:
+                continue
+
+            for e in range(offsets[current], offsets[current + 1]):
+                if accessibility[e] <= accessibility_level:
+                    neighbor = targets[e]
+                    tentative_distance = current_distance + weights[e]
+                    if tentative_distance < distances[neighbor]:
+                        distances[neighbor] = tentative_distance
+                        heapq.heappush(priority_queue, (tentative_distance, neighbor))
+
+        return distances
+
+    def shortest_path(self, start, end, accessibility_level, bidirectional=False):
+        source = self.index.get(start)
+        target = self.index.get(end)
+        if source is None or target is None:
+            return INF, []
+
+        if bidirectional:
+            return self._bidirectional_astar(source, target, accessibility_level)
+        return self._astar(source, target, accessibility_level)
+
+    def _astar(self, source, target, accessibility_level):
+        offsets = self.offsets
+        targets = self.targets
+        weights = self.weights
+        accessibility = self.accessibility
+        estimate = self.heuristic.estimate
+
+        # Search state only holds the nodes actually reached
+        distances = {source: 0}
+        parents = {source: source}
+        priority_queue = [(estimate(source, target), 0, source)]
+
+        while priority_queue:
+            _, current_distance, current = heapq.heappop(priority_queue)
+
+            if current == target:
+                return current_distance, self._reconstruct_path(parents, source, target)
+            if current_distance > distances[current]:
+                continue  # Stale queue entry
+
+            for e in range(offsets[current], offsets[current + 1]):
+                if accessibility[e] <= accessibility_level:
+                    neighbor = targets[e]
+                    tentative_distance = current_distance + weights[e]
+                    if tentative_distance < distances.get(neighbor, INF):
+                        distances[neighbor] = tentative_distance
+                        parents[neighbor] = current
+                        f_score = tentative_distance + estimate(neighbor, target)
+                        heapq.heappush(priority_queue, (f_score, tentative_distance, neighbor))
+
+        return INF, []
+
+    def _bidirectional_astar(self, source, target, accessibility_level):
+        """
+        Bidirectional A* with average potentials p(v) = (h(v, target) - h(source, v)) / 2, which
+        keep reduced edge costs non negative in both directions. The search stops as soon as
+        the two frontier keys add up to the best meeting distance found so far.
+        """
+        if source == target:
+            return 0, [self.nodes[source]]
+
+        estimate = self.heuristic.estimate
+
+        def potential(v):
+            return (estimate(v, target) - estimate(source, v)) / 2.0
+
+        sides = (
+            (self.offsets, self.targets, self.weights, self.accessibility, 1),
+            (self.rev_offsets, self.rev_targets, self.rev_weights, self.rev_accessibility, -1),
+        )
+        distances = ({source: 0}, {target: 0})
+        parents = ({source: source}, {target: target})
+        queues = ([(potential(source), 0, source)], [(-potential(target), 0, target)])
+
+        best, meeting = INF, None
+        while queues[0] and queues[1]:
+            if queues[0][0][0] + queues[1][0][0] >= best:
+                break
+
+            side = 0 if len(queues[0]) <= len(queues[1]) else 1
+            offsets, targets, weights, accessibility, sign = sides[side]
+            own, other = distances[side], distances[1 - side]
+
+            _, current_distance, current = heapq.heappop(queues[side])
+            if current_distance > own[current]:
+                continue  # Stale queue entry
+
+            for e in range(offsets[current], offsets[current + 1]):
+                if accessibility[e] <= accessibility_level:
+                    neighbor = targets[e]
+                    tentative_distance = current_distance + weights[e]
+                    if tentative_distance < own.get(neighbor, INF):
+                        own[neighbor] = tentative_distance
+                        parents[side][neighbor] = current
+                        key = tentative_distance + sign * potential(neighbor)
+                        heapq.heappush(queues[side], (key, tentative_distance, neighbor))
+                        if neighbor in other and tentative_distance + other[neighbor] < best:
+                            best, meeting = tentative_distance + other[neighbor], neighbor
+
+        if meeting is None:
+            return INF, []
+
+        path = self._reconstruct_path(parents[0], source, meeting)
+        node = meeting
+        while node != target:
+            node = parents[1][node]
+            path.append(self.nodes[node])
+        return best, path
+
+    def _reconstruct_path(self, parents, source, target):
+        path = [target]
+        while path[-1] != source:
+            path.append(parents[path[-1]])
+        path.reverse()
+        return [self.nodes[i] for i in path]
+
+
+class CompactAdjacency(object):
+    """
+    Read-only adjacency list view ({node: [(neighbor, weight, accessibility_weight)]}) over a
+    CompactGraph, used when a graph is loaded already compiled. Lists are built on access.
+    """
+
+    __slots__ = ('compact',)
+
+    def __init__(self, compact):
+        self.compact = compact
+
+    def __len__(self):
+        return len(self.compact)
+
+    def __contains__(self, node):
+        return node in self.compact.index
+
+    def __iter__(self):
+        return iter(self.compact.nodes)
+
+    def __getitem__(self, node):
+        nodes = self.compact.nodes
+        return [(nodes[v], weight, accessibility_weight)
+                for v, weight, accessibility_weight in self.compact.edges(self.compact.index[node])]
+
+    def keys(self):
+        return list(self.compact.nodes)
+
+    def items(self):
+        return [(node, self[node]) for node in self.compact.nodes]
+
+    def iteritems(self):
+        for node in self.compact.nodes:
+            yield node, self[node]
@@ -0,0 +1,233 @@
+import heapq
+from array import array
+
+
+INF = float('inf')
+
+
+class ContractionHierarchy(object):
+    """
+    Contraction hierarchy over the edges of a compiled graph that a given accessibility level
+    can traverse. Edges above the level are dropped before contraction, so every level gets
+    its own hierarchy and shortcuts never hide an inaccessible edge.
+
+    Queries run a bidirectional Dijkstra that only climbs the node order: the forward search
+    follows up_* edges from the source, the backward search follows down_* edges (stored
+    reversed) from the target. Shortcuts remember the node they bypass so paths can be unpacked.
+    """
+
+    __slots__ = ('nodes', 'index', 'level', 'rank',
+                 'up_offsets', 'up_targets', 'up_weights',
+                 'down_offsets', 'down_targets', 'down_weights', 'middle')
+
+    # Bounds on the local witness searches: node ordering only needs an estimate
+    WITNESS_SETTLE_LIMIT = 500
+    ORDERING_SETTLE_LIMIT = 40
+
+    def __init__(self, nodes, level, rank, up, down, middle):
+        self.nodes = nodes
+        self.index = dict((node, i) for i, node in enumerate(nodes))
+        self.level = level
+        self.rank = rank
+        self.up_offsets, self.up_targets, self.up_weights = self._to_csr(up)
+        self.down_offsets, self.down_targets, self.down_weights = self._to_csr(down)
+        self.middle = middle  # (u, w) -> contracted node bypassed by shortcut u -> w
+
+    @staticmethod
+    def _to_csr(adjacency):
+        offsets = array('l', [0])
+        targets = array('l')
+        weights = array('d')
+        for edges in adjacency:
+            for target, weight in sorted(edges.items()):
+                targets.append(target)
+                weights.append(weight)
+            offsets.append(len(targets))
+        return offsets, targets, weights
+
+    # ------------------------------- Preprocessing ------------------------------ #
+
+    @classmethod
+    def build(cls, compact, accessibility_level):
+        n = len(compact)
+
+        # Keep the cheapest accessible edge between each ordered pair
+        out_edges = [dict() for _ in range(n)]
+        in_edges = [dict() for _ in range(n)]
+        for u in range(n):
+            for v, weight, accessibility_weight in compact.edges(u):
+                if accessibility_weight <= accessibility_level and u != v and weight < out_edges[u].get(v, INF):
+                    out_edges[u][v] = weight
+                    in_edges[v][u] = weight
+
+        # All edges ever present (original + shortcuts), split by rank afterwards
+        all_edges = [dict(edges) for edges in out_edges]
+        middle = {}
+
+        contracted = [False] * n
+        deleted_neighbors = [0] * n
+        rank = array('l', [0]) * n
+
+        def simulate(v):
+            return len(cls._shortcuts(v, out_edges, in_edges, contracted, cls.ORDERING_SETTLE_LIMIT)) \
+                - len(out_edges[v]) - len(in_edges[v]) + deleted_neighbors[v]
+
+        queue = [(simulate(v), v) for v in range(n)]
+        heapq.heapify(queue)
+
+        order = 0
+        while queue:
+            _, v = heapq.heappop(queue)
+            if contracted[v]:
+                continue
+
+            # Lazy update: re-evaluate and postpone if the node is no longer the best candidate
+            priority = simulate(v)
+            if queue and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, v))
+                continue
+
+            for u, w, weight in cls._shortcuts(v, out_edges, in_edges, contracted, cls.WITNESS_SETTLE_LIMIT):
+                if weight >= out_edges[u].get(w, INF):
+                    continue  # Witness search gave up before finding the existing edge
+                out_edges[u][w] = weight
+                in_edges[w][u] = weight
+                all_edges[u][w] = weight
+                middle[(u, w)] = v
+
+            contracted[v] = True
+            rank[v] = order
+            order += 1
+
+            for neighbor in list(out_edges[v].keys()) + list(in_edges[v].keys()):
+                deleted_neighbors[neighbor] += 1
+                in_edges[neighbor].pop(v, None)
+                out_edges[neighbor].pop(v, None)
+
+        up = [dict() for _ in range(n)]
+        down = [dict() for _ in range(n)]
+        for u in range(n):
+            for w, weight in all_edges[u].items():
+                if rank[w] > rank[u]:
+                    up[u][w] = weight
+                else:
+                    down[w][u] = weight
+
+        return cls(list(compact.nodes), accessibility_level, rank, up, down, middle)
+
+    @classmethod
+    def _shortcuts(cls, v, out_edges, in_edges, contracted, settle_limit):
+        """
+        Shortcuts (u, w, weight) needed to preserve shortest paths through v once it is removed.
+        """
+        shortcuts = []
+        if not out_edges[v]:
+            return shortcuts
+
+        max_out = max(out_edges[v].values())
+        for u, in_weight in in_edges[v].items():
+            distances = cls._witness_search(u, v, in_weight + max_out, out_edges, contracted, settle_limit)
+            for w, out_weight in out_edges[v].items():
+                if w == u:
+                    continue
+                candidate = in_weight + out_weight
+                if distances.get(w, INF) > candidate:
+                    shortcuts.append((u, w, candidate))
+        return shortcuts
+
+    @classmethod
+    def _witness_search(cls, source, excluded, limit, out_edges, contracted, settle_limit):
+        distances = {source: 0}
+        priority_queue = [(0, source)]
+        settled = 0
+
+        while priority_queue and settled < settle_limit:
+            current_distance, current = heapq.heappop(priority_queue)
+            if current_distance > distances[current]:
+                continue
+            if current_distance > limit:
+                break
+            settled += 1
+
+            for neighbor, weight in out_edges[current].items():
+                if neighbor == excluded or contracted[neighbor]:
+                    continue
+                tentative_distance = current_distance + weight
+                if tentative_distance < distances.get(neighbor, INF):
+                    distances[neighbor] = tentative_distance
+                    heapq.heappush(priority_queue, (tentative_distance, neighbor))
+
+        return distances
+
+    # ---------------------------------- Queries --------------------------------- #
+
+    def shortest_path(self, start, end):
+        source = self.index.get(start)
+        target = self.index.get(end)
+        if source is None or target is None:
+            return INF, []
+        if source == target:
+            return 0, [self.nodes[source]]
+
+        sides = (
+            (self.up_offsets, self.up_targets, self.up_weights),
+            (self.down_offsets, self.down_targets, self.down_weights),
+        )
+        distances = ({source: 0}, {target: 0})
+        parents = ({source: source}, {target: target})
+        queues = ([(0, source)], [(0, target)])
+
+        best, meeting = INF, None
+        while queues[0] or queues[1]:
+            # Each side can stop on its own once its frontier exceeds the best meeting distance
+            for side in (0, 1):
+                if queues[side] and queues[side][0][0] >= best:
+                    del queues[side][:]
+            side = 0 if queues[0] and (not queues[1] or queues[0][0][0] <= queues[1][0][0]) else 1
+            if not queues[side]:
+                break
+
+            offsets, targets, weights = sides[side]
+            own, other = distances[side], distances[1 - side]
+
+            current_distance, current = heapq.heappop(queues[side])
+            if current_distance > own[current]:
+                continue
+
+            if current in other and current_distance + other[current] < best:
+                best, meeting = current_distance + other[current], current
+
+            for e in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[e]
+                tentative_distance = current_distance + weights[e]
+                if tentative_distance < own.get(neighbor, INF):
+                    own[neighbor] = tentative_distance
+                    parents[side][neighbor] = current
+                    heapq.heappush(queues[side], (tentative_distance, neighbor))
+
+        if meeting is None:
+            return INF, []
+
+        # Hierarchy path: source -> ... -> meeting -> ... -> target
+        path = [meeting]
+        while path[-1] != source:
+            path.append(parents[0][path[-1]])
+        path.reverse()
+        while path[-1] != target:
+            path.append(parents[1][path[-1]])
+
+        return best, [self.nodes[i] for i in self._unpack(path)]
+
+    def _unpack(self, path):
+        unpacked = [path[0]]
+        for u, w in zip(path, path[1:]):
+            stack = [(u, w)]
+            while stack:
+                a, b = stack.pop()
+                v = self.middle.get((a, b))
+                if v is None:
+                    unpacked.append(b)
+                else:
+                    stack.append((v, b))
+                    stack.append((a, v))
+        return unpacked
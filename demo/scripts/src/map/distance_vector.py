@@ -0,0 +1,47 @@
+INF = float('inf')
+
+
+class DistanceVector(object):
+    """
+    Distances between one room and every other room, stored as a flat array indexed by the
+    compiled graph's node ids. Rooms can be looked up by object or name.
+    """
+
+    __slots__ = ('nodes', 'index', 'distances')
+
+    def __init__(self, compact, distances):
+        self.nodes = compact.nodes
+        self.index = compact.index
+        self.distances = distances
+
+    def __len__(self):
+        return len(self.distances)
+
+    def __getitem__(self, room):
+        return self.distances[self.index[room]]
+
+    def __contains__(self, room):
+        return room in self.index
+
+    def get(self, room, default=INF):
+        node_id = self.index.get(room)
+        if node_id is None:
+            return default
+        return self.distances[node_id]
+
+    def items(self):
+        """
+        (room, distance) pairs for the reachable rooms.
+        """
+        return [(self.nodes[i], d) for i, d in enumerate(self.distances) if d != INF]
+
+    def nearest(self, candidates):
+        """
+        Closest reachable room among candidates as (room, distance), (None, inf) if none is reachable.
+        """
+        best_room, best_distance = None, INF
+        for room in candidates:
+            distance = self.get(room)
+            if distance < best_distance:
+                best_room, best_distance = self.nodes[self.index[room]], distance
+        return best_room, best_distance
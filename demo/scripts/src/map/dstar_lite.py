@@ -0,0 +1,152 @@
+import heapq
+
+from heuristics import ZeroHeuristic
+
+
+INF = float('inf')
+
+
+class DStarLite(object):
+    """
+    Incremental planner (D* Lite, Koenig & Likhachev) over a compiled graph for one goal and
+    accessibility level. The search runs backwards from the goal, so when edge costs change
+    or the robot moves on, only the part of the search tree affected is repaired.
+    """
+
+    def __init__(self, compact, goal_id, start_id, accessibility_level, overrides=None):
+        self.compact = compact
+        self.goal = goal_id
+        self.start = start_id
+        self.accessibility_level = accessibility_level
+        self.estimate = compact.heuristic.estimate
+
+        self.overrides = {}  # (u, v) -> cost replacing every accessible u -> v edge, INF = blocked
+        self.successor_cache = {}
+        self.predecessor_cache = {}
+
+        self.g = {}
+        self.rhs = {goal_id: 0}
+        self.km = 0
+        self.queue = []
+        self.queued = {}  # node -> key currently valid in the queue (lazy deletion)
+        self._push(goal_id)
+
+        for (u, v), weight in (overrides or {}).items():
+            self.update_edge(u, v, weight)
+        self.compute_shortest_path()
+
+    # --------------------------------- Graph view -------------------------------- #
+
+    def _collect(self, u, offsets, targets, weights, accessibility):
+        edges = {}
+        for e in range(offsets[u], offsets[u + 1]):
+            if accessibility[e] <= self.accessibility_level and weights[e] < edges.get(targets[e], INF):
+                edges[targets[e]] = weights[e]
+        return edges
+
+    def successors(self, u):
+        if u not in self.successor_cache:
+            c = self.compact
+            self.successor_cache[u] = self._collect(u, c.offsets, c.targets, c.weights, c.accessibility)
+        return self.successor_cache[u]
+
+    def predecessors(self, v):
+        if v not in self.predecessor_cache:
+            c = self.compact
+            self.predecessor_cache[v] = self._collect(
+                v, c.rev_offsets, c.rev_targets, c.rev_weights, c.rev_accessibility)
+        return self.predecessor_cache[v]
+
+    def cost(self, u, v):
+        if (u, v) in self.overrides:
+            return self.overrides[(u, v)]
+        return self.successors(u).get(v, INF)
+
+    # ---------------------------------- Search ---------------------------------- #
+
+    def _key(self, s):
+        best = min(self.g.get(s, INF), self.rhs.get(s, INF))
+        return best + self.estimate(self.start, s) + self.km, best
+
+    def _push(self, s):
+        key = self._key(s)
+        self.queued[s] = key
+        heapq.heappush(self.queue, (key, s))
+
+    def _top(self):
+        while self.queue and self.queued.get(self.queue[0][1]) != self.queue[0][0]:
+            heapq.heappop(self.queue)  # Stale entry
+        return self.queue[0] if self.queue else None
+
+    def _update_vertex(self, u):
+        if u != self.goal:
+            self.rhs[u] = min([self.cost(u, s) + self.g.get(s, INF) for s in self.successors(u)] or [INF])
+        self.queued.pop(u, None)
+        if self.g.get(u, INF) != self.rhs.get(u, INF):
+            self._push(u)
+
+    def compute_shortest_path(self):
+        while True:
+            top = self._top()
+            if top is None:
+                break
+            start_key = self._key(self.start)
+            if top[0] >= start_key and self.rhs.get(self.start, INF) == self.g.get(self.start, INF):
+                break
+
+            key_old, u = heapq.heappop(self.queue)
+            del self.queued[u]
+            key_new = self._key(u)
+
+            if key_old < key_new:
+                self._push(u)
+            elif self.g.get(u, INF) > self.rhs.get(u, INF):
+                self.g[u] = self.rhs[u]
+                for s in self.predecessors(u):
+                    self._update_vertex(s)
+            else:
+                self.g[u] = INF
+                for s in list(self.predecessors(u)) + [u]:
+                    self._update_vertex(s)
+
+    # ----------------------------------- API ------------------------------------ #
+
+    def update_edge(self, u, v, weight):
+        """
+        Change the cost of u -> v (INF blocks it). Call replan() once all changes are applied.
+        Only edges the accessibility level may traverse are reweighted, changes never add edges.
+        """
+        if v not in self.successors(u):
+            return
+        if weight < self.successors(u)[v] and not isinstance(self.estimate.__self__, ZeroHeuristic):
+            # Lower costs can break the precomputed lower bounds, stop relying on them
+            self.estimate = ZeroHeuristic().estimate
+            for s in list(self.queued):
+                self._push(s)
+        self.overrides[(u, v)] = weight
+        self._update_vertex(u)
+
+    def move_to(self, start_id):
+        """
+        The robot reached start_id: shift the key modifier instead of reordering the queue.
+        """
+        self.km += self.estimate(self.start, start_id)
+        self.start = start_id
+
+    def replan(self):
+        """
+        Repair the search after edge updates or moves and return (distance, [node ids]) from start to goal.
+        """
+        self.compute_shortest_path()
+
+        distance = self.g.get(self.start, INF)
+        if distance == INF:
+            return INF, []
+
+        path = [self.start]
+        while path[-1] != self.goal and len(path) <= len(self.compact):
+            u = path[-1]
+            path.append(min(self.successors(u), key=lambda s: self.cost(u, s) + self.g.get(s, INF)))
+        if path[-1] != self.goal:
+            return INF, []
+        return distance, path
@@ -2,6 +2,8 @@ import matplotlib.pyplot as plt
 import heapq
 
 from node import Node
+from compact_graph import CompactGraph
+from heuristics import select_heuristic
 
 
 class Graph(object):
@@ -9,8 +11,12 @@ class Graph(object):
     def __init__(self, directed=False):
         self.adjacency_list = {}
         self.directed = directed
+        self.compact = None  # Compiled CSR view, dropped on every mutation
 
     def add(self, node1, node2, weight=1, accessibility_weight=1):
+        self._thaw()
+        self.compact = None
+
         # If one of the nodes is not in the adjacency list, add it
         if node1 not in self.adjacency_list:
             self.adjacency_list[node1] = []
@@ -22,10 +28,14 @@ class Graph(object):
             self.adjacency_list[node2].append((node1, weight, accessibility_weight))
 
     def add_node(self, node):
+        self._thaw()
+        self.compact = None
         if node not in self.adjacency_list:
             self.adjacency_list[node] = []
 
     def add_edge(self, node1, node2, weight=1, accessibility_weight=1):
+        self._thaw()
+        self.compact = None
         if node1 not in self.adjacency_list:
             self.add_node(node1)
         if node2 not in self.adjacency_list:
@@ -35,6 +45,13 @@ class Graph(object):
         if not self.directed:
             self.adjacency_list[node2].append((node1, weight, accessibility_weight))
 
+    def _thaw(self):
+        """
+        Turn a read-only adjacency view (graph loaded already compiled) back into a mutable dict.
+        """
+        if not isinstance(self.adjacency_list, dict):
+            self.adjacency_list = dict(self.adjacency_list.items())
+
     def get_nodes(self):
         return list(self.adjacency_list.keys())
 
@@ -57,13 +74,24 @@ class Graph(object):
                     file.write(
                         str(node) + " " + str(neighbor) + " " + str(weight) + " " + str(accessibility_weight) + "\n")
 
-    def shortest_path(self, start, end, accessibility_level):
+    def compile(self, landmarks=8, compact=None):
+        """
+        Build the compact CSR representation used by shortest_path until the graph changes again
+        (or adopt a prebuilt one, e.g. from a compiled map file).
+        The A* heuristic (coordinates or ALT landmarks) is precomputed here as well.
+        """
+        self.compact = compact if compact is not None else CompactGraph.from_graph(self)
+        self.compact.heuristic = select_heuristic(self.compact, landmarks)
+        return self.compact
+
+    def shortest_path(self, start, end, accessibility_level, bidirectional=False):
+        if self.compact is not None:
+            return self.compact.shortest_path(start, end, accessibility_level, bidirectional)
         return self._astar_shortest_path(start, end, accessibility_level)
 
     def _astar_shortest_path(self, start, end, accessibility_level):
         priority_queue = [(0, start)]  # (f, node)
-        distances = {node: float('inf') for node in self.adjacency_list}
-        distances[start] = 0
+        distances = {start: 0}  # Missing nodes are at infinite distance
         parents = {}
 
         while priority_queue:
@@ -75,7 +103,7 @@ class Graph(object):
             for neighbor, weight, accessibility_weight in self.adjacency_list[current_node]:
                 if accessibility_weight <= accessibility_level:
                     tentative_distance = distances[current_node] + weight
-                    if tentative_distance < distances[neighbor]:
+                    if tentative_distance < distances.get(neighbor, float('inf')):
                         distances[neighbor] = tentative_distance
                         parents[neighbor] = current_node
                         heuristic = self._heuristic(neighbor, end)
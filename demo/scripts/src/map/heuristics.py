@@ -0,0 +1,123 @@
+import math
+from array import array
+
+
+INF = float('inf')
+
+
+class ZeroHeuristic(object):
+    """
+    Trivial lower bound, turns A* into Dijkstra.
+    """
+
+    def estimate(self, node_id, goal_id):
+        return 0
+
+
+class EuclideanHeuristic(object):
+    """
+    Straight-line distance between room coordinates, scaled so that it never exceeds
+    the weight of any edge (weights are travel costs, not necessarily meters).
+    """
+
+    __slots__ = ('xs', 'ys', 'scale')
+
+    def __init__(self, xs, ys, scale):
+        self.xs = xs
+        self.ys = ys
+        self.scale = scale
+
+    @classmethod
+    def from_compact(cls, compact):
+        """
+        Returns None when nodes have no coordinates or some edge is cheaper than
+        any positive multiple of its length, i.e. when the bound would be useless.
+        """
+        if not all(hasattr(node, 'x') and hasattr(node, 'y') for node in compact.nodes):
+            return None
+
+        xs = array('d', [node.x for node in compact.nodes])
+        ys = array('d', [node.y for node in compact.nodes])
+
+        scale = INF
+        for u in range(len(compact)):
+            for v, weight, _ in compact.edges(u):
+                length = math.sqrt((xs[u] - xs[v]) ** 2 + (ys[u] - ys[v]) ** 2)
+                if length > 0:
+                    scale = min(scale, weight / length)
+
+        if scale == INF or scale <= 0:
+            return None
+        return cls(xs, ys, scale)
+
+    def estimate(self, node_id, goal_id):
+        dx = self.xs[node_id] - self.xs[goal_id]
+        dy = self.ys[node_id] - self.ys[goal_id]
+        return self.scale * math.sqrt(dx * dx + dy * dy)
+
+
+class LandmarkHeuristic(object):
+    """
+    ALT lower bound (A*, landmarks, triangle inequality). Distances from and to a few
+    landmarks are computed once over every edge regardless of accessibility, so the
+    bound holds for any accessibility level.
+    """
+
+    __slots__ = ('landmarks', 'forward', 'backward')
+
+    def __init__(self, landmarks, forward, backward):
+        self.landmarks = landmarks
+        self.forward = forward  # forward[k][v] = d(landmark_k, v)
+        self.backward = backward  # backward[k][v] = d(v, landmark_k)
+
+    @classmethod
+    def from_compact(cls, compact, count=8):
+        if len(compact) == 0:
+            return None
+
+        landmarks = []
+        forward = []
+        backward = []
+
+        # Farthest-point selection: each new landmark is the node farthest from the chosen ones
+        closest = [INF] * len(compact)
+        candidate = 0
+        for _ in range(min(count, len(compact))):
+            landmarks.append(candidate)
+            forward.append(compact.single_source_distances(candidate))
+            backward.append(compact.single_source_distances(candidate, reverse=True))
+
+            best, candidate = -1, None
+            for v in range(len(compact)):
+                d = forward[-1][v]
+                if d < closest[v]:
+                    closest[v] = d
+                if v not in landmarks and closest[v] > best:
+                    best, candidate = closest[v], v
+            if candidate is None:
+                break
+
+        return cls(landmarks, forward, backward)
+
+    def estimate(self, node_id, goal_id):
+        bound = 0
+        for k in range(len(self.landmarks)):
+            to_goal = self.forward[k][goal_id] - self.forward[k][node_id]
+            from_node = self.backward[k][node_id] - self.backward[k][goal_id]
+            if to_goal > bound and to_goal != INF:
+                bound = to_goal
+            if from_node > bound and from_node != INF:
+                bound = from_node
+        return bound
+
+
+def select_heuristic(compact, landmarks=8):
+    """
+    Prefer the coordinate-based bound when the edge weights allow it, otherwise fall back to landmarks.
+    """
+    heuristic = EuclideanHeuristic.from_compact(compact)
+    if heuristic is None:
+        heuristic = LandmarkHeuristic.from_compact(compact, landmarks)
+    if heuristic is None:
+        heuristic = ZeroHeuristic()
+    return heuristic
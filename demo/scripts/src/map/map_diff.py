@@ -0,0 +1,70 @@
+INF = float('inf')
+
+# Tolerance when testing whether an edge lies on a shortest path (sums of float weights)
+EPSILON = 1e-9
+
+
+def edge_weights(compact, accessibility_level):
+    """
+    Cheapest edge between each ordered pair of rooms that the accessibility level can traverse,
+    as {(room name, room name): weight}.
+    """
+    weights = {}
+    for u in range(len(compact)):
+        u_name = str(compact.nodes[u])
+        for v, weight, accessibility_weight in compact.edges(u):
+            key = (u_name, str(compact.nodes[v]))
+            if accessibility_weight <= accessibility_level and weight < weights.get(key, INF):
+                weights[key] = weight
+    return weights
+
+
+def same_rooms(old_compact, new_compact):
+    """
+    Whether both graphs have the same rooms with the same node ids, so that per-node data
+    (route table rows, distance vectors) computed on one can be reused on the other.
+    """
+    return [str(node) for node in old_compact.nodes] == [str(node) for node in new_compact.nodes]
+
+
+def diff_edges(old_compact, new_compact, accessibility_level):
+    """
+    Edges whose cost changed for an accessibility level, as [(room name, room name, old weight, new weight)].
+    Added edges have an infinite old weight, removed or newly inaccessible ones an infinite new weight.
+    """
+    old_weights = edge_weights(old_compact, accessibility_level)
+    new_weights = edge_weights(new_compact, accessibility_level)
+
+    changes = []
+    for key in set(old_weights) | set(new_weights):
+        old_weight, new_weight = old_weights.get(key, INF), new_weights.get(key, INF)
+        if old_weight != new_weight:
+            changes.append((key[0], key[1], old_weight, new_weight))
+    return changes
+
+
+def is_affected(distance_to_u, distance_to_v, old_weight, new_weight):
+    """
+    Whether changing edge u -> v from old_weight to new_weight can change the shortest paths
+    out of a source, given the distances from that source to u and v before the change.
+    A costlier edge only matters if some shortest path used it, a cheaper one if it is a shortcut.
+    """
+    if distance_to_u == INF:
+        return False
+    if new_weight > old_weight:
+        return distance_to_v != INF and abs(distance_to_u + old_weight - distance_to_v) <= EPSILON
+    return distance_to_u + new_weight < distance_to_v - EPSILON
+
+
+def affected_sources(changes, distance, index):
+    """
+    Node ids of the sources whose shortest path tree can be changed by the edge changes.
+    distance(source id, target id) gives the distances before the change, index maps room names to ids.
+    """
+    affected = set()
+    for u_name, v_name, old_weight, new_weight in changes:
+        u, v = index[u_name], index[v_name]
+        for source in range(len(index)):
+            if source not in affected and is_affected(distance(source, u), distance(source, v), old_weight, new_weight):
+                affected.add(source)
+    return affected
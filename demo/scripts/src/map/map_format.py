@@ -0,0 +1,118 @@
+import mmap
+import os
+import struct
+from array import array
+
+from compact_graph import CompactGraph
+from room import Room
+
+
+class CompiledMap(object):
+    """
+    Versioned binary map format, produced by compile_map.py from the text format.
+
+    Layout (little endian, every section aligned to 8 bytes):
+        header
+        room names, utf-8, separated by newlines
+        x, y coordinates            float64[n] each
+        offsets, targets,           int32[n + 1], int32[m]
+        weights, accessibility      float64[m], int32[m]
+        reverse offsets, targets, weights, accessibility (same types)
+
+    Arrays are exposed as views on the memory mapped file where the interpreter supports it
+    (memoryview.cast), otherwise they are copied into arrays with a single bulk read.
+    """
+
+    MAGIC = b'PWAMAP\0\0'
+    VERSION = 1
+    HEADER = struct.Struct('<8sIIIII')  # magic, version, rooms, edges, directed, names size
+
+    # ---------------------------------- Writing --------------------------------- #
+
+    @classmethod
+    def serialize(cls, room_mapper):
+        compact = room_mapper.compact or room_mapper.compile()
+        n, m = len(compact), len(compact.targets)
+
+        names = '\n'.join(str(room) for room in compact.nodes)
+        if not isinstance(names, bytes):
+            names = names.encode('utf-8')
+
+        sections = [
+            cls.HEADER.pack(cls.MAGIC, cls.VERSION, n, m, int(room_mapper.directed), len(names)),
+            names,
+            array('d', [room.x for room in compact.nodes]),
+            array('d', [room.y for room in compact.nodes]),
+            array('i', compact.offsets), array('i', compact.targets),
+            array('d', compact.weights), array('i', compact.accessibility),
+            array('i', compact.rev_offsets), array('i', compact.rev_targets),
+            array('d', compact.rev_weights), array('i', compact.rev_accessibility),
+        ]
+
+        chunks = []
+        for section in sections:
+            if isinstance(section, array):
+                section = section.tostring()
+            chunks.append(section)
+            chunks.append(b'\0' * (-len(section) % 8))
+        return b''.join(chunks)
+
+    @classmethod
+    def save(cls, room_mapper, path):
+        with open(path, 'wb') as f:
+            f.write(cls.serialize(room_mapper))
+
+    # ---------------------------------- Reading --------------------------------- #
+
+    @staticmethod
+    def _view(buffer, offset, count, typecode):
+        size = count * array(typecode).itemsize
+        try:
+            return memoryview(buffer)[offset:offset + size].cast(typecode)
+        except (AttributeError, TypeError):
+            values = array(typecode)
+            values.fromstring(buffer[offset:offset + size])
+            return values
+
+    @classmethod
+    def load(cls, room_mapper, path):
+        """
+        Fill room_mapper from a compiled map file. Returns the memory map, which must stay open
+        as long as the graph views are in use.
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < cls.HEADER.size:
+                raise ValueError("Truncated compiled map: " + path)
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n, m, directed, names_size = cls.HEADER.unpack_from(buffer, 0)
+        if magic != cls.MAGIC:
+            raise ValueError("Not a compiled map: " + path)
+        if version != cls.VERSION:
+            raise ValueError("Unsupported compiled map version " + str(version) + ": " + path)
+
+        offset = cls.HEADER.size + (-cls.HEADER.size % 8)
+        names = buffer[offset:offset + names_size]
+        if not isinstance(names, str):
+            names = names.decode('utf-8')
+        names = names.split('\n') if n else []
+        offset += names_size + (-names_size % 8)
+
+        layout = [(n, 'd'), (n, 'd'), (n + 1, 'i'), (m, 'i'), (m, 'd'), (m, 'i'),
+                  (n + 1, 'i'), (m, 'i'), (m, 'd'), (m, 'i')]
+        views = []
+        for count, typecode in layout:
+            views.append(cls._view(buffer, offset, count, typecode))
+            size = count * array(typecode).itemsize
+            offset += size + (-size % 8)
+        if offset > len(buffer):
+            raise ValueError("Truncated compiled map: " + path)
+
+        xs, ys = views[0], views[1]
+        rooms = [Room(name, xs[i], ys[i]) for i, name in enumerate(names)]
+        compact = CompactGraph(rooms, views[2], views[3], views[4], views[5], reverse=tuple(views[6:]))
+
+        room_mapper.directed = bool(directed)
+        room_mapper.rooms = dict((room.name, room) for room in rooms)
+        room_mapper.set_compiled(compact)
+        return buffer
@@ -0,0 +1,122 @@
+import os
+from array import array
+
+from compact_graph import CompactGraph
+from room import Room
+
+
+class MapFormatError(ValueError):
+
+    def __init__(self, filename, line_number, message):
+        super(MapFormatError, self).__init__(
+            str(filename) + ":" + str(line_number) + ": " + message)
+        self.filename = filename
+        self.line_number = line_number
+
+
+class MapLoader(object):
+    """
+    Single pass, streaming parser for the text map format:
+
+        <room> <x> <y>                                  one line per room
+        <blank line>
+        <room1> <room2> <distance> <accessibility>      one line per connection
+
+    Lines are validated as they are read and errors report the file and line number.
+    Blank lines after the first one and lines starting with '#' are ignored.
+    Connections go straight into flat edge arrays and are turned into a CompactGraph at the
+    end, so no per-edge objects are allocated whatever the size of the file.
+    """
+
+    PROGRESS_INTERVAL = 10000  # Lines between two progress callbacks
+
+    def __init__(self, directed=False, progress=None):
+        self.directed = directed
+        self.progress = progress  # Called with (bytes read, total bytes)
+
+    def load(self, filename):
+        """
+        Returns (rooms, compact graph), rooms being a list ordered as the graph node ids.
+        """
+        total_size = os.path.getsize(filename)
+        bytes_read = 0
+
+        rooms = []
+        index = {}
+        sources, targets = array('l'), array('l')
+        weights, accessibility = array('d'), array('l')
+
+        in_connections = False
+        with open(filename, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                bytes_read += len(line)
+                if self.progress is not None and line_number % self.PROGRESS_INTERVAL == 0:
+                    self.progress(bytes_read, total_size)
+
+                tokens = line.split()
+                if not tokens:
+                    in_connections = in_connections or bool(rooms)
+                    continue
+                if tokens[0].startswith('#'):
+                    continue
+
+                if not in_connections:
+                    name, x, y = self._parse_room(filename, line_number, tokens)
+                    if name in index:
+                        raise MapFormatError(filename, line_number, "duplicate room '" + name + "'")
+                    index[name] = len(rooms)
+                    rooms.append(Room(name, x, y))
+                else:
+                    u, v, weight, level = self._parse_connection(filename, line_number, tokens, index)
+                    sources.append(u)
+                    targets.append(v)
+                    weights.append(weight)
+                    accessibility.append(level)
+                    if not self.directed:
+                        sources.append(v)
+                        targets.append(u)
+                        weights.append(weight)
+                        accessibility.append(level)
+
+        if self.progress is not None:
+            self.progress(bytes_read, total_size)
+
+        return rooms, CompactGraph.from_edges(rooms, sources, targets, weights, accessibility)
+
+    @staticmethod
+    def _parse_room(filename, line_number, tokens):
+        if len(tokens) != 3:
+            raise MapFormatError(filename, line_number,
+                                 "expected '<room> <x> <y>', got " + str(len(tokens)) + " fields")
+        try:
+            return tokens[0], float(tokens[1]), float(tokens[2])
+        except ValueError:
+            raise MapFormatError(filename, line_number, "invalid coordinates for room '" + tokens[0] + "'")
+
+    @staticmethod
+    def _parse_connection(filename, line_number, tokens, index):
+        if len(tokens) != 4:
+            raise MapFormatError(filename, line_number,
+                                 "expected '<room1> <room2> <distance> <accessibility>', got "
+                                 + str(len(tokens)) + " fields")
+
+        for name in tokens[:2]:
+            if name not in index:
+                raise MapFormatError(filename, line_number, "unknown room '" + name + "'")
+
+        try:
+            weight = float(tokens[2])
+        except ValueError:
+            raise MapFormatError(filename, line_number, "invalid distance '" + tokens[2] + "'")
+        try:
+            level = int(tokens[3])
+        except ValueError:
+            raise MapFormatError(filename, line_number, "invalid accessibility level '" + tokens[3] + "'")
+
+        # Zero weight edges let next-hop tables and searches go round in circles
+        if not 0 < weight < float('inf'):
+            raise MapFormatError(filename, line_number, "distance must be positive and finite, got " + tokens[2])
+        if level < 0:
+            raise MapFormatError(filename, line_number, "negative accessibility level " + tokens[3])
+
+        return index[tokens[0]], index[tokens[1]], weight, level
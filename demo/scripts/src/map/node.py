@@ -1,5 +1,7 @@
 class Node(object):
 
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
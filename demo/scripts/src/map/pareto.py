@@ -0,0 +1,98 @@
+import heapq
+
+
+INF = float('inf')
+
+
+class ParetoRouter(object):
+    """
+    Bi-objective search over a compiled graph returning every Pareto optimal trade-off between
+    travel distance and barrier cost, instead of one route per accessibility threshold.
+
+    The barrier cost of an edge is 1 for every edge above level 0 (barrier count) or its
+    accessibility weight (barrier severity). Labels are expanded in lexicographic
+    (distance + heuristic, barriers) order, as in BOA*: a label is dominated as soon as its barrier
+    cost is not lower than the best one already settled at its node or at the target, so each
+    pruning test is O(1).
+    """
+
+    def __init__(self, compact, severity=False, overrides=None):
+        self.compact = compact
+        self.severity = severity
+        self.overrides = overrides or {}  # (u, v) -> cost replacing every u -> v edge, INF = blocked
+
+    def barrier_cost(self, accessibility_weight):
+        if self.severity:
+            return accessibility_weight
+        return 1 if accessibility_weight > 0 else 0
+
+    def frontier(self, start, end, max_accessibility=INF):
+        """
+        Returns [(distance, barrier_cost, [nodes])] sorted by increasing distance (and decreasing barrier cost).
+        """
+        compact = self.compact
+        source = compact.node_id(start)
+        target = compact.node_id(end)
+        if source is None or target is None:
+            return []
+
+        offsets, targets, weights, accessibility = \
+            compact.offsets, compact.targets, compact.weights, compact.accessibility
+        estimate = compact.heuristic.estimate
+        overrides = self.overrides
+
+        # Labels: (distance, barriers, node, parent label index)
+        labels = [(0, 0, source, -1)]
+        best_barriers = {}  # node -> lowest barrier cost among its settled labels
+        priority_queue = [(estimate(source, target), 0, 0)]  # (f, barriers, label index)
+        routes = []
+
+        while priority_queue:
+            _, barriers, label_index = heapq.heappop(priority_queue)
+            distance, _, node, _ = labels[label_index]
+
+            if barriers >= best_barriers.get(node, INF) or barriers >= best_barriers.get(target, INF):
+                continue  # Dominated since it was queued
+            best_barriers[node] = barriers
+
+            if node == target:
+                routes.append((distance, barriers, self._reconstruct_path(labels, label_index)))
+                continue
+
+            for e in range(offsets[node], offsets[node + 1]):
+                if accessibility[e] > max_accessibility:
+                    continue
+                neighbor = targets[e]
+                weight = overrides.get((node, neighbor), weights[e]) if overrides else weights[e]
+                if weight == INF:
+                    continue
+                neighbor_barriers = barriers + self.barrier_cost(accessibility[e])
+                if neighbor_barriers >= best_barriers.get(neighbor, INF) or \
+                        neighbor_barriers >= best_barriers.get(target, INF):
+                    continue
+
+                labels.append((distance + weight, neighbor_barriers, neighbor, label_index))
+                f_score = distance + weight + estimate(neighbor, target)
+                heapq.heappush(priority_queue, (f_score, neighbor_barriers, len(labels) - 1))
+
+        return routes
+
+    def _reconstruct_path(self, labels, label_index):
+        path = []
+        while label_index != -1:
+            _, _, node, label_index = labels[label_index]
+            path.append(self.compact.nodes[node])
+        path.reverse()
+        return path
+
+    @staticmethod
+    def choose(routes, barrier_penalty):
+        """
+        Pick the route minimizing distance + barrier_penalty * barrier cost (a user's trade-off).
+        An infinite penalty selects the barrier-free-most route.
+        """
+        if not routes:
+            return None
+        if barrier_penalty == INF:
+            return min(routes, key=lambda route: (route[1], route[0]))
+        return min(routes, key=lambda route: (route[0] + barrier_penalty * route[1], route[1]))
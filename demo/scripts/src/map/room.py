@@ -3,6 +3,9 @@ import math
 
 
 class Room(Node):
+
+    __slots__ = ('name', 'x', 'y')
+
     def __init__(self, name, x=0, y=0):
         super(Room, self).__init__(name)
         self.name = name
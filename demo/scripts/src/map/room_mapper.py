@@ -1,7 +1,15 @@
+import os
+
 from matplotlib import pyplot as plt
 
 from graph import Graph
 from room import Room
+from compact_graph import CompactAdjacency
+from map_format import CompiledMap
+from map_loader import MapLoader
+from spatial_index import SpatialGrid
+from distance_vector import DistanceVector
+from map_diff import diff_edges, is_affected, same_rooms
 
 
 class RoomMapper(Graph):
@@ -10,6 +18,13 @@ class RoomMapper(Graph):
         super(RoomMapper, self).__init__()
         self.rooms = {}
 
+        # (room name, accessibility level, reverse) -> DistanceVector, valid for one compiled graph
+        self.distance_cache = {}
+        self.distance_cache_graph = None
+
+        self.mapped_buffer = None  # Backing memory map when loaded from a compiled map
+        self.spatial_index = None  # Grid over room coordinates, indexed like the compiled graph
+
     def add_room(self, name, x, y):
         room = Room(name, x, y)
         self.rooms[name] = room
@@ -21,6 +36,27 @@ class RoomMapper(Graph):
         room2 = self.rooms[room2_name]
         self.add_edge(room1, room2, distance, accessibility)
 
+    def compile(self, landmarks=8, compact=None):
+        compact = super(RoomMapper, self).compile(landmarks, compact)
+        self.spatial_index = SpatialGrid.from_rooms(compact.nodes)
+        return compact
+
+    def nearest_room(self, x, y, max_radius=float('inf')):
+        """
+        Room closest to the map position (x, y) as (room, distance), (None, inf) if none is within max_radius.
+        """
+        if self.compact is None:
+            self.compile()
+        node_id, distance = self.spatial_index.nearest(x, y, max_radius)
+        if node_id is None:
+            return None, distance
+        return self.compact.nodes[node_id], distance
+
+    def rooms_within(self, x, y, radius):
+        if self.compact is None:
+            self.compile()
+        return [self.compact.nodes[i] for i in self.spatial_index.within(x, y, radius)]
+
     def get_room(self, name):
         return self.rooms.get(name)
 
@@ -30,6 +66,71 @@ class RoomMapper(Graph):
         distance, path = self.shortest_path(start_room, end_room, max_accessibility)
         return distance, path
 
+    def distances_from(self, start_name, max_accessibility=float('inf')):
+        """
+        Distance from start_name to every room in a single search (one-to-many), cached until the map changes.
+        """
+        return self._distances(start_name, max_accessibility, False)
+
+    def distances_to(self, end_name, max_accessibility=float('inf')):
+        """
+        Distance from every room to end_name (many-to-one), cached until the map changes.
+        """
+        return self._distances(end_name, max_accessibility, True)
+
+    def nearest(self, start_name, candidates, max_accessibility=float('inf')):
+        """
+        Closest room among the candidate names as (room, distance), e.g. the nearest restroom.
+        """
+        return self.distances_from(start_name, max_accessibility).nearest(candidates)
+
+    def _distances(self, name, max_accessibility, reverse):
+        compact = self.compact or self.compile()
+        if self.distance_cache_graph is not compact:
+            self.distance_cache = {}
+            self.distance_cache_graph = compact
+
+        key = (name, max_accessibility, reverse)
+        vector = self.distance_cache.get(key)
+        if vector is None:
+            node_id = compact.node_id(name)
+            if node_id is None:
+                raise KeyError(name)
+            vector = DistanceVector(compact, compact.single_source_distances(node_id, max_accessibility, reverse))
+            self.distance_cache[key] = vector
+        return vector
+
+    def adopt_distances(self, other):
+        """
+        Reuse the cached distance vectors of another version of the map that its edge changes
+        cannot affect. Returns the number of vectors kept.
+        """
+        compact = self.compact or self.compile()
+        old_compact = other.distance_cache_graph
+        if old_compact is None or not same_rooms(old_compact, compact):
+            return 0
+        if self.distance_cache_graph is not compact:
+            self.distance_cache = {}
+            self.distance_cache_graph = compact
+
+        changes = {}  # accessibility level -> changed edges
+        for (name, max_accessibility, reverse), vector in other.distance_cache.items():
+            if max_accessibility not in changes:
+                changes[max_accessibility] = diff_edges(old_compact, compact, max_accessibility)
+
+            affected = False
+            for u, v, old_weight, new_weight in changes[max_accessibility]:
+                if reverse:
+                    # Distances to the room: u -> v is the edge v -> u of the reversed graph
+                    u, v = v, u
+                if is_affected(vector.get(u), vector.get(v), old_weight, new_weight):
+                    affected = True
+                    break
+            if not affected:
+                self.distance_cache[(name, max_accessibility, reverse)] = DistanceVector(compact, vector.distances)
+
+        return len(self.distance_cache)
+
     def save(self, filename):
         with open(filename, 'w') as f:
             # Write rooms (coordinates)
@@ -46,31 +147,54 @@ class RoomMapper(Graph):
                         f.write("{0} {1} {2} {3}\n".format(
                             node.name, neighbor.name, weight, accessibility))
 
-    def load(self, filename):
-        self.rooms.clear()
-        self.adjacency_list.clear()
+    def load(self, filename, progress=None):
+        """
+        Parse a text map in a single streaming pass (see MapLoader for the format).
+        progress, if given, is called with (bytes read, total bytes) while loading.
+        """
+        rooms, compact = MapLoader(self.directed, progress).load(filename)
+        self.rooms = dict((room.name, room) for room in rooms)
+        self.set_compiled(compact)
 
-        with open(filename, 'r') as f:
-            # Read all lines and split by empty line
-            content = f.read().strip()
-            coords_section, graph_section = content.split('\n\n')
-
-            # Process coordinates
-            for line in coords_section.split('\n'):
-                if line.strip():
-                    name, x, y = line.strip().split()
-                    self.add_room(name, float(x), float(y))
+    @classmethod
+    def from_file(cls, filename, progress=None):
+        mapper = cls()
+        mapper.load(filename, progress)
+        return mapper
 
-            # Process graph connections
-            for line in graph_section.split('\n'):
-                if line.strip():
-                    room1, room2, distance, accessibility = line.strip().split()
-                    self.add_connection(room1, room2, float(distance), int(accessibility))
+    @classmethod
+    def open(cls, filename):
+        """
+        Open the compiled version of the map (same name, .bin extension) if it is up to date,
+        otherwise parse the text map.
+        """
+        compiled_filename = os.path.splitext(filename)[0] + '.bin'
+        if compiled_filename != filename and os.path.exists(compiled_filename) \
+                and os.path.getmtime(compiled_filename) >= os.path.getmtime(filename):
+            try:
+                return cls.from_compiled(compiled_filename)
+            except ValueError as e:
+                print("[WARN] Ignoring compiled map: " + str(e))
+
+        if filename.endswith('.bin'):
+            return cls.from_compiled(filename)
+        return cls.from_file(filename)
+
+    def set_compiled(self, compact):
+        """
+        Use an already compiled graph as the only representation; the adjacency list becomes
+        a read-only view over it until the map is modified.
+        """
+        self.adjacency_list = CompactAdjacency(compact)
+        self.compile(compact=compact)
+
+    def load_compiled(self, filename):
+        self.mapped_buffer = CompiledMap.load(self, filename)
 
     @classmethod
-    def from_file(cls, filename):
+    def from_compiled(cls, filename):
         mapper = cls()
-        mapper.load(filename)
+        mapper.load_compiled(filename)
         return mapper
 
     def draw(self):
@@ -0,0 +1,272 @@
+import glob
+import hashlib
+import heapq
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+from array import array
+
+from map_diff import affected_sources
+
+
+INF = float('inf')
+
+# Graph shared with the worker processes (inherited on fork, never pickled)
+_worker_graph = None
+_worker_level = None
+
+
+def _compute_row(source):
+    """
+    Single source Dijkstra that also keeps, for every reached node, the first hop out of source.
+    """
+    graph = _worker_graph
+    offsets, targets, weights, accessibility = graph.offsets, graph.targets, graph.weights, graph.accessibility
+
+    distances = array('d', [INF]) * len(graph)
+    first_hops = array('i', [-1]) * len(graph)
+    distances[source] = 0
+    first_hops[source] = source
+    priority_queue = [(0, source)]
+
+    while priority_queue:
+        current_distance, current = heapq.heappop(priority_queue)
+        if current_distance > distances[current]:
+            continue
+
+        for e in range(offsets[current], offsets[current + 1]):
+            if accessibility[e] <= _worker_level:
+                neighbor = targets[e]
+                tentative_distance = current_distance + weights[e]
+                if tentative_distance < distances[neighbor]:
+                    distances[neighbor] = tentative_distance
+                    first_hops[neighbor] = neighbor if current == source else first_hops[current]
+                    heapq.heappush(priority_queue, (tentative_distance, neighbor))
+
+    # The table is little endian whatever the platform
+    if sys.byteorder != 'little':
+        distances.byteswap()
+        first_hops.byteswap()
+    return distances.tostring(), first_hops.tostring()
+
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RouteTable(object):
+    """
+    All-pairs distance / next-hop table for one accessibility level.
+
+    File layout (little endian): header, node names separated by newlines, padding to 8 bytes,
+    an n x n float64 distance matrix and an n x n int32 next-hop matrix (row = source).
+    The file is memory mapped and entries are decoded on demand, so opening it is O(n) in the names only.
+    """
+
+    MAGIC = b'PWAROUTE'
+    VERSION = 1
+    HEADER = struct.Struct('<8sIiII')  # magic, version, level, node count, names size
+
+    # Below this size forking workers costs more than the computation itself
+    PARALLEL_THRESHOLD = 64
+
+    def __init__(self, names, level, buffer, distances_offset, hops_offset, handle=None):
+        self.names = names
+        self.index = dict((name, i) for i, name in enumerate(names))
+        self.level = level
+        self.buffer = buffer
+        self.distances_offset = distances_offset
+        self.hops_offset = hops_offset
+        self.handle = handle
+
+    # ------------------------------- Construction ------------------------------- #
+
+    @classmethod
+    def serialize(cls, compact, level, processes=None, previous=None, sources=None):
+        """
+        Compute the table for the compiled graph over a process pool and return its binary image.
+        If a previous table over the same nodes is given, only the rows of sources are recomputed
+        and the others are copied from it.
+        """
+        global _worker_graph, _worker_level
+
+        n = len(compact)
+        if previous is None or sources is None:
+            sources = range(n)
+        sources = sorted(sources)
+
+        _worker_graph, _worker_level = compact, level
+        try:
+            if len(sources) < cls.PARALLEL_THRESHOLD or processes == 1:
+                computed = [_compute_row(source) for source in sources]
+            else:
+                pool = multiprocessing.Pool(processes or multiprocessing.cpu_count())
+                try:
+                    computed = pool.map(_compute_row, sources,
+                                        max(1, len(sources) // (4 * (processes or multiprocessing.cpu_count()))))
+                finally:
+                    pool.close()
+                    pool.join()
+        finally:
+            _worker_graph, _worker_level = None, None
+
+        rows = dict(zip(sources, computed))
+        for source in range(n):
+            if source not in rows:
+                rows[source] = previous.row(source)
+
+        names = '\n'.join(str(node) for node in compact.nodes)
+        if not isinstance(names, bytes):
+            names = names.encode('utf-8')
+        header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, int(level), n, len(names))
+        padding = b'\0' * (-(len(header) + len(names)) % 8)
+
+        return b''.join([header, names, padding] +
+                        [rows[source][0] for source in range(n)] + [rows[source][1] for source in range(n)])
+
+    @classmethod
+    def from_buffer(cls, buffer, handle=None):
+        magic, version, level, n, names_size = cls.HEADER.unpack_from(buffer, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("Not a route table (version " + str(cls.VERSION) + ")")
+
+        names_offset = cls.HEADER.size
+        names = buffer[names_offset:names_offset + names_size]
+        if not isinstance(names, str):
+            names = names.decode('utf-8')
+        names = names.split('\n') if n else []
+        distances_offset = names_offset + names_size + (-(names_offset + names_size) % 8)
+        hops_offset = distances_offset + 8 * n * n
+        if len(names) != n or len(buffer) != hops_offset + 4 * n * n:
+            raise ValueError("Truncated route table")
+
+        return cls(names, level, buffer, distances_offset, hops_offset, handle)
+
+    @classmethod
+    def open(cls, path):
+        handle = open(path, 'rb')
+        try:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            return cls.from_buffer(buffer, handle)
+        except (ValueError, struct.error, mmap.error):
+            handle.close()
+            raise ValueError("Invalid route table: " + path)
+
+    @classmethod
+    def cache_path(cls, map_path, level, cache_dir, digest=None):
+        digest = digest or file_digest(map_path)
+        name = os.path.basename(map_path) + '.' + digest + '.' + str(level) + '.routes'
+        return os.path.join(cache_dir, name)
+
+    @classmethod
+    def load_or_build(cls, compact, level, map_path, cache_dir, processes=None):
+        """
+        Memory map the table cached for the current content of map_path, rebuilding it when it is
+        missing, stale or corrupted. If the cache cannot be written the table is kept in memory.
+        """
+        path = cls.cache_path(map_path, level, cache_dir)
+        if os.path.exists(path):
+            try:
+                return cls.open(path)
+            except ValueError:
+                print("[WARN] Discarding invalid route table " + path)
+
+        print("[INFO] Building route table for accessibility level " + str(level))
+        return cls._store(cls.serialize(compact, level, processes), path, map_path, level, cache_dir)
+
+    @classmethod
+    def refresh(cls, previous, compact, level, changes, map_path, cache_dir, processes=None):
+        """
+        Table for a new version of the map, recomputing only the rows of the sources whose routes
+        the changed edges (see map_diff.diff_edges) can affect. Falls back to a full rebuild if
+        the rooms themselves changed.
+        """
+        path = cls.cache_path(map_path, level, cache_dir)
+        if previous.names != [str(node) for node in compact.nodes]:
+            print("[INFO] Rooms changed, rebuilding route table for accessibility level " + str(level))
+            return cls._store(cls.serialize(compact, level, processes), path, map_path, level, cache_dir)
+
+        sources = affected_sources(changes, previous.distance, previous.index)
+        print("[INFO] Updating " + str(len(sources)) + "/" + str(len(previous)) +
+              " route table rows for accessibility level " + str(level))
+        image = cls.serialize(compact, level, processes, previous, sources)
+        return cls._store(image, path, map_path, level, cache_dir)
+
+    @classmethod
+    def _store(cls, image, path, map_path, level, cache_dir):
+        """
+        Write the image to the cache and memory map it, or keep it in memory if that fails.
+        """
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+
+            # Drop tables computed for previous versions of the same map
+            pattern = os.path.basename(map_path) + '.*.' + str(level) + '.routes'
+            for stale in glob.glob(os.path.join(cache_dir, pattern)):
+                if stale != path:
+                    os.remove(stale)
+
+            tmp_path = path + '.' + str(os.getpid()) + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(image)
+            os.rename(tmp_path, path)
+            return cls.open(path)
+        except (IOError, OSError) as e:
+            print("[WARN] Unable to cache route table: " + str(e))
+            return cls.from_buffer(image)
+
+    def close(self):
+        if self.handle is not None:
+            self.buffer.close()
+            self.handle.close()
+            self.handle = None
+
+    # ---------------------------------- Queries --------------------------------- #
+
+    def __len__(self):
+        return len(self.names)
+
+    def distance(self, source_id, target_id):
+        offset = self.distances_offset + 8 * (source_id * len(self.names) + target_id)
+        return struct.unpack_from('<d', self.buffer, offset)[0]
+
+    def row(self, source_id):
+        """
+        Raw (distances, next hops) bytes of a source row.
+        """
+        n = len(self.names)
+        distances = self.distances_offset + 8 * n * source_id
+        hops = self.hops_offset + 4 * n * source_id
+        return bytes(self.buffer[distances:distances + 8 * n]), bytes(self.buffer[hops:hops + 4 * n])
+
+    def next_hop(self, source_id, target_id):
+        offset = self.hops_offset + 4 * (source_id * len(self.names) + target_id)
+        return struct.unpack_from('<i', self.buffer, offset)[0]
+
+    def path(self, start_name, end_name):
+        """
+        Returns (distance, [room names]) walking the next-hop matrix, (inf, []) if unreachable.
+        """
+        source = self.index.get(start_name)
+        target = self.index.get(end_name)
+        if source is None or target is None:
+            return INF, []
+
+        distance = self.distance(source, target)
+        if distance == INF:
+            return INF, []
+
+        # A path visits every node at most once, longer walks go round a cycle of next hops
+        path = [source]
+        while path[-1] != target:
+            if len(path) > len(self.names):
+                raise ValueError("Next hop cycle from " + start_name + " to " + end_name)
+            path.append(self.next_hop(path[-1], target))
+        return distance, [self.names[i] for i in path]
@@ -0,0 +1,111 @@
+import math
+from array import array
+
+
+INF = float('inf')
+
+
+class SpatialGrid(object):
+    """
+    Uniform grid over room coordinates for nearest-room and radius queries. The cell size
+    defaults to the side of a square holding one room on average, so a query only looks
+    at a handful of cells whatever the size of the map.
+    """
+
+    __slots__ = ('xs', 'ys', 'cell_size', 'min_x', 'min_y', 'columns', 'rows', 'cells')
+
+    def __init__(self, xs, ys, cell_size=None):
+        self.xs = array('d', xs)
+        self.ys = array('d', ys)
+
+        n = len(self.xs)
+        self.min_x = min(self.xs) if n else 0.0
+        self.min_y = min(self.ys) if n else 0.0
+        width = (max(self.xs) - self.min_x) if n else 0.0
+        height = (max(self.ys) - self.min_y) if n else 0.0
+
+        if cell_size is None:
+            cell_size = math.sqrt(width * height / n) if n and width * height > 0 else max(width, height, 1.0)
+        self.cell_size = cell_size or 1.0
+
+        self.columns = int(width // self.cell_size) + 1
+        self.rows = int(height // self.cell_size) + 1
+        self.cells = {}
+        for i in range(n):
+            self.cells.setdefault(self._cell(self.xs[i], self.ys[i]), []).append(i)
+
+    @classmethod
+    def from_rooms(cls, rooms, cell_size=None):
+        return cls([room.x for room in rooms], [room.y for room in rooms], cell_size)
+
+    def _cell(self, x, y):
+        return int((x - self.min_x) // self.cell_size), int((y - self.min_y) // self.cell_size)
+
+    def _distance(self, i, x, y):
+        return math.sqrt((self.xs[i] - x) ** 2 + (self.ys[i] - y) ** 2)
+
+    def within(self, x, y, radius):
+        """
+        Ids of the points at most radius away from (x, y).
+        """
+        low_x, low_y = self._cell(x - radius, y - radius)
+        high_x, high_y = self._cell(x + radius, y + radius)
+        low_x, low_y = max(low_x, 0), max(low_y, 0)
+        high_x, high_y = min(high_x, self.columns - 1), min(high_y, self.rows - 1)
+
+        found = []
+        for cx in range(low_x, high_x + 1):
+            for cy in range(low_y, high_y + 1):
+                for i in self.cells.get((cx, cy), ()):
+                    if self._distance(i, x, y) <= radius:
+                        found.append(i)
+        return found
+
+    def nearest(self, x, y, max_radius=INF):
+        """
+        Closest point to (x, y) as (id, distance), (None, inf) if none is within max_radius.
+        Rings of cells are visited outwards until no unvisited cell can hold a closer point.
+        """
+        cx, cy = self._cell(x, y)
+        best, best_distance = None, INF
+
+        # Skip the rings that do not reach the grid, stop once they cover all of it
+        ring = max(0, -cx, -cy, cx - (self.columns - 1), cy - (self.rows - 1))
+        max_ring = max(cx, cy, self.columns - 1 - cx, self.rows - 1 - cy)
+
+        while ring <= max_ring:
+            for cell in self._ring(cx, cy, ring):
+                for i in self.cells.get(cell, ()):
+                    distance = self._distance(i, x, y)
+                    if distance < best_distance:
+                        best, best_distance = i, distance
+
+            # Cells beyond this ring are at least ring * cell_size away
+            bound = ring * self.cell_size
+            if best_distance <= bound or bound > max_radius:
+                break
+            ring += 1
+
+        if best_distance > max_radius:
+            return None, INF
+        return best, best_distance
+
+    def _ring(self, cx, cy, ring):
+        """
+        Cells at Chebyshev distance ring from (cx, cy), clipped to the grid.
+        """
+        if ring == 0:
+            yield cx, cy
+            return
+
+        low_x, high_x = max(cx - ring, 0), min(cx + ring, self.columns - 1)
+        for cell_y in (cy - ring, cy + ring):
+            if 0 <= cell_y < self.rows:
+                for cell_x in range(low_x, high_x + 1):
+                    yield cell_x, cell_y
+
+        low_y, high_y = max(cy - ring + 1, 0), min(cy + ring - 1, self.rows - 1)
+        for cell_x in (cx - ring, cx + ring):
+            if 0 <= cell_x < self.columns:
+                for cell_y in range(low_y, high_y + 1):
+                    yield cell_x, cell_y
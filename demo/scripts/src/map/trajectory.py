@@ -0,0 +1,181 @@
+import bisect
+import math
+from array import array
+
+
+class Trajectory(object):
+    """
+    A route compiled once into per-segment arrays (segment i goes from room i to room i + 1):
+    headings, unit directions, lengths, turn angles at the start of each segment and a
+    trapezoidal speed profile (entry, peak and exit speed, acceleration and braking distances).
+
+    Corners are taken at a speed that decreases with the turn angle (a full stop from 90
+    degrees on), and the profile is made feasible with the acceleration limit by a forward and
+    a backward pass over the corner speeds. At run time the control loop only indexes into
+    the arrays. Speeds are never below min_speed so the robot does not stall at the waypoints.
+    """
+
+    __slots__ = ('rooms', 'max_speed', 'acceleration', 'min_speed',
+                 'xs', 'ys', 'headings', 'cosines', 'sines', 'lengths', 'starts', 'turns',
+                 'entry_speeds', 'peak_speeds', 'exit_speeds', 'accelerate_until', 'brake_from',
+                 'durations', 'start_times')
+
+    def __init__(self, rooms, max_speed, acceleration, min_speed=0.05):
+        self.rooms = list(rooms)
+        self.max_speed = max_speed
+        self.acceleration = acceleration
+        self.min_speed = min(min_speed, max_speed)
+
+        self.xs = array('d', [room.x for room in self.rooms])
+        self.ys = array('d', [room.y for room in self.rooms])
+        self._compile_geometry()
+        self._compile_profile()
+
+    def __len__(self):
+        """
+        Number of segments.
+        """
+        return len(self.lengths)
+
+    # -------------------------------- Compilation ------------------------------- #
+
+    def _compile_geometry(self):
+        xs, ys = self.xs, self.ys
+        self.headings, self.cosines, self.sines = array('d'), array('d'), array('d')
+        self.lengths, self.starts, self.turns = array('d'), array('d'), array('d')
+
+        total = 0.0
+        for i in range(len(xs) - 1):
+            dx, dy = xs[i + 1] - xs[i], ys[i + 1] - ys[i]
+            length = math.hypot(dx, dy)
+            heading = math.atan2(dy, dx) if length > 0 else (self.headings[-1] if i else 0.0)
+
+            self.headings.append(heading)
+            self.cosines.append(dx / length if length > 0 else 0.0)
+            self.sines.append(dy / length if length > 0 else 0.0)
+            self.lengths.append(length)
+            self.starts.append(total)
+            self.turns.append(normalize_angle(heading - self.headings[i - 1]) if i else 0.0)
+            total += length
+
+    def _compile_profile(self):
+        n = len(self.lengths)
+        max_speed, acceleration = self.max_speed, self.acceleration
+
+        # Speed allowed at each waypoint: stop at both ends, slow down before sharp corners
+        corners = array('d', [0.0]) * (n + 1)
+        for i in range(1, n):
+            corners[i] = max_speed * max(0.0, math.cos(self.turns[i]))
+
+        # Forward pass (acceleration), then backward pass (braking)
+        for i in range(n):
+            corners[i + 1] = min(corners[i + 1], math.sqrt(corners[i] ** 2 + 2 * acceleration * self.lengths[i]))
+        for i in range(n - 1, -1, -1):
+            corners[i] = min(corners[i], math.sqrt(corners[i + 1] ** 2 + 2 * acceleration * self.lengths[i]))
+
+        self.entry_speeds, self.peak_speeds, self.exit_speeds = array('d'), array('d'), array('d')
+        self.accelerate_until, self.brake_from = array('d'), array('d')
+        self.durations, self.start_times = array('d'), array('d')
+
+        elapsed = 0.0
+        for i in range(n):
+            v_in, v_out, length = corners[i], corners[i + 1], self.lengths[i]
+
+            # Peak reachable from both ends, capped by the maximum speed
+            peak = min(max_speed, math.sqrt((2 * acceleration * length + v_in ** 2 + v_out ** 2) / 2))
+            peak = max(peak, v_in, v_out)
+            accelerate_until = (peak ** 2 - v_in ** 2) / (2 * acceleration)
+            brake_from = length - (peak ** 2 - v_out ** 2) / (2 * acceleration)
+
+            duration = 0.0
+            if peak > 0:
+                duration = (peak - v_in) / acceleration + (peak - v_out) / acceleration + \
+                    max(0.0, brake_from - accelerate_until) / peak
+
+            self.entry_speeds.append(v_in)
+            self.peak_speeds.append(peak)
+            self.exit_speeds.append(v_out)
+            self.accelerate_until.append(accelerate_until)
+            self.brake_from.append(brake_from)
+            self.durations.append(duration)
+            self.start_times.append(elapsed)
+            elapsed += duration
+
+    # ---------------------------------- Queries --------------------------------- #
+
+    def length(self):
+        return self.starts[-1] + self.lengths[-1] if len(self.lengths) else 0.0
+
+    def duration(self):
+        return self.start_times[-1] + self.durations[-1] if len(self.durations) else 0.0
+
+    def progress(self, segment, x, y):
+        """
+        Distance travelled along a segment by the point (x, y) projected on it, clamped to the segment.
+        """
+        s = (x - self.xs[segment]) * self.cosines[segment] + (y - self.ys[segment]) * self.sines[segment]
+        return min(max(s, 0.0), self.lengths[segment])
+
+    def position(self, distance):
+        """
+        Point at a distance along the whole route as (x, y, segment), clamped to its ends.
+        """
+        if not len(self.lengths):
+            return self.xs[0], self.ys[0], 0
+        segment = max(0, min(bisect.bisect_right(self.starts, distance) - 1, len(self.lengths) - 1))
+        s = min(max(distance - self.starts[segment], 0.0), self.lengths[segment])
+        return self.xs[segment] + s * self.cosines[segment], self.ys[segment] + s * self.sines[segment], segment
+
+    def cross_track_error(self, segment, x, y):
+        """
+        Signed distance of (x, y) from the line of a segment (positive on its left).
+        """
+        return (y - self.ys[segment]) * self.cosines[segment] - (x - self.xs[segment]) * self.sines[segment]
+
+    def time_at(self, segment, s):
+        """
+        Planned time to go from the start of a segment to distance s into it.
+        """
+        s = min(max(s, 0.0), self.lengths[segment])
+        v_in, peak = self.entry_speeds[segment], self.peak_speeds[segment]
+        accelerate_until = self.accelerate_until[segment]
+        brake_from = max(self.brake_from[segment], accelerate_until)
+        if peak <= 0:
+            return 0.0
+
+        if s <= accelerate_until:
+            return (math.sqrt(v_in ** 2 + 2 * self.acceleration * s) - v_in) / self.acceleration
+        elapsed = (peak - v_in) / self.acceleration
+        if s <= brake_from:
+            return elapsed + (s - accelerate_until) / peak
+        elapsed += (brake_from - accelerate_until) / peak
+        speed = math.sqrt(self.exit_speeds[segment] ** 2 + 2 * self.acceleration * (self.lengths[segment] - s))
+        return elapsed + max(0.0, peak - speed) / self.acceleration
+
+    def time_left(self, segment, s):
+        """
+        Planned time from distance s into a segment to the end of the route.
+        """
+        if segment >= len(self.lengths):
+            return 0.0
+        return max(0.0, self.duration() - self.start_times[segment] - self.time_at(segment, s))
+
+    def speed(self, segment, s):
+        """
+        Planned speed at distance s into a segment.
+        """
+        if s < self.accelerate_until[segment]:
+            speed = math.sqrt(self.entry_speeds[segment] ** 2 + 2 * self.acceleration * s)
+        elif s > self.brake_from[segment]:
+            remaining = max(0.0, self.lengths[segment] - s)
+            speed = math.sqrt(self.exit_speeds[segment] ** 2 + 2 * self.acceleration * remaining)
+        else:
+            speed = self.peak_speeds[segment]
+        return max(speed, self.min_speed)
+
+
+def normalize_angle(angle):
+    """
+    Same angle in [-pi, pi).
+    """
+    return (angle + math.pi) % (2 * math.pi) - math.pi
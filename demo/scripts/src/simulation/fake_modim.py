@@ -0,0 +1,115 @@
+import errno
+import socket
+import time
+import types
+
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+
+class FakeInteractionManager(object):
+    """
+    Stand-in for the MODIM interaction manager (im) the interactions run with. Questions are
+    answered from a script: answers[action] lists the replies to successive asks of action, each
+    a reply or a (delay in seconds, reply) pair. Unscripted questions time out.
+    Actions take execute_time seconds of the clock. Everything done is logged.
+    """
+
+    def __init__(self, answers=None, clock=time, execute_time=0.0):
+        self.answers = dict((action, list(replies)) for action, replies in (answers or {}).items())
+        self.clock = clock  # Anything with sleep(), e.g. the time module or a VirtualClock
+        self.execute_time = execute_time
+        self.profile = None
+        self.log = []
+
+    def ask(self, action, timeout=None):
+        replies = self.answers.get(action)
+        if not replies:
+            self.clock.sleep(timeout or 0)
+            self.log.append(('ask', action, 'timeout'))
+            return 'timeout'
+
+        reply = replies.pop(0)
+        delay, reply = reply if isinstance(reply, tuple) else (0.0, reply)
+        self.clock.sleep(delay)
+        self.log.append(('ask', action, reply))
+        return reply
+
+    def execute(self, action):
+        self.clock.sleep(self.execute_time)
+        self.log.append(('execute', action))
+
+    def executeModality(self, modality, interaction):
+        self.log.append(('modality', modality, interaction))
+
+    def setProfile(self, profile):
+        self.profile = profile
+
+    def setDemoPath(self, path):
+        pass
+
+    def init(self):
+        self.log.append(('init',))
+
+
+class FakeResultConnection(object):
+
+    def __init__(self, results):
+        self.results = results
+
+    def sendall(self, data):
+        self.results.post(data.strip())
+
+    def close(self):
+        pass
+
+
+class FakeSocketModule(object):
+    """
+    socket module of the interactions: connections to the address of the result channel post to
+    it in process, others are refused like when nothing listens.
+    """
+
+    error = socket.error
+
+    def __init__(self, results=None):
+        self.results = results
+
+    def create_connection(self, address, timeout=None):
+        if self.results is None or tuple(address) != self.results.address:
+            raise socket.error(errno.ECONNREFUSED, "Connection refused")
+        return FakeResultConnection(self.results)
+
+
+class FakeModimWSClient(object):
+    """
+    Stand-in for ModimWSClient running the interactions in process: the code of an interaction
+    runs with the fake im, the given clock as time module (time() and sleep()), and its results
+    handed to the results channel (a ResultChannel) directly instead of through its socket.
+    """
+
+    def __init__(self, im, clock=time, results=None):
+        self.im = im
+        self.clock = clock
+        self.socket = FakeSocketModule(results)
+
+    def setDemoPathAuto(self, path):
+        pass
+
+    def _import(self, name, *args, **kwargs):
+        if name == 'socket':
+            return self.socket
+        return builtins.__import__(name, *args, **kwargs)
+
+    def run_interaction(self, interaction):
+        function = getattr(interaction, '__func__', interaction)
+        namespace = dict(function.__globals__)
+        namespace.update(im=self.im, time=self.clock)
+        namespace['__builtins__'] = dict(vars(builtins), __import__=self._import)
+        rebound = types.FunctionType(function.__code__, namespace, function.__name__,
+                                     function.__defaults__, function.__closure__)
+
+        owner = getattr(interaction, '__self__', None)
+        return rebound(owner) if owner is not None else rebound()
@@ -0,0 +1,152 @@
+import math
+import time
+
+
+class FakeFuture(object):
+    """
+    Minimal qi.Future for calls that complete at a given time of the fake clock.
+    Callbacks run as soon as the future is seen finished (in wait, isFinished or addCallback).
+    """
+
+    def __init__(self, value, done_at, clock, sleep):
+        self._value = value
+        self.done_at = done_at
+        self.clock = clock
+        self.sleep = sleep
+        self.canceled = False
+        self.callbacks = []
+
+    def isFinished(self):
+        finished = self.canceled or self.clock() >= self.done_at
+        if finished and self.callbacks:
+            callbacks, self.callbacks = self.callbacks, []
+            for callback in callbacks:
+                callback(self)
+        return finished
+
+    def isCanceled(self):
+        return self.canceled
+
+    def hasValue(self):
+        return self.isFinished() and not self.canceled
+
+    def hasError(self):
+        return False
+
+    def error(self):
+        return ''
+
+    def cancel(self):
+        if not self.isFinished():
+            self.canceled = True
+            self.isFinished()
+
+    def addCallback(self, callback):
+        self.callbacks.append(callback)
+        self.isFinished()
+
+    def wait(self, timeout=None):
+        remaining = self.done_at - self.clock()
+        if remaining > 0 and not self.canceled:
+            self.sleep(remaining if timeout is None else min(remaining, timeout / 1000.0))
+        return self.isFinished()
+
+    def value(self, timeout=None):
+        self.wait(timeout)
+        return self._value
+
+
+class FakeMotion(object):
+    """
+    Stand-in for the ALMotion service on a plain Linux box. Velocity commands are integrated
+    into an odometry pose over the given clock; getRobotPosition can be slowed down by a fixed
+    latency to reproduce a loaded robot. Calls are counted by method name.
+    """
+
+    # Velocities reached by moveToward(1, 1, 1)
+    MAX_LINEAR_SPEED = 0.35  # m/s
+    MAX_ANGULAR_SPEED = 1.0  # rad/s
+
+    # Integration step (s)
+    STEP = 0.01
+
+    def __init__(self, x=0.0, y=0.0, theta=0.0, clock=time.time, sleep=time.sleep, latency=0.0):
+        self.x, self.y, self.theta = x, y, theta
+        self.clock = clock
+        self.sleep = sleep
+        self.latency = latency
+
+        self.velocity = (0.0, 0.0, 0.0)  # Robot frame (vx, vy, omega)
+        self.last_update = clock()
+        self.calls = {}
+        self.angles = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _integrate(self):
+        now = self.clock()
+        elapsed, self.last_update = now - self.last_update, now
+
+        vx, vy, omega = self.velocity
+        while elapsed > 0:
+            dt = min(self.STEP, elapsed)
+            self.x += (vx * math.cos(self.theta) - vy * math.sin(self.theta)) * dt
+            self.y += (vx * math.sin(self.theta) + vy * math.cos(self.theta)) * dt
+            self.theta = (self.theta + omega * dt + math.pi) % (2 * math.pi) - math.pi
+            elapsed -= dt
+
+    # ----------------------------------- ALMotion ------------------------------- #
+
+    def moveToward(self, x, y, theta, *args):
+        self._count('moveToward')
+        self._integrate()
+        clamp = lambda value: max(-1.0, min(1.0, value))
+        self.velocity = (clamp(x) * self.MAX_LINEAR_SPEED, clamp(y) * self.MAX_LINEAR_SPEED,
+                         clamp(theta) * self.MAX_ANGULAR_SPEED)
+
+    def stopMove(self):
+        self._count('stopMove')
+        self._integrate()
+        self.velocity = (0.0, 0.0, 0.0)
+
+    def getRobotPosition(self, use_sensors):
+        self._count('getRobotPosition')
+        if self.latency:
+            self.sleep(self.latency)
+        self._integrate()
+        return [self.x, self.y, self.theta]
+
+    def setAngles(self, names, angles, speed, _async=False):
+        self._count('setAngles')
+        if isinstance(names, str):
+            names, angles = [names], [angles]
+        self.angles.update(zip(names, angles))
+
+    def getAngles(self, names, use_sensors):
+        self._count('getAngles')
+        if isinstance(names, str):
+            names = [names]
+        return [self.angles.get(name, 0.0) for name in names]
+
+    def angleInterpolation(self, names, angle_lists, time_lists, is_absolute, _async=False):
+        """
+        Joints jump to their final angles; the call completes after the longest time list.
+        """
+        self._count('angleInterpolation')
+        if isinstance(names, str):
+            names, angle_lists, time_lists = [names], [angle_lists], [time_lists]
+        duration = 0.0
+        for name, angles, times in zip(names, angle_lists, time_lists):
+            angles = angles if isinstance(angles, list) else [angles]
+            times = times if isinstance(times, list) else [times]
+            self.angles[name] = angles[-1] if is_absolute else self.angles.get(name, 0.0) + sum(angles)
+            duration = max(duration, times[-1])
+
+        future = FakeFuture(None, self.clock() + duration, self.clock, self.sleep)
+        if _async:
+            return future
+        future.wait()
+
+    def setExternalCollisionProtectionEnabled(self, name, enabled):
+        self._count('setExternalCollisionProtectionEnabled')
@@ -0,0 +1,167 @@
+import inspect
+import time
+
+from fake_motion import FakeFuture
+from kinematic_base import SimulatedBase
+from ..actions.action_manager import head_middle_touch_key
+
+# inspect.getargspec is gone from recent Python 3
+_argspec = getattr(inspect, 'getfullargspec', None) or inspect.getargspec
+
+
+class FakeSignal(object):
+
+    def __init__(self):
+        self.callbacks = {}
+        self.ids = 0
+
+    def connect(self, callback):
+        self.ids += 1
+        self.callbacks[self.ids] = callback
+        return self.ids
+
+    def disconnect(self, signal_id):
+        self.callbacks.pop(signal_id, None)
+
+    def __call__(self, value):
+        for callback in list(self.callbacks.values()):
+            callback(value)
+
+
+class FakeSubscriber(object):
+
+    def __init__(self, signal):
+        self.signal = signal
+
+
+class FakeMemory(object):
+    """
+    ALMemory: a dict of keys, and events delivered synchronously to their subscribers.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.signals = {}
+
+    def getData(self, key):
+        return self.data.get(key)
+
+    def getListData(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def insertData(self, key, value):
+        self.data[key] = value
+
+    def subscriber(self, event):
+        return FakeSubscriber(self.signals.setdefault(event, FakeSignal()))
+
+    def raiseEvent(self, event, value):
+        self.data[event] = value
+        if event in self.signals:
+            self.signals[event](value)
+
+
+class FakeTouch(object):
+    """
+    ALTouch, reading the head sensor from the fake memory.
+    """
+
+    def __init__(self, memory):
+        self.memory = memory
+
+    def getStatus(self):
+        return [["Head/Touch/Middle", bool(self.memory.getData(head_middle_touch_key)), []]]
+
+
+class FakeBehaviorManager(object):
+
+    def __init__(self, behaviors=()):
+        self.behaviors = list(behaviors)
+
+    def getInstalledBehaviors(self):
+        return list(self.behaviors)
+
+
+class FakeRecorder(object):
+    """
+    ALAnimatedSpeech / ALAnimationPlayer: calls are only logged.
+    """
+
+    def __init__(self):
+        self.log = []
+
+    def say(self, text, *args):
+        self.log.append(('say', text))
+
+    def run(self, animation, *args):
+        self.log.append(('run', animation))
+
+
+class FakeAsyncService(object):
+    """
+    Lets every method of a fake service take _async=True like qi methods do: methods that do not
+    take it themselves return a future completed right away.
+    """
+
+    def __init__(self, service, clock, sleep):
+        self._service = service
+        self._clock = clock
+        self._sleep = sleep
+        self._methods = {}
+
+    def __getattr__(self, name):
+        method = self._methods.get(name)
+        if method is not None:
+            return method
+
+        attribute = getattr(self._service, name)
+        if not callable(attribute):
+            return attribute
+        try:
+            takes_async = '_async' in _argspec(attribute).args
+        except TypeError:
+            takes_async = False
+        if takes_async:
+            return attribute
+
+        def call(*args, **kwargs):
+            if kwargs.pop('_async', False):
+                return FakeFuture(attribute(*args, **kwargs), self._clock(), self._clock, self._sleep)
+            return attribute(*args, **kwargs)
+
+        self._methods[name] = call
+        return call
+
+
+class FakeSession(object):
+    """
+    qi session serving fake ALMotion (a SimulatedBase), ALMemory, ALTouch, ALBehaviorManager,
+    ALAnimatedSpeech and ALAnimationPlayer services, all on the given clock.
+    """
+
+    def __init__(self, clock=time.time, sleep=time.sleep, motion=None, behaviors=()):
+        self.clock = clock
+        self.sleep = sleep
+        self.motion = motion or SimulatedBase(clock=clock, sleep=sleep)
+        self.memory = FakeMemory()
+        self.services = {
+            "ALMotion": self.motion,
+            "ALMemory": self.memory,
+            "ALTouch": FakeTouch(self.memory),
+            "ALBehaviorManager": FakeBehaviorManager(behaviors),
+            "ALAnimatedSpeech": FakeRecorder(),
+            "ALAnimationPlayer": FakeRecorder(),
+        }
+
+    def service(self, name):
+        if name not in self.services:
+            raise RuntimeError("Cannot find service '" + name + "' in index")
+        return FakeAsyncService(self.services[name], self.clock, self.sleep)
+
+    def touch_head(self, touched):
+        """
+        Press (True) or release (False) the middle head sensor.
+        """
+        value = 1.0 if touched else 0.0
+        self.memory.insertData(head_middle_touch_key, value)
+        self.memory.raiseEvent("MiddleTactilTouched", value)
@@ -0,0 +1,77 @@
+import math
+import random
+import time
+
+from fake_motion import FakeMotion
+
+
+class SimulatedBase(FakeMotion):
+    """
+    2D kinematic model of the Pepper omnidirectional base behind the ALMotion calls we use.
+    Commanded velocities are reached with bounded accelerations, and the odometry returned by
+    getRobotPosition drifts from the true pose with gaussian noise proportional to the motion
+    (seeded, so runs are reproducible). true_pose() gives the ground truth for benchmarks.
+    """
+
+    MAX_LINEAR_ACCELERATION = 0.3  # m/s^2
+    MAX_ANGULAR_ACCELERATION = 0.75  # rad/s^2
+
+    def __init__(self, x=0.0, y=0.0, theta=0.0, clock=time.time, sleep=time.sleep, latency=0.0,
+                 linear_noise=0.0, angular_noise=0.0, seed=None):
+        self.true_x, self.true_y, self.true_theta = x, y, theta
+        self.target_velocity = (0.0, 0.0, 0.0)
+        self.linear_noise = linear_noise  # Odometry error std per meter travelled
+        self.angular_noise = angular_noise  # Odometry error std per radian turned
+        self.random = random.Random(seed)
+        super(SimulatedBase, self).__init__(x, y, theta, clock, sleep, latency)
+
+    def true_pose(self):
+        self._integrate()
+        return self.true_x, self.true_y, self.true_theta
+
+    def _ramp(self, current, target, limit):
+        return current + max(-limit, min(limit, target - current))
+
+    def _integrate(self):
+        now = self.clock()
+        elapsed, self.last_update = now - self.last_update, now
+
+        while elapsed > 0:
+            dt = min(self.STEP, elapsed)
+            elapsed -= dt
+
+            (vx, vy, omega), (tx, ty, tomega) = self.velocity, self.target_velocity
+            self.velocity = vx, vy, omega = (self._ramp(vx, tx, self.MAX_LINEAR_ACCELERATION * dt),
+                                             self._ramp(vy, ty, self.MAX_LINEAR_ACCELERATION * dt),
+                                             self._ramp(omega, tomega, self.MAX_ANGULAR_ACCELERATION * dt))
+
+            # Ground truth
+            dx, dy, dtheta = vx * dt, vy * dt, omega * dt
+            self.true_x += dx * math.cos(self.true_theta) - dy * math.sin(self.true_theta)
+            self.true_y += dx * math.sin(self.true_theta) + dy * math.cos(self.true_theta)
+            self.true_theta = (self.true_theta + dtheta + math.pi) % (2 * math.pi) - math.pi
+
+            # Odometry, integrating noisy increments
+            step = math.hypot(dx, dy)
+            if self.linear_noise and step:
+                dx += self.random.gauss(0, self.linear_noise * step)
+                dy += self.random.gauss(0, self.linear_noise * step)
+            if self.angular_noise and dtheta:
+                dtheta += self.random.gauss(0, self.angular_noise * abs(dtheta))
+            self.x += dx * math.cos(self.theta) - dy * math.sin(self.theta)
+            self.y += dx * math.sin(self.theta) + dy * math.cos(self.theta)
+            self.theta = (self.theta + dtheta + math.pi) % (2 * math.pi) - math.pi
+
+    # ----------------------------------- ALMotion ------------------------------- #
+
+    def moveToward(self, x, y, theta, *args):
+        self._count('moveToward')
+        self._integrate()
+        clamp = lambda value: max(-1.0, min(1.0, value))
+        self.target_velocity = (clamp(x) * self.MAX_LINEAR_SPEED, clamp(y) * self.MAX_LINEAR_SPEED,
+                                clamp(theta) * self.MAX_ANGULAR_SPEED)
+
+    def stopMove(self):
+        self._count('stopMove')
+        self._integrate()
+        self.target_velocity = (0.0, 0.0, 0.0)
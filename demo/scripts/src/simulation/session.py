@@ -0,0 +1,118 @@
+import os
+import sys
+import tempfile
+
+from ..actions.action_manager import ActionManager
+from ..automaton.robot_automaton import create_automaton
+from ..automaton.scheduler import Scheduler
+from fake_modim import FakeInteractionManager, FakeModimWSClient
+from fake_session import FakeSession
+from trip import VirtualClock, VirtualExecutor
+
+
+class SessionScript(object):
+    """
+    What the user of a simulated guided session does:
+    - asks to go from start to target, as a blind or deaf user
+    - touches (True) and releases (False) the robot head at the given times (s, from the start
+      of the guidance)
+    - answers the MODIM questions as listed in answers (see FakeInteractionManager), by default
+      accepting help and asking for target
+    """
+
+    def __init__(self, start, target, disability='deaf', touches=(), answers=None):
+        self.start = start
+        self.target = target
+        self.disability = disability
+        self.touches = sorted(touches)
+        self.answers = {disability + '_ask_help': ['yes'], disability + '_agree': [target]}
+        self.answers.update(answers or {})
+
+
+def random_script(rooms, random, releases=0.5):
+    """
+    Script between two random rooms: the head is touched after a few seconds and, with probability
+    releases, released once on the way and touched again or left released.
+    """
+    start, target = random.sample(rooms, 2)
+    first_touch = random.uniform(0.5, 5.0)
+    touches = [(first_touch, True)]
+    if random.random() < releases:
+        release = first_touch + random.uniform(1.0, 20.0)
+        touches.append((release, False))
+        if random.random() < 0.7:
+            touches.append((release + random.uniform(0.2, 10.0), True))
+    return SessionScript(start, target, random.choice(['blind', 'deaf']), touches)
+
+
+def run_session(script, position_manager, wtime=60, time_limit=900, follower=None, outcome_path=None,
+                quiet=True, trace_path=None):
+    """
+    Run a guided session on a virtual clock, single threaded and deterministic: the assistance
+    dialog, then the automaton from create_automaton on fake NAOqi services and MODIM, until it
+    quits or time_limit (simulated s) passes. The automaton timers, control loop, interactions and
+    event dispatch are all driven from here, jumping the clock to the next timer.
+    Returns the session statistics: outcome ('quit', 'declined', 'no_route' or 'timeout'),
+    whether the goal was reached, states visited, simulated time, distance walked and RPCs made.
+    """
+    clock = VirtualClock()
+    session = FakeSession(clock.time, clock.sleep)
+    action_manager = ActionManager(session, outcome_path or os.path.join(tempfile.gettempdir(), 'outcome.txt'))
+    im = FakeInteractionManager(script.answers, clock)
+    modim_web_server = FakeModimWSClient(im, clock, action_manager.results)
+
+    stats = {'outcome': None, 'reached': False, 'states': [], 'time': 0.0, 'distance': 0.0}
+    stdout = sys.stdout
+    if quiet:
+        sys.stdout = open(os.devnull, 'w')  # Silence the [INFO] logs
+    try:
+        if script.disability == 'blind':
+            target = action_manager.run_dialog(modim_web_server, action_manager.interaction_blind_assist)
+        else:
+            target = action_manager.run_dialog(modim_web_server, action_manager.interaction_deaf_assist)
+        if target == 'failure':
+            stats['outcome'] = 'declined'
+            return stats
+
+        position_manager.reset()
+        if not position_manager.is_valid(target) or not position_manager.compute_path(script.start, target, script.disability):
+            stats['outcome'] = 'no_route'
+            return stats
+
+        scheduler = Scheduler(clock.time, tick=0.01)
+        automaton = create_automaton(modim_web_server, action_manager, position_manager,
+                                     timeout=wtime, disability=script.disability, clock=clock.time,
+                                     sleep=clock.sleep, follower=follower, scheduler=scheduler,
+                                     trace_path=trace_path, threaded=False,
+                                     dialogs=VirtualExecutor(clock, scheduler))
+        started = clock.time()
+        for at, touched in script.touches:
+            scheduler.schedule(started + at - clock.time(), session.touch_head, touched)
+
+        automaton.start('steady_state')
+        while automaton.current_state.name != 'quit_state':
+            if automaton.dispatch_pending():
+                continue
+            due = [when for when in (scheduler.next_deadline(), automaton.events.next_due()) if when is not None]
+            if not due or min(due) > time_limit:
+                break
+            # Just past the deadline, so that it counts as reached whatever the rounding
+            clock.now = max(clock.now, min(due) + scheduler.tick * 1e-3)
+            scheduler.advance()
+
+        states = [record[3] for record in automaton.tracer.recent() if record[3] is not None]
+        stats.update({
+            'outcome': 'quit' if automaton.current_state.name == 'quit_state' else 'timeout',
+            'reached': 'goal_state' in states,
+            'states': states,
+            'distance': position_manager.progress.walked,
+            'rpcs': action_manager.rpc_stats.total(),
+            'tracer': automaton.tracer,
+        })
+        return stats
+    finally:
+        stats['time'] = clock.time()
+        action_manager.close()
+        if quiet:
+            sys.stdout.close()
+            sys.stdout = stdout
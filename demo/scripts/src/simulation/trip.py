@@ -0,0 +1,154 @@
+import collections
+import math
+import os
+import sys
+import tempfile
+
+from ..actions.action_manager import ActionManager
+from ..actions.futures import Future
+from ..automaton.automaton import State
+from ..automaton.robot_automaton import MovingState, RobotAutomaton
+from ..automaton.scheduler import Scheduler
+from fake_modim import FakeInteractionManager, FakeModimWSClient
+from fake_session import FakeSession
+from kinematic_base import SimulatedBase
+
+
+class VirtualClock(object):
+    """
+    Clock advanced only by sleep(), so simulated trips run as fast as the CPU allows.
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+
+class VirtualExecutor(object):
+    """
+    Executor running the calls on a VirtualClock as a worker thread would, one at a time in
+    submission order: a call starts once the previous one is over and lasts the clock time it
+    sleeps, but the clock is put back when it returns, its Future completing from a scheduler
+    timer at its end instead. Calls cancelled before starting are skipped.
+    """
+
+    def __init__(self, clock, scheduler):
+        self.clock = clock
+        self.scheduler = scheduler
+        self.calls = collections.deque()
+        self.busy = False
+
+    def submit(self, function, *args, **kwargs):
+        future = Future(getattr(function, '__name__', None))
+        self.calls.append((future, function, args, kwargs))
+        if not self.busy:
+            self._next()
+        return future
+
+    def _next(self):
+        self.busy = False
+        while self.calls:
+            future, function, args, kwargs = self.calls.popleft()
+            if future.done():
+                continue  # Cancelled while queued
+            started = self.clock.now
+            value, error = None, None
+            try:
+                value = function(*args, **kwargs)
+            except Exception as e:
+                error = e
+            duration, self.clock.now = self.clock.now - started, started
+            self.busy = True
+            self.scheduler.schedule(duration, self._finish, future, value, error)
+            return
+
+    def _finish(self, future, value, error):
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_error(error)
+        self._next()
+
+
+def simulate_trip(position_manager, start_room, end_room, profile, follower, period=0.1, eps=0.2,
+                  time_limit=600, linear_noise=0.0, angular_noise=0.0, seed=None, quiet=True):
+    """
+    Walk the simulated base from start_room to end_room with the given path follower: the
+    MovingState of an automaton runs its control loop on fake NAOqi services and a virtual
+    clock, with the head touched all along. Returns the trip statistics:
+    reached, trip time, planned time, distance walked, rooms reached and the tracking error
+    (distance of the true pose from the route, max and RMS).
+    """
+    position_manager.reset()
+    path = position_manager.compute_path(start_room, end_room, profile)
+    if not path:
+        return None
+    trajectory = position_manager.trajectory
+
+    clock = VirtualClock()
+    base = SimulatedBase(clock=clock.time, sleep=clock.sleep,
+                         linear_noise=linear_noise, angular_noise=angular_noise, seed=seed)
+    session = FakeSession(clock.time, clock.sleep, motion=base)
+    action_manager = ActionManager(session, os.path.join(tempfile.gettempdir(), 'outcome.txt'))
+    modim_web_server = FakeModimWSClient(FakeInteractionManager(None, clock), clock, action_manager.results)
+
+    stats = {'reached': False, 'rooms_reached': 0, 'distance': 0.0, 'max_error': 0.0}
+    trip = {'squared_errors': 0.0, 'samples': 0, 'last': (0.0, 0.0)}
+
+    def sample():
+        # Tracking error of the true pose (map and true frames coincide at the start)
+        true_x, true_y, _ = base.true_pose()
+        stats['distance'] += math.hypot(true_x - trip['last'][0], true_y - trip['last'][1])
+        trip['last'] = (true_x, true_y)
+        if position_manager.odometry_origin is None or not len(trajectory):
+            return
+        segment = min(position_manager.progress.segment, len(trajectory) - 1)
+        error = abs(trajectory.cross_track_error(segment, *position_manager.to_map(true_x, true_y)))
+        stats['max_error'] = max(stats['max_error'], error)
+        trip['squared_errors'] += error ** 2
+        trip['samples'] += 1
+
+    stdout = sys.stdout
+    if quiet:
+        sys.stdout = open(os.devnull, 'w')  # Silence the [INFO] logs
+    try:
+        scheduler = Scheduler(clock.time, tick=0.01)
+        automaton = RobotAutomaton(modim_web_server, action_manager, position_manager, disability=profile,
+                                   clock=clock.time, sleep=clock.sleep, follower=follower, scheduler=scheduler,
+                                   threaded=False, dialogs=VirtualExecutor(clock, scheduler))
+        moving_state = MovingState(automaton, eps=eps, period=period)
+        automaton.add_state(moving_state)
+        for name in ('steady_state', 'ask_state', 'hold_hand_state', 'goal_state', 'quit_state'):
+            automaton.add_state(State(name, automaton))  # The walk is over once one of them is entered
+
+        automaton.start('moving_state')
+        session.touch_head(True)
+        while automaton.current_state is moving_state:
+            if automaton.dispatch_pending():
+                continue
+            due = [when for when in (scheduler.next_deadline(), automaton.events.next_due()) if when is not None]
+            if not due or min(due) > time_limit:
+                automaton.on_event('time_elapsed', moving_state)
+                automaton.dispatch_pending()
+                break
+            clock.now = max(clock.now, min(due) + scheduler.tick * 1e-3)
+            scheduler.advance()
+            sample()
+
+        stats['reached'] = automaton.current_state.name == 'goal_state'
+        stats['rooms_reached'] = position_manager.progress.segment + (1 if stats['reached'] else 0)
+    finally:
+        action_manager.close()
+        if quiet:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    stats['time'] = clock.time()
+    stats['planned_time'] = trajectory.duration()
+    stats['rms_error'] = math.sqrt(trip['squared_errors'] / trip['samples']) if trip['samples'] else 0.0
+    return stats
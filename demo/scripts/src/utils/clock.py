@@ -0,0 +1,37 @@
+import ctypes
+import ctypes.util
+import os
+import time
+
+
+# ------------------------------ Monotonic clock ------------------------------ #
+
+def _clock_gettime():
+    """
+    time.monotonic is Python 3 only: on Python 2 read CLOCK_MONOTONIC through libc.
+    Returns None where it is not available.
+    """
+    class timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    CLOCK_MONOTONIC = 1  # Linux
+    try:
+        library = ctypes.CDLL(ctypes.util.find_library('rt') or ctypes.util.find_library('c'), use_errno=True)
+        clock_gettime = library.clock_gettime
+    except (OSError, AttributeError):
+        return None
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+
+    def monotonic():
+        now = timespec()
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(now)) != 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        return now.tv_sec + now.tv_nsec * 1e-9
+
+    return monotonic
+
+
+try:
+    monotonic = time.monotonic
+except AttributeError:
+    monotonic = _clock_gettime() or time.time
@@ -1,3 +1,6 @@
+from limits import joint_limits
+
+
 # ------------------------- Joint values for postures ------------------------ #
 
 left_arm_raised = {
@@ -27,4 +30,49 @@ default_posture = {
     'RElbowYaw': 1.22,
     'RElbowRoll': 0.52,
     'RWristYaw': -0.01
-}
\ No newline at end of file
+}
+
+# ----------------------------- Compiled postures ---------------------------- #
+
+class Posture(object):
+    """
+    Joint values validated against joint_limits once and stored as parallel name / angle
+    lists, ready to be sent in a single ALMotion call. Out of range joints are dropped.
+    """
+
+    __slots__ = ('names', 'angles')
+
+    def __init__(self, joint_values):
+        self.names = []
+        self.angles = []
+        for joint_name, joint_value in sorted(joint_values.items()):
+            low, high = joint_limits.get(joint_name, (None, None))
+            if low is None or not low <= joint_value <= high:
+                print("[WARN] Discarding " + joint_name + " = " + str(joint_value) + " (out of range)")
+                continue
+            self.names.append(joint_name)
+            self.angles.append(joint_value)
+
+    def __len__(self):
+        return len(self.names)
+
+    def to_dict(self):
+        return dict(zip(self.names, self.angles))
+
+    def interpolate(self, other, fraction):
+        """
+        Posture a fraction (0 to 1) of the way from this posture to other. Joints only set in
+        one of them keep their value.
+        """
+        joint_values = self.to_dict()
+        for joint_name, angle in zip(other.names, other.angles):
+            start = joint_values.get(joint_name, angle)
+            joint_values[joint_name] = start + (angle - start) * fraction
+        return Posture(joint_values)
+
+
+compiled_postures = {
+    'left_arm_raised': Posture(left_arm_raised),
+    'right_arm_raised': Posture(right_arm_raised),
+    'default': Posture(default_posture)
+}
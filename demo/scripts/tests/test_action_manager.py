@@ -0,0 +1,153 @@
+import inspect
+import os
+import shutil
+import tempfile
+import textwrap
+import unittest
+
+from src.actions.action_manager import ActionManager, head_middle_touch_key
+from src.actions.action_registry import ActionRegistry
+from src.simulation.fake_modim import FakeInteractionManager
+from src.simulation.fake_session import FakeSession
+from src.simulation.trip import VirtualClock
+
+
+def run_shipped(interaction, answers=None):
+    """
+    Run the code of an interaction on its own with a scripted im, as the MODIM server does.
+    Returns the im.
+    """
+    clock = VirtualClock()
+    namespace = {'im': FakeInteractionManager(answers, clock), 'time': clock}
+    exec(textwrap.dedent(inspect.getsource(interaction)), namespace)
+    namespace[interaction.__name__](None)
+    return namespace['im']
+
+
+class PostResultTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+
+    def action_manager(self, name, **kwargs):
+        action_manager = ActionManager(FakeSession(), os.path.join(self.folder, name), **kwargs)
+        self.addCleanup(action_manager.close)
+        return action_manager
+
+    def test_sessions_get_their_own_results(self):
+        first, second = self.action_manager('first'), self.action_manager('second')
+        self.assertNotEqual(first.results.address, second.results.address)
+
+        second.results.expect()
+        run_shipped(second.blind_agree, {'blind_agree': ['Library']})
+        self.assertEqual(second.check_status(), 'Library')
+        self.assertIsNone(first.results.take(0))
+        self.assertFalse(os.path.exists(second.outcome_path))
+
+    def test_interactions_are_written_with_literals(self):
+        action_manager = self.action_manager('outcome')
+        source = inspect.getsource(action_manager.deaf_agree)
+        self.assertIn(repr(action_manager.results.address), source)
+        self.assertIn(repr(action_manager.outcome_path), source)
+
+        # Removed with the session
+        path = inspect.getsourcefile(action_manager.deaf_agree)
+        action_manager.close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_outcome_file_without_listening(self):
+        action_manager = self.action_manager('outcome', result_address=None)
+        run_shipped(action_manager.interaction_deaf_assist, {'deaf_ask_help': ['no']})
+        self.assertEqual(action_manager.check_status(), 'failure')
+
+
+class MemoryTest(unittest.TestCase):
+
+    def test_batched_reads(self):
+        session = FakeSession()
+        action_manager = ActionManager(session, result_address=None)
+        self.addCleanup(action_manager.close)
+        session.touch_head(True)
+        session.memory.insertData('Device/Battery', 0.8)
+
+        values = action_manager.read_memory([head_middle_touch_key, 'Device/Battery', 'Missing'])
+        self.assertEqual(values, {head_middle_touch_key: 1.0, 'Device/Battery': 0.8, 'Missing': None})
+        self.assertEqual(action_manager.is_head_touched(), [True])
+        self.assertEqual(action_manager.rpc_stats.total(), 2)
+
+
+class GreetingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.actions_path = os.path.join(self.folder, 'actions')
+        os.mkdir(self.actions_path)
+
+    def action_manager(self, **kwargs):
+        action_manager = ActionManager(FakeSession(), os.path.join(self.folder, 'outcome'), **kwargs)
+        self.addCleanup(action_manager.close)
+        action_manager.actions.actions_path = self.actions_path
+        return action_manager
+
+    def test_served_from_memory(self):
+        action_manager = self.action_manager()
+        im = run_shipped(action_manager.create_custom_greeting('Ada', 'deaf', 'it'))
+        self.assertEqual(im.log, [('modality', 'IMAGE', 'img/hello.png'), ('modality', 'TEXT', 'Benvenuto Ada'),
+                                  ('modality', 'GESTURE', 'animations/Stand/Gestures/Hey_1')])
+
+        im = run_shipped(action_manager.create_custom_greeting('Ada', 'deaf', 'en'))
+        self.assertIn(('modality', 'TEXT', 'Welcome Ada'), im.log)
+
+        im = run_shipped(action_manager.create_custom_greeting('Bob', 'blind', 'en'))
+        self.assertIn(('modality', 'TTS', 'Hello! Welcome Bob'), im.log)
+
+        # Rendered once per user whatever the language, and never written
+        self.assertEqual(action_manager.actions.renders, 2)
+        self.assertEqual(os.listdir(self.actions_path), [])
+        self.assertNotIn('modalities', inspect.getsource(action_manager.create_custom_greeting('Bob', 'blind')))
+
+    def test_action_files(self):
+        action_manager = self.action_manager(action_files=True)
+        ada = run_shipped(action_manager.create_custom_greeting('Ada', 'deaf'))
+        bob = run_shipped(action_manager.create_custom_greeting('Bob', 'blind'))
+        run_shipped(action_manager.create_custom_greeting('Ada', 'deaf'))
+
+        # One file per user, only written when created
+        self.assertEqual(action_manager.actions.writes, 2)
+        self.assertNotEqual(ada.log, bob.log)
+        with open(os.path.join(self.actions_path, ada.log[0][1])) as f:
+            self.assertIn('Welcome Ada', f.read())
+
+        # Staged outside the actions folder, and nothing left behind
+        self.assertEqual(sorted(os.listdir(self.actions_path)), sorted([ada.log[0][1], bob.log[0][1]]))
+        self.assertEqual(os.listdir(self.folder), ['actions'])
+        action_manager.close()
+        self.assertEqual(os.listdir(self.actions_path), [])
+
+
+class ActionRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+
+    def test_evicted_users_lose_their_file(self):
+        registry = ActionRegistry(self.folder, capacity=2)
+        ada = registry.materialize('custom_greeting', 'Ada', 'deaf')
+        bob = registry.materialize('custom_greeting', 'Bob', 'blind')
+        registry.render('custom_greeting', 'Ada', 'deaf')
+
+        # Bob is the least recently used
+        registry.render('custom_greeting', 'Cid', 'deaf')
+        self.assertTrue(os.path.exists(ada))
+        self.assertFalse(os.path.exists(bob))
+
+        registry.render('custom_greeting', 'Dan', 'deaf')
+        self.assertEqual(os.listdir(self.folder), [])
+        self.assertEqual(registry.files, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from src.map.building import BuildingMap
+
+
+INF = float('inf')
+
+# Two floors joined by stairs (accessibility 2) and an elevator, a third floor on its own
+FLOORS = {
+    'a.txt': """A1 0 0
+A2 5 0
+Astairs 10 0
+Aelevator 0 10
+
+A1 A2 5 0
+A2 Astairs 5 0
+A1 Aelevator 10 0
+""",
+    'b.txt': """Bstairs 10 0
+B1 5 0
+Belevator 0 10
+
+Bstairs B1 5 0
+Belevator B1 7 0
+""",
+    'c.txt': """C1 0 0
+C2 1 0
+
+C1 C2 1 0
+""",
+}
+
+MANIFEST = """# Floors and the portals between them
+floor A a.txt
+floor B b.txt
+floor C c.txt
+portal A Astairs B Bstairs 3 2
+portal A Aelevator B Belevator 8 0
+"""
+
+
+def names(path):
+    return [(floor, room.name) for floor, room in path]
+
+
+class BuildingMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        for name, content in FLOORS.items():
+            self.write(name, content)
+        self.manifest = self.write('building.txt', MANIFEST)
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    def write(self, name, content):
+        path = os.path.join(self.folder, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_cross_floor_route(self):
+        building = BuildingMap(self.manifest)
+        distance, path = building.find_path(('A', 'A1'), ('B', 'B1'))
+        self.assertEqual(distance, 18)
+        self.assertEqual(names(path), [('A', 'A1'), ('A', 'A2'), ('A', 'Astairs'), ('B', 'Bstairs'), ('B', 'B1')])
+
+        # Without the stairs
+        distance, path = building.find_path(('A', 'A2'), ('B', 'B1'), 0)
+        self.assertEqual(distance, 30)
+        self.assertEqual(names(path), [('A', 'A2'), ('A', 'A1'), ('A', 'Aelevator'), ('B', 'Belevator'), ('B', 'B1')])
+
+        self.assertEqual(building.find_path(('A', 'A1'), ('C', 'C1')), (INF, []))
+        self.assertEqual(building.find_path(('A', 'A1'), ('A', 'A2'))[0], 5)
+        self.assertEqual(sorted(building.floors), ['A', 'B', 'C'])
+
+    def test_floors_loaded_lazily(self):
+        BuildingMap(self.manifest).precompute([0, INF])
+
+        # With the cached summaries, crossing a floor does not load it
+        building = BuildingMap(self.manifest)
+        self.assertEqual(building.find_path(('A', 'A1'), ('B', 'B1'))[0], 18)
+        self.assertFalse(building.is_loaded('C'))
+
+    def test_cache_invalidation(self):
+        self.assertEqual(BuildingMap(self.manifest).summary('A', INF), {'Astairs': {'Aelevator': 20},
+                                                                       'Aelevator': {'Astairs': 20}})
+
+        # The floor changed
+        self.write('a.txt', FLOORS['a.txt'].replace('A2 Astairs 5 0', 'A2 Astairs 6 0'))
+        self.assertEqual(BuildingMap(self.manifest).summary('A', INF)['Astairs'], {'Aelevator': 21})
+
+        # A portal was added to the manifest
+        self.write('building.txt', MANIFEST + "portal A A2 C C1 4 0\n")
+        building = BuildingMap(self.manifest)
+        self.assertEqual(building.summary('A', INF)['A2'], {'Astairs': 6, 'Aelevator': 15})
+        self.assertEqual(building.find_path(('A', 'A1'), ('C', 'C2'))[0], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
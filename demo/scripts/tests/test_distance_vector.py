@@ -0,0 +1,83 @@
+import unittest
+
+from src.map.distance_vector import DistanceVector
+from src.map.room_mapper import RoomMapper
+from tests.test_routing import INF, LEVELS, floyd_warshall, random_graph
+
+
+class DistanceVectorTest(unittest.TestCase):
+    """
+    One-to-many and many-to-one distances agree with Floyd-Warshall on random maps.
+    """
+
+    def test_single_source_distances(self):
+        for seed in range(4):
+            compact, edges = random_graph(seed, directed=seed % 2 == 1)
+            for level in LEVELS:
+                expected = floyd_warshall(len(compact), edges, level)
+                for u in range(len(compact)):
+                    forward = DistanceVector(compact, compact.single_source_distances(u, level))
+                    backward = DistanceVector(compact, compact.single_source_distances(u, level, reverse=True))
+                    for v, room in enumerate(compact.nodes):
+                        self.assertAlmostEqual(forward[room], expected[u][v], places=9)
+                        self.assertAlmostEqual(backward[room.name], expected[v][u], places=9)
+
+    def test_lookups(self):
+        compact, edges = random_graph(1, directed=True)
+        distances = compact.single_source_distances(0, 0)
+        vector = DistanceVector(compact, distances)
+
+        self.assertEqual(len(vector), len(compact))
+        self.assertIn('R0', vector)
+        self.assertNotIn('Nowhere', vector)
+        self.assertEqual(vector.get('Nowhere'), INF)
+        self.assertEqual(vector.get('Nowhere', None), None)
+
+        reachable = [(room.name, d) for room, d in vector.items()]
+        self.assertEqual(reachable, [(compact.nodes[i].name, d) for i, d in enumerate(distances) if d != INF])
+        self.assertIn(('R0', 0), reachable)
+
+    def test_nearest(self):
+        compact, edges = random_graph(2)
+        vector = DistanceVector(compact, compact.single_source_distances(0, 2))
+        candidates = ['R3', 'R5', 'R8', 'Nowhere']
+
+        room, distance = vector.nearest(candidates)
+        self.assertEqual(distance, min(vector.get(name) for name in candidates))
+        self.assertEqual(vector[room], distance)
+        self.assertEqual(vector.nearest(['R0', 'R3']), (compact.nodes[0], 0))
+        self.assertEqual(vector.nearest(['Nowhere']), (None, INF))
+        self.assertEqual(vector.nearest([]), (None, INF))
+
+
+class RoomMapperDistancesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mapper = RoomMapper()
+        for i, name in enumerate(('Lobby', 'Cafe', 'Library', 'Office')):
+            self.mapper.add_room(name, i, 0)
+        self.mapper.add_connection('Lobby', 'Cafe', 1, 0)
+        self.mapper.add_connection('Cafe', 'Library', 1, 0)
+        self.mapper.add_connection('Library', 'Office', 1, 0)
+        self.mapper.add_connection('Lobby', 'Office', 2, 1)
+
+    def test_distances(self):
+        self.assertEqual(self.mapper.distances_from('Lobby')['Office'], 2)
+        self.assertEqual(self.mapper.distances_from('Lobby', 0)['Office'], 3)
+        self.assertEqual(self.mapper.distances_to('Library', 0)['Lobby'], 2)
+        self.assertEqual(self.mapper.nearest('Office', ['Lobby', 'Cafe'], 0)[0].name, 'Cafe')
+        self.assertRaises(KeyError, self.mapper.distances_from, 'Nowhere')
+
+    def test_cached_until_the_map_changes(self):
+        vector = self.mapper.distances_from('Lobby', 0)
+        self.assertIs(self.mapper.distances_from('Lobby', 0), vector)
+        self.assertIsNot(self.mapper.distances_from('Lobby', 1), vector)
+        self.assertIsNot(self.mapper.distances_to('Lobby', 0), vector)
+
+        self.mapper.compile()
+        self.assertIsNot(self.mapper.distances_from('Lobby', 0), vector)
+        self.assertEqual(self.mapper.distances_from('Lobby', 0)['Office'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
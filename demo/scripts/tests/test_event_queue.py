@@ -0,0 +1,126 @@
+import os
+import sys
+import threading
+import unittest
+
+from src.automaton.event_queue import EventQueue
+from src.simulation.trip import VirtualClock
+
+
+class EventQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        self.clock = VirtualClock()
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    def queue(self, **kwargs):
+        return EventQueue(clock=self.clock.time, **kwargs)
+
+    def drain(self, queue):
+        names = []
+        event = queue.get(timeout=0)
+        while event is not None:
+            names.append(event.name)
+            event = queue.get(timeout=0)
+        return names
+
+    def test_priorities(self):
+        queue = self.queue(priorities={'head_released': 2, 'goal_reached': 1})
+        for name in ('room_reached', 'time_elapsed', 'goal_reached', 'head_released', 'route_blocked'):
+            queue.put(name)
+        self.assertEqual(len(queue), 5)
+        self.assertEqual(self.drain(queue),
+                         ['head_released', 'goal_reached', 'room_reached', 'time_elapsed', 'route_blocked'])
+        self.assertEqual(len(queue), 0)
+
+    def test_coalescing(self):
+        queue = self.queue(groups={'head_touched': 'touch', 'head_released': 'touch'})
+        state = object()
+        queue.put('head_touched')
+        queue.put('room_reached')
+        queue.put('head_released', state)
+        queue.put('head_touched')
+        queue.put('head_released', state)
+
+        self.assertEqual(queue.coalesced, 3)
+        self.assertEqual(len(queue), 2)
+        event = queue.get(timeout=0)
+        self.assertEqual(event.name, 'room_reached')
+        event = queue.get(timeout=0)
+        self.assertEqual((event.name, event.state), ('head_released', state))
+        self.assertFalse(event.dropped)
+        self.assertIsNone(queue.get(timeout=0))
+
+        # Events of other groups, or delivered already, are not replaced
+        queue.put('room_reached')
+        queue.put('room_reached')
+        self.assertEqual(self.drain(queue), ['room_reached'])
+        queue.put('head_touched')
+        self.assertEqual(self.drain(queue), ['head_touched'])
+        queue.put('head_touched')
+        self.assertEqual(self.drain(queue), ['head_touched'])
+
+    def test_debounce(self):
+        queue = self.queue(groups={'head_touched': 'touch', 'head_released': 'touch'},
+                           debounce={'head_touched': 0.15})
+        queue.put('head_touched')
+        queue.put('room_reached')
+        self.assertEqual(queue.next_due(), 0.15)
+        self.assertEqual(self.drain(queue), ['room_reached'])
+
+        self.clock.sleep(0.2)
+        self.assertEqual(self.drain(queue), ['head_touched'])
+        self.assertIsNone(queue.next_due())
+
+        # A touch released before its debounce time is never delivered
+        queue.put('head_touched')
+        self.clock.sleep(0.05)
+        queue.put('head_released')
+        self.assertIsNone(queue.next_due())
+        self.clock.sleep(0.2)
+        self.assertEqual(self.drain(queue), ['head_released'])
+
+    def test_waits_on_the_queue_clock(self):
+        # Held events come out once the queue clock reaches their due time, not the wall clock
+        queue = self.queue(debounce={'head_touched': 30})
+        queue.put('head_touched')
+        self.assertIsNone(queue.get(timeout=0))
+        self.clock.sleep(30)
+        self.assertEqual(queue.get(timeout=0).name, 'head_touched')
+
+    def test_capacity(self):
+        queue = self.queue(capacity=2, priorities={'head_released': 2})
+        self.assertTrue(queue.put('room_reached'))
+        self.assertTrue(queue.put('time_elapsed'))
+        self.assertFalse(queue.put('goal_reached'))
+        self.assertEqual(queue.rejected, 1)
+
+        # A more urgent event evicts the oldest of the lowest priority
+        self.assertTrue(queue.put('head_released'))
+        self.assertEqual(self.drain(queue), ['head_released', 'time_elapsed'])
+
+    def test_get_wakes_up_on_put(self):
+        queue = EventQueue()
+        timer = threading.Timer(0.05, queue.put, ['head_released'])
+        timer.start()
+        self.addCleanup(timer.cancel)
+        self.assertEqual(queue.get(timeout=5).name, 'head_released')
+        self.assertIsNone(queue.get(timeout=0.01))
+
+    def test_clear(self):
+        queue = self.queue(debounce={'head_touched': 1})
+        queue.put('head_touched')
+        queue.put('room_reached')
+        queue.clear()
+        self.assertEqual(len(queue), 0)
+        self.assertIsNone(queue.next_due())
+        self.clock.sleep(2)
+        self.assertIsNone(queue.get(timeout=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
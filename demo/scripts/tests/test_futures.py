@@ -0,0 +1,159 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from src.actions.action_manager import ActionManager
+from src.actions.futures import CallCancelled, CallTimeout, Executor, Future
+from src.actions.service_proxy import ServiceProxy
+from src.simulation.fake_motion import FakeFuture
+from src.simulation.fake_session import FakeSession
+from src.simulation.trip import VirtualClock
+
+
+class PlainMotion(object):
+    """
+    ALMotion whose methods do not take _async, like a service that is not a qi object.
+    """
+
+    def __init__(self):
+        self.moves = []
+
+    def moveToward(self, x, y, theta):
+        self.moves.append((x, y, theta))
+        return len(self.moves)
+
+    def stopMove(self, **options):
+        # Takes any option, fails once it has run
+        self.moves.append(None)
+        raise TypeError("stopMove() failed after moving")
+
+
+class PlainSession(object):
+
+    def __init__(self, motion):
+        self.motion = motion
+
+    def service(self, name):
+        return self.motion
+
+
+class FutureTest(unittest.TestCase):
+
+    def test_result(self):
+        future = Future('call')
+        done = []
+        future.add_done_callback(done.append)
+        self.assertFalse(future.done())
+        self.assertRaises(CallTimeout, future.result, 0.01)
+
+        self.assertTrue(future.set_result(3))
+        self.assertFalse(future.set_error(RuntimeError()))
+        self.assertEqual(future.result(), 3)
+        self.assertEqual(done, [future])
+
+        # Callbacks added later run right away
+        future.add_done_callback(done.append)
+        self.assertEqual(done, [future, future])
+
+    def test_cancel(self):
+        future = Future('call')
+        self.assertTrue(future.cancel())
+        self.assertTrue(future.cancelled())
+        self.assertRaises(CallCancelled, future.result)
+        self.assertFalse(future.cancel())
+
+        future = Future('call')
+        future.set_error(ValueError())
+        self.assertFalse(future.cancel())
+        self.assertRaises(ValueError, future.result)
+
+    def test_from_qi(self):
+        clock = VirtualClock()
+        future = Future.from_qi(FakeFuture(5, 2.0, clock.time, clock.sleep), 'call')
+        self.assertFalse(future.done())
+        self.assertEqual(future.result(), 5)
+        self.assertEqual(clock.time(), 2.0)
+
+        qi_future = FakeFuture(5, 4.0, clock.time, clock.sleep)
+        future = Future.from_qi(qi_future, 'call')
+        clock.sleep(1.0)
+        future.cancel()
+        self.assertTrue(qi_future.isCanceled())
+        self.assertRaises(CallCancelled, future.result)
+
+
+class ExecutorTest(unittest.TestCase):
+
+    def test_runs_in_order(self):
+        executor = Executor()
+        calls = []
+        futures = [executor.submit(calls.append, i) for i in range(5)]
+        failed = executor.submit(int, 'five')
+        for future in futures:
+            future.result(1.0)
+        self.assertEqual(calls, range(5))
+        self.assertRaises(ValueError, failed.result, 1.0)
+
+    def test_cancelled_calls_are_skipped(self):
+        executor = Executor()
+        calls = []
+        blocker = Future('blocker')
+        executor.submit(blocker.wait)
+        cancelled = executor.submit(calls.append, 'cancelled')
+        cancelled.cancel()
+        kept = executor.submit(calls.append, 'kept')
+        blocker.set_result(None)
+        kept.result(1.0)
+        self.assertEqual(calls, ['kept'])
+
+
+class CallAsyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        self.clock = VirtualClock()
+        self.action_manager = ActionManager(FakeSession(self.clock.time, self.clock.sleep),
+                                            os.path.join(tempfile.gettempdir(), 'outcome.txt'))
+        self.addCleanup(self.action_manager.close)
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    def test_qi_call(self):
+        future = self.action_manager.call_async('mo_service', 'angleInterpolation', ['HeadYaw'], [1.0], [2.0], True)
+        self.assertEqual(future.name, 'mo_service.angleInterpolation')
+        self.assertIsNotNone(future.source)
+        self.assertFalse(future.done())
+        future.wait()
+        self.assertEqual(self.clock.time(), 2.0)
+        self.assertEqual(self.action_manager.rpc_stats.total(), 1)
+
+    def test_plain_call(self):
+        # The method rejects _async without running, it runs once on the executor
+        motion = PlainMotion()
+        self.action_manager.mo_service = ServiceProxy(PlainSession(motion), "ALMotion",
+                                                      stats=self.action_manager.rpc_stats)
+        future = self.action_manager.call_async('mo_service', 'moveToward', 0.5, 0, 0)
+        self.assertEqual(future.result(1.0), 1)
+        self.assertEqual(future.name, 'mo_service.moveToward')
+        self.assertEqual(motion.moves, [(0.5, 0, 0)])
+        self.assertEqual(self.action_manager.rpc_stats.total(), 1)
+
+    def test_type_errors_are_not_rerun(self):
+        motion = PlainMotion()
+        self.action_manager.mo_service = ServiceProxy(PlainSession(motion), "ALMotion",
+                                                      stats=self.action_manager.rpc_stats)
+        # Failed after running: raised, not run again on the executor
+        self.assertRaises(TypeError, self.action_manager.call_async, 'mo_service', 'stopMove')
+        self.assertEqual(motion.moves, [None])
+
+        # Rejected _async before checking the arguments: the executor call reports the error
+        future = self.action_manager.call_async('mo_service', 'moveToward', 0.5)
+        self.assertRaises(TypeError, future.result, 1.0)
+        self.assertEqual(motion.moves, [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
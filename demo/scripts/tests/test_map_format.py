@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from src.map.compact_graph import CompactGraph
+from src.map.map_format import CompiledMap
+from src.map.room import Room
+
+
+class LoadedMap(object):
+    """
+    Stand-in for the RoomMapper a compiled map is loaded into.
+    """
+
+    def __init__(self, compact=None):
+        self.compact = compact
+        self.directed = False
+
+    def set_compiled(self, compact):
+        self.compact = compact
+
+
+class CompiledMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        rooms = [Room('Lobby', 0, 0), Room('Cafe', 1, 0), Room('Office', 3, 0)]
+        compact = CompactGraph.from_edges(rooms, array('l', [0, 1, 1, 2]), array('l', [1, 0, 2, 1]),
+                                          array('d', [1, 1, 2, 2]), array('l', [0, 0, 1, 1]))
+        self.image = CompiledMap.serialize(LoadedMap(compact))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data):
+        path = os.path.join(self.directory, 'map.bin')
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_round_trip(self):
+        loaded = LoadedMap()
+        buffer = CompiledMap.load(loaded, self.write(self.image))
+        self.assertEqual([room.name for room in loaded.compact.nodes], ['Lobby', 'Cafe', 'Office'])
+        self.assertEqual(list(loaded.compact.edges(1)), [(0, 1.0, 0), (2, 2.0, 1)])
+        buffer.close()
+
+    def test_truncated_file(self):
+        for size in (0, 6, CompiledMap.HEADER.size, len(self.image) // 2, len(self.image) - 8):
+            path = self.write(self.image[:size])
+            self.assertRaises(ValueError, CompiledMap.load, LoadedMap(), path)
+
+    def test_not_a_map(self):
+        self.assertRaises(ValueError, CompiledMap.load, LoadedMap(), self.write(b'Lobby 0 0\n' * 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
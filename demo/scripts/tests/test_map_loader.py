@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.map.map_loader import MapFormatError, MapLoader
+
+
+class MapLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+
+    def load(self, connections):
+        path = os.path.join(self.folder, 'map.txt')
+        with open(path, 'w') as f:
+            f.write("Lobby 0 0\nCafe 3 4\n\n" + connections)
+        return MapLoader().load(path)
+
+    def test_load(self):
+        rooms, compact = self.load("Lobby Cafe 5 0\n")
+        self.assertEqual([room.name for room in rooms], ['Lobby', 'Cafe'])
+        self.assertEqual(len(compact), 2)
+
+    def test_invalid_distances(self):
+        for distance in ('0', '-1', 'nan', 'inf', 'five'):
+            try:
+                self.load("Lobby Cafe " + distance + " 0\n")
+            except MapFormatError as e:
+                self.assertEqual(e.line_number, 4)
+            else:
+                self.fail("Distance " + distance + " accepted")
+
+
+if __name__ == '__main__':
+    unittest.main()
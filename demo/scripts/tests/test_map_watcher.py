@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.actions.map_watcher import MapWatcher
+
+
+class FakePositionManager(object):
+    """
+    Reloads fail while the map file holds a half written line.
+    """
+
+    def __init__(self, map_path):
+        self.map_path = map_path
+        self.reloads = 0
+
+    def reload_map(self):
+        with open(self.map_path) as f:
+            if 'Lobby Cafe\n' in f.read():
+                raise ValueError("Missing edge weight")
+        self.reloads += 1
+
+
+class MapWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'map.txt')
+        self.write('Lobby 0 0\nCafe 1 0\n\nLobby Cafe 1 0\n')
+        self.position_manager = FakePositionManager(self.path)
+        self.watcher = MapWatcher(self.position_manager)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, content, mtime=1000):
+        with open(self.path, 'w') as f:
+            f.write(content)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_unchanged(self):
+        self.assertFalse(self.watcher.check())
+        self.write('Lobby 0 0\nCafe 1 0\n\nLobby Cafe 1 0\n', mtime=2000)  # Touched only
+        self.assertFalse(self.watcher.check())
+        self.assertEqual(self.position_manager.reloads, 0)
+
+    def test_fixed_after_failed_reload(self):
+        self.write('Lobby 0 0\nCafe 1 0\n\nLobby Cafe\n', mtime=2000)
+        self.assertFalse(self.watcher.check())
+        self.assertFalse(self.watcher.check())  # Same broken content, not retried
+
+        self.write('Lobby 0 0\nCafe 1 0\n\nLobby Cafe 2 0\n', mtime=2000)  # Fixed within the same second
+        self.assertTrue(self.watcher.check())
+        self.assertEqual(self.position_manager.reloads, 1)
+        self.assertFalse(self.watcher.check())
+
+
+if __name__ == '__main__':
+    unittest.main()
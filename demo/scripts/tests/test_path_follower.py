@@ -0,0 +1,119 @@
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.actions.path_follower import HeadingFollower, PurePursuitFollower, path_followers
+from src.actions.position_manager import PositionManager
+from src.map.room import Room
+from src.map.trajectory import Trajectory
+from src.simulation.trip import simulate_trip
+
+
+# A to E with a right turn, then left turns
+CORNER_MAP = """A 0 0
+B 4 0
+C 4 3
+D 1 5
+E 1 8
+
+A B 4 0
+B C 3 0
+C D 4 0
+D E 3 0
+"""
+
+
+def straight_line():
+    # 10 m along the x axis
+    return Trajectory([Room('A', 0, 0), Room('B', 10, 0)], max_speed=0.35, acceleration=0.3)
+
+
+class HeadingFollowerTest(unittest.TestCase):
+
+    def test_command(self):
+        follower = HeadingFollower(gain=1.5, max_turn_rate=1.0)
+        trajectory = straight_line()
+
+        # Facing the next room: full planned speed, no turn
+        speed, turn_rate = follower.command(trajectory, 0, 5, 0, 0)
+        self.assertEqual(speed, trajectory.speed(0, 5))
+        self.assertAlmostEqual(turn_rate, 0)
+
+        # Next room slightly on the left, then on the right
+        speed, turn_rate = follower.command(trajectory, 0, 5, 0, -0.1)
+        self.assertAlmostEqual(turn_rate, 0.15)
+        speed, turn_rate = follower.command(trajectory, 0, 5, 1, 0)
+        self.assertAlmostEqual(turn_rate, 1.5 * math.atan2(-1, 5))
+
+        # Facing away: turn in place as fast as allowed
+        self.assertEqual(follower.command(trajectory, 0, 5, 0, 3), (0.0, -1.0))
+
+
+class PurePursuitFollowerTest(unittest.TestCase):
+
+    def test_command(self):
+        follower = PurePursuitFollower(lookahead=0.5, max_turn_rate=1.0)
+        trajectory = straight_line()
+
+        speed, turn_rate = follower.command(trajectory, 0, 5, 0, 0)
+        self.assertEqual(speed, trajectory.speed(0, 5))
+        self.assertAlmostEqual(turn_rate, 0)
+
+        # Left of the route: steer back right along the arc through the lookahead point
+        speed, turn_rate = follower.command(trajectory, 0, 5, 0.1, 0)
+        alpha = math.atan2(-0.1, 0.5)
+        self.assertAlmostEqual(turn_rate, speed * 2 * math.sin(alpha) / math.hypot(0.5, 0.1))
+        self.assertLess(turn_rate, 0)
+
+        # Lookahead point behind: turn in place
+        self.assertEqual(follower.command(trajectory, 0, 5, 0, math.pi / 2 + 0.1),
+                         (0.0, -1.0))
+
+        # On the last room, nothing left to pursue
+        self.assertEqual(follower.command(trajectory, 0, 10, 0, 1)[1], 0.0)
+
+    def test_cuts_corners_less(self):
+        # Past a corner the lookahead point is already on the next segment
+        trajectory = Trajectory([Room('A', 0, 0), Room('B', 4, 0), Room('C', 4, 3)], max_speed=0.35, acceleration=0.3)
+        turn_rate = PurePursuitFollower().command(trajectory, 0, 3.8, 0, 0)[1]
+        self.assertGreater(turn_rate, 0)
+        self.assertAlmostEqual(HeadingFollower().command(trajectory, 0, 3.8, 0, 0)[1], 0)
+
+
+class SimulatedTripTest(unittest.TestCase):
+    """
+    Trips walked by the moving state of the automaton on the simulated base.
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        map_path = os.path.join(self.folder, 'map.txt')
+        with open(map_path, 'w') as f:
+            f.write(CORNER_MAP)
+        self.position_manager = PositionManager(map_path, engine='search')
+
+    def test_followers(self):
+        for name, follower in sorted(path_followers.items()):
+            stats = simulate_trip(self.position_manager, 'A', 'E', 'deaf', follower(), linear_noise=0.02,
+                                  angular_noise=0.02, seed=1)
+            self.assertTrue(stats['reached'], name)
+            self.assertEqual(stats['rooms_reached'], 4)
+            self.assertLess(stats['max_error'], 0.3)
+            self.assertLess(stats['time'], stats['planned_time'] * 1.2)
+            self.assertAlmostEqual(stats['distance'], 13.5, delta=0.5)
+
+    def test_time_limit(self):
+        stats = simulate_trip(self.position_manager, 'A', 'E', 'deaf', PurePursuitFollower(), time_limit=10)
+        self.assertFalse(stats['reached'])
+        self.assertLess(stats['rooms_reached'], 4)
+        self.assertLess(stats['time'], 10.5)
+
+    def test_no_route(self):
+        self.assertIsNone(simulate_trip(self.position_manager, 'A', 'Nowhere', 'deaf', PurePursuitFollower()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from src.actions.position_manager import PositionManager
+
+
+# Lobby - Cafe - Library - Office on a line, with stairs (accessibility 1) from the Lobby
+MAP = """Lobby 0 0
+Cafe 1 0
+Library 2 0
+Office 3 0
+
+Lobby Cafe 1 0
+Lobby Library 2 1
+Lobby Office 2 1
+Cafe Library 1 0
+Cafe Office 2 0
+Library Office 1 0
+"""
+
+
+def names(path):
+    return [room.name for room in path]
+
+
+class PositionManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        map_path = os.path.join(self.folder, 'map.txt')
+        with open(map_path, 'w') as f:
+            f.write(MAP)
+        self.position_manager = PositionManager(map_path, engine='search')
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    def test_reopened_route(self):
+        position_manager = self.position_manager
+        self.assertEqual(names(position_manager.compute_path('Lobby', 'Office', 'blind'))[0], 'Lobby')
+
+        position_manager.block_edge('Cafe', 'Office')
+        self.assertEqual(names(position_manager.path), ['Lobby', 'Cafe', 'Library', 'Office'])
+        self.assertEqual(position_manager.block_edge('Lobby', 'Cafe'), [])
+
+        # Replanned from the room the trip stopped in once the corridor reopens
+        self.assertEqual(names(position_manager.set_edge_weight('Lobby', 'Cafe', 1)),
+                         ['Lobby', 'Cafe', 'Library', 'Office'])
+
+    def test_reopened_route_on_the_way(self):
+        position_manager = self.position_manager
+        position_manager.compute_path('Lobby', 'Office', 'blind')
+        position_manager.block_edge('Cafe', 'Office')
+        position_manager.next()
+        self.assertEqual(position_manager.block_edge('Cafe', 'Library'), [])
+        self.assertEqual(names(position_manager.set_edge_weight('Cafe', 'Office', 2)), ['Lobby', 'Cafe', 'Office'])
+        self.assertEqual(position_manager.get_current_room().name, 'Cafe')
+
+    def test_new_trip_after_walking(self):
+        position_manager = self.position_manager
+        position_manager.compute_path('Lobby', 'Office', 'blind')
+        position_manager.next()
+        position_manager.next()
+        self.assertEqual(names(position_manager.compute_path('Cafe', 'Lobby', 'blind')), ['Cafe', 'Lobby'])
+        self.assertEqual(position_manager.get_current_room().name, 'Cafe')
+        self.assertEqual(position_manager.get_next_room().name, 'Lobby')
+
+    def test_path_complete(self):
+        position_manager = self.position_manager
+        self.assertTrue(position_manager.is_path_complete())
+
+        position_manager.compute_path('Lobby', 'Library', 'blind')
+        self.assertEqual(len(position_manager.path), 3)
+        self.assertFalse(position_manager.is_path_complete())
+        position_manager.next()
+        self.assertFalse(position_manager.is_path_complete())
+        position_manager.next()
+        self.assertTrue(position_manager.is_path_complete())
+        self.assertIsNone(position_manager.next())
+
+    def test_route_options_avoid_blocked_connections(self):
+        position_manager = self.position_manager
+        options = position_manager.compute_route_options('Lobby', 'Office')
+        self.assertIn(['Lobby', 'Office'], [names(path) for _, _, path in options])
+
+        position_manager.block_edge('Lobby', 'Office')
+        options = position_manager.compute_route_options('Lobby', 'Office')
+        self.assertNotIn(['Lobby', 'Office'], [names(path) for _, _, path in options])
+        self.assertNotEqual(names(position_manager.compute_preferred_path('Lobby', 'Office', 'deaf'))[:2],
+                            ['Lobby', 'Office'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from src.actions.action_manager import ActionManager
+from src.automaton.robot_automaton import RobotAutomaton
+from src.automaton.scheduler import Scheduler
+from src.simulation.fake_session import FakeSession
+from src.simulation.trip import VirtualClock, VirtualExecutor
+from src.utils.postures import Posture, compiled_postures, default_posture
+
+
+class PostureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    def test_compiled(self):
+        posture = Posture({'RWristYaw': 0.5, 'HeadYaw': 0.1, 'HeadPitch': 2.0, 'Tail': 0.0})
+        self.assertEqual(posture.names, ['HeadYaw', 'RWristYaw'])
+        self.assertEqual(posture.angles, [0.1, 0.5])
+        self.assertEqual(len(posture), 2)
+        self.assertEqual(posture.to_dict(), {'HeadYaw': 0.1, 'RWristYaw': 0.5})
+
+        self.assertEqual(compiled_postures['default'].to_dict(), default_posture)
+        self.assertEqual(len(compiled_postures['left_arm_raised']), 4)
+
+    def test_interpolate(self):
+        start = Posture({'HeadYaw': 0.0, 'HeadPitch': -0.2})
+        end = Posture({'HeadYaw': 1.0, 'LWristYaw': 0.5})
+
+        halfway = start.interpolate(end, 0.5).to_dict()
+        self.assertEqual(halfway, {'HeadYaw': 0.5, 'HeadPitch': -0.2, 'LWristYaw': 0.5})
+        self.assertEqual(start.interpolate(end, 0).to_dict()['HeadYaw'], 0.0)
+        self.assertEqual(start.interpolate(end, 1).to_dict()['HeadYaw'], 1.0)
+
+
+class PerformMovementTest(unittest.TestCase):
+    """
+    Postures are sent in a single angleInterpolation call, timed from the current joint angles.
+    """
+
+    def setUp(self):
+        self.stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        self.clock = VirtualClock()
+        scheduler = Scheduler(self.clock.time, tick=0.01)
+        self.session = FakeSession(self.clock.time, self.clock.sleep)
+        action_manager = ActionManager(self.session, os.path.join(tempfile.gettempdir(), 'outcome.txt'))
+        self.addCleanup(action_manager.close)
+        self.automaton = RobotAutomaton(None, action_manager, None, clock=self.clock.time, sleep=self.clock.sleep,
+                                        scheduler=scheduler, threaded=False,
+                                        dialogs=VirtualExecutor(self.clock, scheduler))
+        self.motion = self.session.motion
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    def test_single_posture(self):
+        # The largest rotation, 1 rad at 2 rad/s, sets the duration
+        self.motion.angles.update({'HeadYaw': 0.0, 'HeadPitch': 0.0})
+        movement = self.automaton.perform_movement({'HeadYaw': 1.0, 'HeadPitch': -0.2})
+
+        self.assertFalse(movement.done())
+        self.assertEqual(self.motion.calls['angleInterpolation'], 1)
+        self.assertEqual(self.motion.calls['getAngles'], 1)
+        self.assertEqual(self.motion.angles['HeadYaw'], 1.0)
+
+        movement.wait()
+        self.assertTrue(movement.done())
+        self.assertAlmostEqual(self.clock.time(), 0.5)
+
+    def test_keyframes(self):
+        self.motion.angles.update(default_posture)
+        keyframes = [compiled_postures['default'], {'HeadYaw': 1.0}, {'HeadYaw': 1.1}]
+        self.automaton.perform_movement(keyframes, speed=0.5, _async=False)
+
+        # 0.5 s minimum to stay in the default posture, then 1 rad at 1 rad/s, then the minimum again
+        self.assertAlmostEqual(self.clock.time(), 2.0)
+        self.assertEqual(self.motion.calls['angleInterpolation'], 1)
+        self.assertAlmostEqual(self.motion.angles['HeadYaw'], 1.1)
+        self.assertEqual(self.motion.angles['RWristYaw'], default_posture['RWristYaw'])
+
+
+if __name__ == '__main__':
+    unittest.main()
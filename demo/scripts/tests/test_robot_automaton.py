@@ -0,0 +1,141 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from src.actions.action_manager import ActionManager
+from src.actions.position_manager import PositionManager
+from src.automaton.automaton import State
+from src.automaton.robot_automaton import AskState, GoalState, MovingState, RobotAutomaton, SteadyState
+from src.automaton.scheduler import Scheduler
+from src.simulation.fake_modim import FakeInteractionManager, FakeModimWSClient
+from src.simulation.fake_session import FakeSession
+from src.simulation.trip import VirtualClock, VirtualExecutor
+
+
+class SimulatedAutomatonTest(unittest.TestCase):
+    """
+    Some of the states of a blind user's automaton on a virtual clock, the others only record
+    they were entered.
+    """
+
+    states = ()
+
+    def setUp(self):
+        self.stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    def start(self, first, answers=None, touches=(), timeout=60, position_manager=None):
+        self.clock = VirtualClock()
+        self.scheduler = Scheduler(self.clock.time, tick=0.01)
+        session = FakeSession(self.clock.time, self.clock.sleep)
+        action_manager = ActionManager(session, os.path.join(tempfile.gettempdir(), 'outcome.txt'))
+        self.addCleanup(action_manager.close)
+        im = FakeInteractionManager(answers, self.clock)
+        modim_web_server = FakeModimWSClient(im, self.clock, action_manager.results)
+        self.automaton = RobotAutomaton(modim_web_server, action_manager, position_manager, disability='blind',
+                                        timeout=timeout, clock=self.clock.time, sleep=self.clock.sleep,
+                                        scheduler=self.scheduler, threaded=False,
+                                        dialogs=VirtualExecutor(self.clock, self.scheduler))
+        for state in self.states:
+            self.automaton.add_state(state(self.automaton))
+        for name in ('steady_state', 'moving_state', 'ask_state', 'hold_hand_state', 'goal_state', 'quit_state'):
+            if name not in self.automaton.states:
+                self.automaton.add_state(State(name, self.automaton))
+        for at, touched in touches:
+            self.scheduler.schedule(at, session.touch_head, touched)
+        self.automaton.start(first)
+
+    def run_until(self, until):
+        """
+        Handle the events and timers due up to until (simulated s), returns the states entered.
+        """
+        while True:
+            if self.automaton.dispatch_pending():
+                continue
+            due = [when for when in (self.scheduler.next_deadline(), self.automaton.events.next_due()) if when is not None]
+            if not due or min(due) > until:
+                break
+            self.clock.now = max(self.clock.now, min(due) + self.scheduler.tick * 1e-3)
+            self.scheduler.advance()
+        return [record[3] for record in self.automaton.tracer.recent() if record[3] is not None]
+
+
+class DialogTest(SimulatedAutomatonTest):
+
+    states = (AskState,)
+
+    def test_answers_are_events(self):
+        self.start('ask_state', {'blind_ask_cancel': [(2.0, 'no')]})
+        self.assertEqual(self.run_until(5.0), ['ask_state', 'hold_hand_state'])
+
+        self.start('ask_state', {'blind_ask_cancel': [(2.0, 'yes')]})
+        self.assertEqual(self.run_until(5.0), ['ask_state', 'quit_state'])
+
+        # Not understood, the user is not left alone
+        self.start('ask_state', {'blind_ask_cancel': [(2.0, 'failure')]})
+        self.assertEqual(self.run_until(5.0), ['ask_state', 'hold_hand_state'])
+
+    def test_touch_during_dialog(self):
+        # The question is still waiting for an answer when the head is touched again
+        self.start('ask_state', {'blind_ask_cancel': [(10.0, 'yes')]}, touches=[(2.0, True)])
+        self.assertEqual(self.run_until(5.0), ['ask_state', 'moving_state'])
+        self.assertLess(self.clock.time(), 5.0)
+
+        # Its late answer is dropped
+        self.assertEqual(self.run_until(20.0), ['ask_state', 'moving_state'])
+
+
+class MovingTest(SimulatedAutomatonTest):
+
+    states = (MovingState,)
+
+    def position_manager(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        map_path = os.path.join(folder, 'map.txt')
+        with open(map_path, 'w') as f:
+            f.write("Lobby 0 0\nCafe 1 0\n\nLobby Cafe 1 0\n")
+        return PositionManager(map_path, engine='search')
+
+    def test_nowhere_to_walk(self):
+        # No trip planned: the walk is over before any control loop starts
+        self.start('moving_state', position_manager=self.position_manager())
+        self.assertEqual(self.run_until(5.0), ['moving_state', 'quit_state'])
+        self.assertIsNone(self.automaton.states['moving_state'].control_loop)
+
+    def test_already_there(self):
+        position_manager = self.position_manager()
+        position_manager.compute_path('Cafe', 'Cafe', 'blind')
+        self.start('moving_state', position_manager=position_manager)
+        self.assertEqual(self.run_until(5.0), ['moving_state', 'goal_state'])
+
+
+class TimeoutTest(SimulatedAutomatonTest):
+    """
+    Timeouts run from entering a state to leaving it, events handled in the state do not cancel them.
+    """
+
+    states = (SteadyState, GoalState)
+
+    def test_release_in_goal_state(self):
+        self.start('goal_state', touches=[(1.0, True), (2.0, False)])
+        self.assertEqual(self.run_until(10.0), ['goal_state', 'quit_state'])
+
+    def test_release_in_steady_state(self):
+        # The touch is too short to count, the release is handled in the steady state
+        self.start('steady_state', touches=[(1.0, True), (1.05, False)], timeout=5)
+        self.assertEqual(self.run_until(10.0), ['steady_state', 'quit_state'])
+        self.assertLess(self.clock.time(), 6.0)
+
+    def test_timeout_of_a_state_left(self):
+        self.start('steady_state', touches=[(1.0, True)], timeout=5)
+        self.assertEqual(self.run_until(10.0), ['steady_state', 'moving_state'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+import itertools
+import math
+import random
+import struct
+import unittest
+from array import array
+
+from src.map.compact_graph import CompactGraph
+from src.map.contraction import ContractionHierarchy
+from src.map.dstar_lite import DStarLite
+from src.map.heuristics import LandmarkHeuristic, select_heuristic
+from src.map.pareto import ParetoRouter
+from src.map.room import Room
+from src.map.route_table import RouteTable
+
+
+INF = float('inf')
+LEVELS = (0, 1, 2)
+
+
+def random_graph(seed, n=14, degree=3, directed=False):
+    """
+    Rooms scattered on a plane, connected to a few random others with a weight of at least
+    their distance (so the Euclidean bound holds) and a random accessibility weight.
+    Returns the compiled graph and its edges as (u, v, weight, accessibility) node ids.
+    """
+    generator = random.Random(seed)
+    rooms = [Room('R' + str(i), generator.uniform(0, 20), generator.uniform(0, 20)) for i in range(n)]
+
+    edges = []
+    for u in range(n):
+        for v in generator.sample(range(n), degree):
+            if u == v:
+                continue
+            weight = rooms[u].distance(rooms[v]) * generator.uniform(1.0, 1.5) + 0.1
+            accessibility = generator.choice(LEVELS)
+            edges.append((u, v, weight, accessibility))
+            if not directed:
+                edges.append((v, u, weight, accessibility))
+
+    compact = CompactGraph.from_edges(rooms, array('l', [e[0] for e in edges]), array('l', [e[1] for e in edges]),
+                                      array('d', [e[2] for e in edges]), array('l', [e[3] for e in edges]))
+    compact.heuristic = select_heuristic(compact)
+    return compact, edges
+
+
+def floyd_warshall(n, edges, level):
+    distances = [[0 if u == v else INF for v in range(n)] for u in range(n)]
+    for u, v, weight, accessibility in edges:
+        if accessibility <= level and weight < distances[u][v]:
+            distances[u][v] = weight
+    for k in range(n):
+        for u in range(n):
+            if distances[u][k] == INF:
+                continue
+            for v in range(n):
+                if distances[u][k] + distances[k][v] < distances[u][v]:
+                    distances[u][v] = distances[u][k] + distances[k][v]
+    return distances
+
+
+def path_cost(edges, level, path):
+    """
+    Length of a path of node ids over the cheapest accessible edges, INF if it is not a path.
+    """
+    cost = 0
+    for u, v in zip(path, path[1:]):
+        cost += min([weight for a, b, weight, accessibility in edges
+                     if a == u and b == v and accessibility <= level] or [INF])
+    return cost
+
+
+class RoutingEnginesTest(unittest.TestCase):
+    """
+    Every routing engine agrees with Floyd-Warshall on random maps, at every accessibility level.
+    """
+
+    SEEDS = range(6)
+
+    def graphs(self):
+        for seed in self.SEEDS:
+            yield random_graph(seed, directed=seed % 2 == 1)
+
+    def check(self, compact, edges, level, u, v, distance, path, expected):
+        self.assertAlmostEqual(distance, expected, places=9)
+        if expected == INF:
+            self.assertEqual(path, [])
+            return
+        ids = [compact.node_id(node) for node in path]
+        self.assertEqual((ids[0], ids[-1]), (u, v))
+        self.assertAlmostEqual(path_cost(edges, level, ids), expected, places=9)
+
+    def test_astar(self):
+        for compact, edges in self.graphs():
+            for level in LEVELS:
+                expected = floyd_warshall(len(compact), edges, level)
+                for u, v in itertools.product(range(len(compact)), repeat=2):
+                    for bidirectional in (False, True):
+                        distance, path = compact.shortest_path(compact.nodes[u], compact.nodes[v], level, bidirectional)
+                        self.check(compact, edges, level, u, v, distance, path, expected[u][v])
+
+    def test_landmark_heuristic(self):
+        for compact, edges in self.graphs():
+            compact.heuristic = LandmarkHeuristic.from_compact(compact, 4)
+            expected = floyd_warshall(len(compact), edges, 1)
+            for u, v in itertools.product(range(len(compact)), repeat=2):
+                distance, path = compact.shortest_path(compact.nodes[u], compact.nodes[v], 1, True)
+                self.check(compact, edges, 1, u, v, distance, path, expected[u][v])
+
+    def test_contraction_hierarchy(self):
+        for compact, edges in self.graphs():
+            for level in LEVELS:
+                hierarchy = ContractionHierarchy.build(compact, level)
+                expected = floyd_warshall(len(compact), edges, level)
+                for u, v in itertools.product(range(len(compact)), repeat=2):
+                    distance, path = hierarchy.shortest_path(compact.nodes[u], compact.nodes[v])
+                    self.check(compact, edges, level, u, v, distance, path, expected[u][v])
+
+    def test_route_table(self):
+        for compact, edges in self.graphs():
+            for level in LEVELS:
+                table = RouteTable.from_buffer(RouteTable.serialize(compact, level, processes=1))
+                expected = floyd_warshall(len(compact), edges, level)
+                for u, v in itertools.product(range(len(compact)), repeat=2):
+                    distance, names = table.path(str(compact.nodes[u]), str(compact.nodes[v]))
+                    path = [compact.nodes[compact.index[Room(name)]] for name in names]
+                    self.check(compact, edges, level, u, v, distance, path, expected[u][v])
+
+    def test_route_table_cycle(self):
+        # Rows of a corrupted table sending 0 to 2 through 1 and 1 through 0
+        rooms = [Room(name, float(i), 0.0) for i, name in enumerate('ABC')]
+        compact = CompactGraph.from_edges(rooms, array('l', [0, 1]), array('l', [1, 2]),
+                                          array('d', [1.0, 1.0]), array('l', [0, 0]))
+        image = bytearray(RouteTable.serialize(compact, 0, processes=1))
+        table = RouteTable.from_buffer(bytes(image))
+        struct.pack_into('<i', image, table.hops_offset + 4 * (0 * 3 + 2), 1)
+        struct.pack_into('<i', image, table.hops_offset + 4 * (1 * 3 + 2), 0)
+        table = RouteTable.from_buffer(bytes(image))
+        self.assertEqual(table.distance(0, 2), 2.0)
+        self.assertRaises(ValueError, table.path, 'A', 'C')
+
+    def test_dstar_lite(self):
+        generator = random.Random(7)
+        for compact, edges in self.graphs():
+            n = len(compact)
+            for level in LEVELS:
+                goal, start = generator.sample(range(n), 2)
+                planner = DStarLite(compact, goal, start, level)
+                current = list(edges)
+                for _ in range(4):
+                    distance, path = planner.replan()
+                    expected = floyd_warshall(n, current, level)
+                    self.check(compact, current, level, planner.start, goal, distance,
+                               [compact.nodes[i] for i in path], expected[planner.start][goal])
+
+                    # Block or reweight an accessible edge, then move on along the route
+                    accessible = [edge for edge in edges if edge[3] <= level]
+                    u, v, weight, _ = generator.choice(accessible)
+                    weight = generator.choice([INF, weight * 0.5, weight * 3])
+                    planner.update_edge(u, v, weight)
+                    current = [(a, b, weight if (a, b) == (u, v) else w, acc) for a, b, w, acc in current]
+                    if len(path) > 2:
+                        planner.move_to(path[1])
+
+    def test_dstar_lite_only_reweights_accessible_edges(self):
+        for compact, edges in self.graphs():
+            n = len(compact)
+            expected = floyd_warshall(n, edges, 0)
+            existing = set((u, v) for u, v, _, _ in edges)
+            accessible = set((u, v) for u, v, _, accessibility in edges if accessibility == 0)
+            for u, v in existing - accessible:
+                planner = DStarLite(compact, v, u, 0)
+                planner.update_edge(u, v, 0.01)  # Cheaper stairs stay stairs
+                self.assertAlmostEqual(planner.replan()[0], expected[u][v], places=9)
+            for u, v in itertools.permutations(range(n), 2):
+                if (u, v) not in existing:
+                    planner = DStarLite(compact, v, u, 2)
+                    planner.update_edge(u, v, 0.01)  # No new connections
+                    self.assertNotEqual(planner.replan()[1], [u, v])
+
+    def test_pareto_frontier(self):
+        for seed in self.SEEDS:
+            compact, edges = random_graph(seed, n=8, degree=2, directed=seed % 2 == 1)
+            for severity in (False, True):
+                router = ParetoRouter(compact, severity)
+                for u, v in itertools.permutations(range(len(compact)), 2):
+                    expected = self.brute_force_frontier(edges, u, v, router.barrier_cost)
+                    routes = router.frontier(compact.nodes[u], compact.nodes[v])
+                    self.assertEqual([(round(d, 9), b) for d, b, _ in routes], expected)
+
+    @staticmethod
+    def brute_force_frontier(edges, source, target, barrier_cost):
+        """
+        Non dominated (distance, barrier cost) pairs over every simple path, by increasing distance.
+        """
+        costs = set()
+
+        def walk(node, visited, distance, barriers):
+            if node == target:
+                costs.add((round(distance, 9), barriers))
+                return
+            for u, v, weight, accessibility in edges:
+                if u == node and v not in visited:
+                    walk(v, visited | {v}, distance + weight, barriers + barrier_cost(accessibility))
+
+        walk(source, {source}, 0, 0)
+        frontier = []
+        for distance, barriers in sorted(costs):
+            if not frontier or barriers < frontier[-1][1]:
+                frontier.append((distance, barriers))
+        return frontier
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from src.actions.service_proxy import RpcStats, ServiceProxy
+
+
+class FlakyMotion(object):
+    """
+    ALMotion whose calls fail with the given errors first.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        self.moves = 0
+
+    def moveToward(self, x, y, theta):
+        self.moves += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+class FakeSession(object):
+
+    def __init__(self, errors):
+        self.errors = errors
+        self.fetched = []
+
+    def service(self, name):
+        self.fetched.append(FlakyMotion(self.errors))
+        return self.fetched[-1]
+
+
+class ServiceProxyTest(unittest.TestCase):
+
+    def test_retries_lost_connections(self):
+        session = FakeSession([RuntimeError("Socket is not connected")])
+        proxy = ServiceProxy(session, "ALMotion", stats=RpcStats())
+        proxy.moveToward(0.5, 0, 0)
+        self.assertEqual(len(session.fetched), 2)
+        self.assertEqual([motion.moves for motion in session.fetched], [1, 1])
+
+    def test_remote_errors_are_not_retried(self):
+        session = FakeSession([RuntimeError("ALMotion::moveToward: robot is not awake")])
+        proxy = ServiceProxy(session, "ALMotion", stats=RpcStats())
+        self.assertRaises(RuntimeError, proxy.moveToward, 0.5, 0, 0)
+        self.assertEqual(len(session.fetched), 1)
+        self.assertEqual(session.fetched[0].moves, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
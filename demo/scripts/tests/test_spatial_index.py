@@ -0,0 +1,67 @@
+import math
+import random
+import unittest
+
+from src.map.spatial_index import INF, SpatialGrid
+
+
+class SpatialGridTest(unittest.TestCase):
+
+    def brute_force(self, xs, ys, x, y):
+        return min((math.hypot(xs[i] - x, ys[i] - y), i) for i in range(len(xs)))
+
+    def test_nearest(self):
+        generator = random.Random(0)
+        xs = [generator.uniform(0, 50) for _ in range(200)]
+        ys = [generator.uniform(0, 20) for _ in range(200)]
+        grid = SpatialGrid(xs, ys)
+
+        # Inside and around the grid
+        for _ in range(500):
+            x, y = generator.uniform(-20, 70), generator.uniform(-20, 40)
+            distance, i = self.brute_force(xs, ys, x, y)
+            self.assertEqual(grid.nearest(x, y)[0], i)
+            self.assertAlmostEqual(grid.nearest(x, y)[1], distance)
+
+    def test_empty_cells(self):
+        # Two clusters far apart: the ring search crosses empty cells before finding a room
+        xs = [0, 0.5, 1, 99, 99.5, 100]
+        ys = [0, 0.5, 1, 99, 99.5, 100]
+        grid = SpatialGrid(xs, ys, cell_size=5)
+        self.assertEqual(grid.cells.get(grid._cell(50, 50)), None)
+
+        self.assertEqual(grid.nearest(40, 45)[0], 2)
+        self.assertEqual(grid.nearest(60, 55)[0], 3)
+        self.assertEqual(grid.nearest(100, -10)[0], 2)
+        self.assertAlmostEqual(grid.nearest(50, 50)[1], math.hypot(49, 49))
+
+    def test_max_radius(self):
+        grid = SpatialGrid([0, 10], [0, 0], cell_size=1)
+        self.assertEqual(grid.nearest(5, 3, max_radius=5), (None, INF))
+        self.assertEqual(grid.nearest(6, 3, max_radius=5), (1, 5.0))
+        self.assertEqual(grid.nearest(-100, 0, max_radius=1), (None, INF))
+
+    def test_degenerate_grids(self):
+        self.assertEqual(SpatialGrid([], []).nearest(1, 1), (None, INF))
+        self.assertEqual(SpatialGrid([], []).within(1, 1, 10), [])
+
+        # All the points on a line, or at the same place
+        line = SpatialGrid([0, 1, 2, 3], [2, 2, 2, 2])
+        self.assertEqual(line.nearest(2.2, 7)[0], 2)
+        self.assertAlmostEqual(line.nearest(2.2, 7)[1], math.hypot(0.2, 5))
+        same = SpatialGrid([1, 1], [1, 1])
+        self.assertEqual(same.nearest(0, 1), (0, 1.0))
+
+    def test_within(self):
+        generator = random.Random(1)
+        xs = [generator.uniform(0, 30) for _ in range(100)]
+        ys = [generator.uniform(0, 30) for _ in range(100)]
+        grid = SpatialGrid(xs, ys)
+        for _ in range(100):
+            x, y, radius = generator.uniform(-5, 35), generator.uniform(-5, 35), generator.uniform(0, 10)
+            expected = [i for i in range(100) if math.hypot(xs[i] - x, ys[i] - y) <= radius]
+            self.assertEqual(sorted(grid.within(x, y, radius)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import collections
+import json
+import random
+import unittest
+from StringIO import StringIO
+
+from src.automaton.tracing import Histogram, TransitionTracer
+
+
+Event = collections.namedtuple('Event', 'name posted')
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_buckets(self):
+        histogram = Histogram(precision=6, max_value=10.0)
+        error = 2.0 ** (1 - histogram.precision)
+
+        # Below 2^precision us every value has its own bucket
+        for micros in range(2 * histogram.half):
+            self.assertEqual(histogram._index(micros), micros)
+            self.assertEqual(histogram._lower_bound(micros), micros)
+
+        # Above, buckets are contiguous and no wider than the relative error
+        previous = histogram._index(2 * histogram.half - 1)
+        for micros in sorted(random.Random(0).sample(xrange(2 * histogram.half, 10 ** 7), 2000)):
+            index = histogram._index(micros)
+            self.assertGreaterEqual(index, previous)
+            previous = index
+            low, high = histogram._lower_bound(index), histogram._lower_bound(index + 1)
+            self.assertTrue(low <= micros < high)
+            self.assertLessEqual(high - low, low * error)
+        self.assertEqual(histogram._index(histogram._lower_bound(previous + 1)), previous + 1)
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        self.assertEqual((histogram.percentile(0.5), histogram.mean()), (0.0, 0.0))
+
+        generator = random.Random(1)
+        values = sorted(generator.expovariate(20) for _ in range(1000))
+        for value in values:
+            histogram.record(value)
+
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.mean(), sum(values) / 1000)
+        self.assertEqual(histogram.maximum, values[-1])
+        for fraction in (0.1, 0.5, 0.9, 0.99):
+            exact = values[int(round(fraction * 1000)) - 1]
+            self.assertGreaterEqual(histogram.percentile(fraction), exact)
+            self.assertLessEqual(histogram.percentile(fraction), exact * (1 + 2.0 ** (1 - histogram.precision)))
+        self.assertEqual(histogram.percentile(1.0), values[-1])
+
+    def test_out_of_range(self):
+        histogram = Histogram(max_value=1.0)
+        histogram.record(-0.5)
+        histogram.record(0)
+        histogram.record(50.0)
+
+        self.assertEqual(histogram.counts[0], 2)
+        self.assertEqual(histogram.counts[-1], 1)
+        self.assertEqual(histogram.percentile(1.0), 50.0)
+
+        summary = histogram.to_dict()
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['max'], 50.0)
+        self.assertEqual(sum(count for _, count in summary['buckets']), 3)
+        self.assertEqual(summary['buckets'][0], [0, 2])
+
+
+class TransitionTracerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+        self.tracer = TransitionTracer(capacity=4, clock=lambda: self.now)
+
+    def enter(self, event, source, target, at, latency=0.0):
+        self.tracer.leave(target, at)
+        self.tracer.transition(event and Event(event, at - latency), source, target, at, at + 0.01)
+
+    def test_dwell_and_latency(self):
+        self.enter(None, None, 'steady_state', 0.0)
+        self.enter('head_touched', 'steady_state', 'moving_state', 2.0, latency=0.1)
+        self.tracer.handled(Event('time_elapsed', 2.5), 'moving_state', 2.6)
+        self.enter('goal_reached', 'moving_state', 'goal_state', 7.0)
+
+        self.assertEqual(sorted(self.tracer.dwell), ['moving_state', 'steady_state'])
+        self.assertAlmostEqual(self.tracer.dwell['moving_state'].maximum, 5.0)
+        self.assertAlmostEqual(self.tracer.latency['head_touched'].maximum, 0.11)
+
+        records = self.tracer.recent()
+        self.assertEqual([record[1:4] for record in records],
+                         [(None, None, 'steady_state'), ('head_touched', 'steady_state', 'moving_state'),
+                          ('time_elapsed', 'moving_state', None), ('goal_reached', 'moving_state', 'goal_state')])
+        self.assertAlmostEqual(records[2][4], 0.1)
+        self.assertIsNone(records[2][5])
+
+    def test_ring_buffer(self):
+        for i in range(6):
+            self.tracer.handled(Event('e' + str(i), i), 'steady_state', i)
+        self.assertEqual([record[1] for record in self.tracer.recent()], ['e2', 'e3', 'e4', 'e5'])
+
+    def test_export(self):
+        self.enter(None, None, 'steady_state', 0.0)
+        self.enter('head_touched', 'steady_state', 'moving_state', 2.0)
+        stream = StringIO()
+        self.tracer.export(stream)
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([line['type'] for line in lines], ['transition', 'transition', 'dwell', 'latency'])
+        self.assertAlmostEqual(lines[1]['time'] - lines[0]['time'], 2.0)
+        self.assertEqual((lines[2]['state'], lines[2]['count']), ('steady_state', 1))
+        self.assertEqual(lines[3]['event'], 'head_touched')
+        self.assertEqual(len(self.tracer.report()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
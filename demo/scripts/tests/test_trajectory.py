@@ -0,0 +1,112 @@
+import math
+import unittest
+
+from src.map.room import Room
+from src.map.trajectory import Trajectory, normalize_angle
+
+
+def route(*points):
+    return [Room('R' + str(i), x, y) for i, (x, y) in enumerate(points)]
+
+
+class TrajectoryTest(unittest.TestCase):
+
+    def test_geometry(self):
+        trajectory = Trajectory(route((0, 0), (3, 4), (3, 10)), max_speed=1.0, acceleration=0.5)
+
+        self.assertEqual(len(trajectory), 2)
+        self.assertEqual(list(trajectory.lengths), [5, 6])
+        self.assertEqual(list(trajectory.starts), [0, 5])
+        self.assertEqual(trajectory.length(), 11)
+        self.assertAlmostEqual(trajectory.headings[1], math.pi / 2)
+        self.assertAlmostEqual(trajectory.turns[1], math.pi / 2 - math.atan2(4, 3))
+
+        self.assertEqual(trajectory.position(2.5), (1.5, 2.0, 0))
+        self.assertEqual(trajectory.position(8), (3.0, 7.0, 1))
+        self.assertEqual(trajectory.position(-1), (0.0, 0.0, 0))
+        self.assertEqual(trajectory.position(20), (3.0, 10.0, 1))
+
+        self.assertAlmostEqual(trajectory.progress(1, 2, 7), 3)
+        self.assertEqual(trajectory.progress(1, 3, 20), 6)
+        self.assertAlmostEqual(trajectory.cross_track_error(1, 2, 7), 1)
+        self.assertAlmostEqual(trajectory.cross_track_error(1, 4, 7), -1)
+
+    def test_trapezoidal_profile(self):
+        # 2 s and 1 m to reach the maximum speed, 8 m at full speed, 2 s and 1 m to stop
+        trajectory = Trajectory(route((0, 0), (10, 0)), max_speed=1.0, acceleration=0.5)
+
+        self.assertEqual((trajectory.entry_speeds[0], trajectory.peak_speeds[0], trajectory.exit_speeds[0]),
+                         (0, 1, 0))
+        self.assertAlmostEqual(trajectory.accelerate_until[0], 1)
+        self.assertAlmostEqual(trajectory.brake_from[0], 9)
+        self.assertAlmostEqual(trajectory.duration(), 12)
+
+        self.assertAlmostEqual(trajectory.time_at(0, 1), 2)
+        self.assertAlmostEqual(trajectory.time_at(0, 5), 6)
+        self.assertAlmostEqual(trajectory.time_at(0, 10), 12)
+        self.assertAlmostEqual(trajectory.time_left(0, 5), 6)
+        self.assertEqual(trajectory.time_left(1, 0), 0)
+
+        self.assertAlmostEqual(trajectory.speed(0, 0.25), math.sqrt(0.25))
+        self.assertEqual(trajectory.speed(0, 5), 1)
+        self.assertEqual(trajectory.speed(0, 0), trajectory.min_speed)
+        self.assertEqual(trajectory.speed(0, 10), trajectory.min_speed)
+
+    def test_triangular_profile(self):
+        # Too short to reach the maximum speed
+        trajectory = Trajectory(route((0, 0), (1, 0)), max_speed=1.0, acceleration=0.5)
+
+        peak = math.sqrt(0.5)
+        self.assertAlmostEqual(trajectory.peak_speeds[0], peak)
+        self.assertAlmostEqual(trajectory.accelerate_until[0], trajectory.brake_from[0])
+        self.assertAlmostEqual(trajectory.duration(), 2 * peak / 0.5)
+        self.assertAlmostEqual(trajectory.time_at(0, 0.5), peak / 0.5)
+
+    def test_corners(self):
+        # A right angle is taken from a stop, a slight turn barely slows down
+        sharp = Trajectory(route((0, 0), (10, 0), (10, 10)), max_speed=1.0, acceleration=0.5)
+        self.assertAlmostEqual(sharp.exit_speeds[0], 0)
+        self.assertAlmostEqual(sharp.entry_speeds[1], 0)
+
+        slight = Trajectory(route((0, 0), (10, 0), (20, 1)), max_speed=1.0, acceleration=0.5)
+        self.assertAlmostEqual(slight.exit_speeds[0], math.cos(math.atan2(1, 10)))
+        self.assertLess(slight.duration(), sharp.duration())
+
+    def test_feasible_with_the_acceleration(self):
+        trajectory = Trajectory(route((0, 0), (0.2, 0), (0.4, 0.01), (5, 0.5), (5.1, 0.5), (9, 0)),
+                                max_speed=1.0, acceleration=0.5)
+        for i in range(len(trajectory)):
+            v_in, v_out = trajectory.entry_speeds[i], trajectory.exit_speeds[i]
+            self.assertLessEqual(trajectory.peak_speeds[i], 1.0)
+            self.assertLessEqual(abs(v_out ** 2 - v_in ** 2), 2 * 0.5 * trajectory.lengths[i] + 1e-9)
+            if i:
+                self.assertEqual(v_in, trajectory.exit_speeds[i - 1])
+                self.assertAlmostEqual(trajectory.start_times[i],
+                                       trajectory.start_times[i - 1] + trajectory.durations[i - 1])
+        self.assertEqual(trajectory.exit_speeds[-1], 0)
+
+        # The planned time is continuous and increasing along the route
+        previous = -1
+        for i in range(len(trajectory)):
+            for k in range(11):
+                s = trajectory.lengths[i] * k / 10.0
+                elapsed = trajectory.start_times[i] + trajectory.time_at(i, s)
+                self.assertGreaterEqual(elapsed, previous - 1e-9)
+                previous = elapsed
+        self.assertAlmostEqual(previous, trajectory.duration())
+
+    def test_single_room(self):
+        trajectory = Trajectory(route((2, 3)), max_speed=1.0, acceleration=0.5)
+        self.assertEqual(len(trajectory), 0)
+        self.assertEqual((trajectory.length(), trajectory.duration()), (0, 0))
+        self.assertEqual(trajectory.position(1), (2, 3, 0))
+        self.assertEqual(trajectory.time_left(0, 0), 0)
+
+    def test_normalize_angle(self):
+        self.assertAlmostEqual(normalize_angle(3 * math.pi / 2), -math.pi / 2)
+        self.assertAlmostEqual(normalize_angle(-3 * math.pi / 2), math.pi / 2)
+        self.assertEqual(normalize_angle(math.pi), -math.pi)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from src.actions.trip_progress import TripProgress
+from src.map.room import Room
+from src.map.trajectory import Trajectory
+
+
+def trajectory(*rooms):
+    return Trajectory([Room(name, x, y) for name, x, y in rooms], max_speed=1.0, acceleration=0.5)
+
+
+class TripProgressTest(unittest.TestCase):
+
+    def setUp(self):
+        # Lobby -> Cafe -> Office, 10 m then 5 m
+        self.trajectory = trajectory(('Lobby', 0, 0), ('Cafe', 10, 0), ('Office', 10, 5))
+        self.progress = TripProgress(self.trajectory)
+
+    def test_walking(self):
+        self.assertEqual(self.progress.distance_left(), 15)
+        self.assertAlmostEqual(self.progress.time_left(), self.trajectory.duration())
+
+        self.progress.update(4, 0.3)
+        self.assertAlmostEqual(self.progress.offset, 4)
+        self.assertAlmostEqual(self.progress.distance_left(), 11)
+        self.assertAlmostEqual(self.progress.time_left(), self.trajectory.time_left(0, 4))
+
+        self.progress.advance()
+        self.assertEqual((self.progress.segment, self.progress.offset), (1, 0))
+        self.progress.update(10, 2)
+        self.assertAlmostEqual(self.progress.distance_left(), 3)
+
+        # Past the last room
+        self.progress.advance()
+        self.progress.update(10, 5)
+        self.assertEqual((self.progress.distance_left(), self.progress.time_left()), (0, 0))
+
+    def test_odometry(self):
+        self.progress.moved(1, 1)
+        self.assertEqual(self.progress.walked, 0)
+        self.progress.moved(4, 5)
+        self.progress.moved(4, 6)
+        self.assertEqual(self.progress.walked, 6)
+
+    def test_follow_a_repaired_trajectory(self):
+        self.progress.update(4, 0)
+
+        # Still heading to the Cafe: the distance into the segment holds
+        self.progress.follow(trajectory(('Lobby', 0, 0), ('Cafe', 10, 0), ('Library', 10, -5), ('Office', 10, 5)))
+        self.assertEqual((self.progress.segment, self.progress.offset), (0, 4))
+        self.assertAlmostEqual(self.progress.distance_left(), 21)
+
+        # Heading elsewhere: back to the start of the segment
+        self.progress.follow(trajectory(('Lobby', 0, 0), ('Library', 0, 5), ('Office', 10, 5)))
+        self.assertEqual((self.progress.segment, self.progress.offset), (0, 0))
+
+        self.progress.follow(None)
+        self.assertEqual((self.progress.distance_left(), self.progress.time_left()), (0, 0))
+        self.assertTrue(str(self.progress).startswith("segment 0/0, 0.00 m into it, 0.0 m and 0.0 s left"))
+
+    def test_str(self):
+        self.progress.update(4, 0)
+        self.assertTrue(str(self.progress).startswith("segment 1/2, 4.00 m into it, 11.0 m"))
+
+
+if __name__ == '__main__':
+    unittest.main()